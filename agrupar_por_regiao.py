@@ -1,21 +1,308 @@
+"""
+Módulo de agrupamento de pedidos por região
+
+Serviço único de agrupamento usado pelo dashboard, pela análise com IA e pelo aproveitamento da frota.
+
+- As coordenadas são projetadas num plano métrico local (km, equiretangular em torno da latitude média),
+  para que o K-Means não distorça distâncias leste-oeste como acontece com graus de lat/lon.
+- KMeans com random_state fixo para entradas pequenas; MiniBatchKMeans acima de LIMITE_MINIBATCH pontos.
+- Warm start: os centróides da execução anterior com o mesmo número de regiões e na mesma área (centro
+  dos pontos na mesma célula de RESOLUCAO_AREA_GRAUS) são a inicialização da próxima. Assim, um envio
+  com pedidos a mais ou a menos parte das regiões do anterior, e nunca das de outra cidade.
+- Cache em memória pelo hash do conjunto de coordenadas: repetir "Roteirizar" com os mesmos dados não reajusta.
+  Os dois dicionários são protegidos por um lock (a API atende requisições em várias threads).
+- Modo com capacidade (agrupar_por_capacidade): um grupo por caminhão, cada um cabendo em
+  'Capac. Kg', 'Capac. Cx' e max_pedidos, para a alocação ser feita numa única passada.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
 
-def agrupar_por_regiao(pedidos_df, n_clusters=3):
+from distancias import RAIO_TERRA_KM, projetar_coordenadas
+from diametro import VerificadorDiametro, dentro_do_diametro
+
+LIMITE_MINIBATCH = 10_000
+TAMANHO_LOTE_MINIBATCH = 4096
+TAMANHO_CACHE = 32
+TOLERANCIA_MUDANCAS = 0.005
+RESOLUCAO_AREA_GRAUS = 0.1
+
+_cache = OrderedDict()
+_centroides_anteriores = OrderedDict()
+_trava = threading.Lock()
+
+
+def _desprojetar(xy, latitude_referencia):
+    escala = np.radians(1.0) * RAIO_TERRA_KM
+    return np.column_stack((
+        xy[:, 1] / escala,
+        xy[:, 0] / (escala * np.cos(np.radians(latitude_referencia))),
+    ))
+
+
+def _chave(latlon, n_clusters):
+    h = hashlib.sha1(np.ascontiguousarray(latlon, dtype=np.float64).tobytes())
+    h.update(str(n_clusters).encode())
+    return h.hexdigest()
+
+
+def _chave_area(latlon, k):
+    centro = latlon.mean(axis=0) / RESOLUCAO_AREA_GRAUS
+    return (k, int(np.floor(centro[0])), int(np.floor(centro[1])))
+
+
+def rotular_regioes(latlon, n_clusters, random_state=42, usar_cache=True):
+    """
+    Agrupa coordenadas em regiões.
+
+    Parâmetros:
+      latlon (ndarray): Array (n, 2) com latitude e longitude, sem valores ausentes.
+      n_clusters (int): Número desejado de regiões (limitado ao número de pontos distintos).
+      random_state (int): Semente do K-Means, para resultados reproduzíveis.
+      usar_cache (bool): Se True, reaproveita o resultado de um conjunto de coordenadas idêntico.
+        Conjuntos diferentes na mesma área partem dos centróides da execução anterior (warm start).
+
+    Retorna:
+      ndarray: Região (0..k-1) de cada ponto.
+      ndarray: Centróides (k, 2) em lat/lon.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    chave = _chave(latlon, n_clusters)
+    with _trava:
+        if usar_cache and chave in _cache:
+            _cache.move_to_end(chave)
+            rotulos, centroides = _cache[chave]
+            return rotulos.copy(), centroides.copy()
+
+    k = max(1, min(int(n_clusters), len(np.unique(latlon, axis=0))))
+    area = _chave_area(latlon, k)
+    with _trava:
+        anteriores = _centroides_anteriores.get(area)
+    latitude_referencia = float(latlon[:, 0].mean())
+    xy = projetar_coordenadas(latlon, latitude_referencia)
+
+    if anteriores is not None:
+        inicio, n_init = projetar_coordenadas(anteriores, latitude_referencia), 1
+    else:
+        inicio, n_init = "k-means++", 10
+
+    # scikit-learn só é importado quando o agrupamento roda (início mais rápido de api/main)
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    if len(xy) > LIMITE_MINIBATCH:
+        modelo = MiniBatchKMeans(n_clusters=k, init=inicio, n_init=n_init, random_state=random_state,
+                                 batch_size=TAMANHO_LOTE_MINIBATCH)
+    else:
+        modelo = KMeans(n_clusters=k, init=inicio, n_init=n_init, random_state=random_state)
+    rotulos = modelo.fit_predict(xy)
+    centroides = _desprojetar(modelo.cluster_centers_, latitude_referencia)
+
+    with _trava:
+        _centroides_anteriores[area] = centroides
+        _centroides_anteriores.move_to_end(area)
+        if len(_centroides_anteriores) > TAMANHO_CACHE:
+            _centroides_anteriores.popitem(last=False)
+        if usar_cache:
+            _cache[chave] = (rotulos, centroides)
+            if len(_cache) > TAMANHO_CACHE:
+                _cache.popitem(last=False)
+    return rotulos.copy(), centroides.copy()
+
+
+def agrupar_por_regiao(pedidos_df, n_clusters=3, coluna='Regiao'):
     """
     Agrupa os pedidos em regiões utilizando K-Means com base em Latitude e Longitude.
-    Adiciona a coluna 'Regiao' no dataframe.
+    Adiciona a coluna `coluna` ('Regiao' por padrão) no dataframe.
+    Pedidos sem coordenadas ficam com região -1.
     """
     required_columns = ['Latitude', 'Longitude']
     # Verifica se as colunas necessárias estão presentes
     if not all(col in pedidos_df.columns for col in required_columns):
         raise ValueError(f"As colunas necessárias {required_columns} não foram encontradas no DataFrame.")
-    
+
+    if pedidos_df.empty:
+        pedidos_df[coluna] = []
+        return pedidos_df
+
+    coords = pedidos_df[required_columns].to_numpy(dtype=np.float64)
+    validos = np.isfinite(coords).all(axis=1)
+    regioes = np.full(len(coords), -1, dtype=np.int64)
+    if validos.any():
+        regioes[validos], _ = rotular_regioes(coords[validos], n_clusters)
+    pedidos_df[coluna] = regioes
+    return pedidos_df
+
+
+def caminhoes_necessarios(pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=None):
+    """
+    Menor número de caminhões (dos maiores para os menores) cuja capacidade somada cobre
+    o peso, as caixas e o número de pedidos. Retorna len(capacidades_kg) se nem a frota toda cobrir.
+    """
+    ordem = np.argsort(-np.asarray(capacidades_kg, dtype=np.float64), kind="stable")
+    acumulado_kg = np.cumsum(np.asarray(capacidades_kg, dtype=np.float64)[ordem])
+    acumulado_cx = np.cumsum(np.asarray(capacidades_cx, dtype=np.float64)[ordem])
+    cobre = (acumulado_kg >= np.sum(pesos)) & (acumulado_cx >= np.sum(caixas))
+    if max_pedidos:
+        cobre &= np.arange(1, len(ordem) + 1) * max_pedidos >= len(pesos)
+    return int(np.argmax(cobre)) + 1 if cobre.any() else len(ordem)
+
+
+def _atribuir_com_capacidade(distancias, pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos,
+                             latlon=None, distancia_maxima_km=None):
+    n, k = distancias.shape
+    if k > 1:
+        duas = np.partition(distancias, 1, axis=1)[:, :2]
+        arrependimento = duas[:, 1] - duas[:, 0]
+    else:
+        arrependimento = np.zeros(n)
+    # Pedidos que mais perdem ao não ir para o grupo mais próximo escolhem primeiro
+    ordem = np.lexsort((np.arange(n), -arrependimento))
+
+    resto_kg = np.asarray(capacidades_kg, dtype=np.float64).copy()
+    resto_cx = np.asarray(capacidades_cx, dtype=np.float64).copy()
+    resto_pedidos = np.full(k, max_pedidos if max_pedidos else n, dtype=np.int64)
+    rotulos = np.full(n, -1, dtype=np.int64)
+    verificadores = None
+    if distancia_maxima_km is not None:
+        verificadores = [VerificadorDiametro(distancia_maxima_km) for _ in range(k)]
+    for i in ordem:
+        cabe = (resto_kg >= pesos[i]) & (resto_cx >= caixas[i]) & (resto_pedidos > 0)
+        if not cabe.any():
+            continue
+        if verificadores is None:
+            j = int(np.where(cabe, distancias[i], np.inf).argmin())
+        else:
+            # Grupo mais próximo que comporta o pedido e continua dentro da distância máxima
+            candidatos = np.flatnonzero(cabe)
+            candidatos = candidatos[np.argsort(distancias[i, candidatos], kind="stable")]
+            j = next((int(c) for c in candidatos if verificadores[c].cabe(latlon[i])), -1)
+            if j < 0:
+                continue
+            verificadores[j].adicionar(latlon[i])
+        rotulos[i] = j
+        resto_kg[j] -= pesos[i]
+        resto_cx[j] -= caixas[i]
+        resto_pedidos[j] -= 1
+    return rotulos
+
+
+def rotular_por_capacidade(latlon, pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=None,
+                           iteracoes=20, random_state=42, distancia_maxima_km=None, progresso=None):
+    """
+    Agrupamento com capacidade: um grupo por caminhão, respeitando 'Capac. Kg', 'Capac. Cx'
+    e max_pedidos de cada um.
+
+    K-Means com restrição de capacidade (heurística de Lloyd): parte dos centróides do K-Means
+    comum e alterna (1) atribuição gulosa por arrependimento — cada pedido vai para o centróide
+    mais próximo que ainda comporta seu peso, caixas e contagem — e (2) recálculo dos centróides,
+    até os grupos pararem de mudar (menos de TOLERANCIA_MUDANCAS dos pedidos trocando de grupo).
+
+    Parâmetros:
+      latlon (ndarray): Array (n, 2) com latitude e longitude, sem valores ausentes.
+      pesos, caixas (array-like): Peso (kg) e caixas de cada pedido.
+      capacidades_kg, capacidades_cx (array-like): Capacidade de cada caminhão (um grupo por caminhão).
+      max_pedidos (int): Máximo de pedidos por caminhão (opcional).
+      iteracoes (int): Máximo de rodadas de atribuição/recálculo.
+      random_state (int): Semente do K-Means inicial.
+      distancia_maxima_km (float): Distância máxima entre pedidos de um grupo (opcional),
+        verificada de forma incremental pela envoltória convexa de cada grupo (módulo diametro).
+      progresso (callable): Função opcional progresso(concluidos, total) das rodadas.
+
+    Retorna:
+      ndarray: Caminhão (0..k-1) de cada pedido, ou -1 se não couber em nenhum.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    pesos = np.nan_to_num(np.asarray(pesos, dtype=np.float64))
+    caixas = np.nan_to_num(np.asarray(caixas, dtype=np.float64))
+    k = len(capacidades_kg)
+    if len(latlon) == 0 or k == 0:
+        return np.full(len(latlon), -1, dtype=np.int64)
+
+    if distancia_maxima_km is not None and dentro_do_diametro(latlon, distancia_maxima_km):
+        distancia_maxima_km = None  # Nenhum grupo pode violar a distância: dispensa a verificação
+
+    latitude_referencia = float(latlon[:, 0].mean())
+    xy = projetar_coordenadas(latlon, latitude_referencia)
+    _, centroides = rotular_regioes(latlon, k, random_state=random_state)
+    centroides = projetar_coordenadas(centroides, latitude_referencia)
+    if len(centroides) < k:
+        # Menos pontos distintos que caminhões: os caminhões extras repetem centróides
+        centroides = centroides[np.arange(k) % len(centroides)]
+
+    rotulos = None
+    for iteracao in range(max(1, iteracoes)):
+        if progresso is not None:
+            progresso(iteracao, max(1, iteracoes))
+        distancias = ((xy[:, None, :] - centroides[None, :, :]) ** 2).sum(axis=2)
+        novos = _atribuir_com_capacidade(distancias, pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos,
+                                         latlon, distancia_maxima_km)
+        if rotulos is not None and np.count_nonzero(novos != rotulos) <= TOLERANCIA_MUDANCAS * len(novos):
+            break
+        rotulos = novos
+        atribuidos = rotulos >= 0
+        contagem = np.bincount(rotulos[atribuidos], minlength=k)
+        usados = contagem > 0
+        for eixo in range(2):
+            soma = np.bincount(rotulos[atribuidos], weights=xy[atribuidos, eixo], minlength=k)
+            centroides[usados, eixo] = soma[usados] / contagem[usados]
+    if progresso is not None:
+        progresso(1, 1)
+    return rotulos
+
+
+def agrupar_por_capacidade(pedidos_df, caminhoes_df, max_pedidos=None, n_clusters=None, coluna='Região',
+                           distancia_maxima_km=None, progresso=None):
+    """
+    Agrupa os pedidos em regiões do tamanho de um caminhão (ver rotular_por_capacidade).
+
+    Usa os maiores caminhões primeiro: pelo menos n_clusters regiões (se informado) e, no mínimo,
+    o número de caminhões necessário para cobrir o peso, as caixas e max_pedidos; acrescenta
+    caminhões enquanto sobrarem pedidos sem grupo.
+
+    Parâmetros:
+      pedidos_df (DataFrame): Pedidos com 'Latitude', 'Longitude', 'Peso dos Itens' e 'Qtde. dos Itens'.
+      caminhoes_df (DataFrame): Caminhões com 'Capac. Kg' e 'Capac. Cx'.
+      max_pedidos (int): Máximo de pedidos por caminhão.
+      n_clusters (int): Número desejado de regiões.
+      coluna (str): Coluna de região a criar.
+      distancia_maxima_km (float): Distância máxima entre pedidos de uma região (opcional).
+      progresso (callable): Função opcional progresso(concluidos, total) do agrupamento.
+
+    Retorna:
+      DataFrame: pedidos_df com `coluna` = posição do caminhão em caminhoes_df (-1 se não couber).
+    """
     if pedidos_df.empty:
-        pedidos_df['Regiao'] = []
+        pedidos_df[coluna] = []
         return pedidos_df
-    
-    coords = pedidos_df[required_columns].values
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    pedidos_df['Regiao'] = kmeans.fit_predict(coords)
-    return pedidos_df
\ No newline at end of file
+
+    coords = pedidos_df[['Latitude', 'Longitude']].to_numpy(dtype=np.float64)
+    pesos = pd.to_numeric(pedidos_df['Peso dos Itens'], errors='coerce').fillna(0).to_numpy(np.float64)
+    caixas = pd.to_numeric(pedidos_df['Qtde. dos Itens'], errors='coerce').fillna(0).to_numpy(np.float64)
+    capacidades_kg = pd.to_numeric(caminhoes_df['Capac. Kg'], errors='coerce').fillna(0).to_numpy(np.float64)
+    capacidades_cx = pd.to_numeric(caminhoes_df['Capac. Cx'], errors='coerce').fillna(0).to_numpy(np.float64)
+
+    validos = np.isfinite(coords).all(axis=1)
+    k = caminhoes_necessarios(pesos[validos], caixas[validos], capacidades_kg, capacidades_cx, max_pedidos)
+    k = min(len(capacidades_kg), max(k, n_clusters or 0))
+    ordem = np.argsort(-capacidades_kg, kind="stable")
+
+    regioes = np.full(len(coords), -1, dtype=np.int64)
+    while validos.any() and k:
+        escolhidos = ordem[:k]
+        rotulos = rotular_por_capacidade(coords[validos], pesos[validos], caixas[validos],
+                                         capacidades_kg[escolhidos], capacidades_cx[escolhidos], max_pedidos,
+                                         distancia_maxima_km=distancia_maxima_km, progresso=progresso)
+        # A atribuição gulosa pode deixar sobras mesmo com capacidade total suficiente:
+        # nesse caso, tenta de novo com caminhões suficientes para as sobras, pela média de pedidos por grupo
+        sobras = int(np.count_nonzero(rotulos < 0))
+        if not sobras or k == len(ordem):
+            break
+        k = min(len(ordem), k + max(1, -(-sobras * k // int(validos.sum()))))
+    if validos.any() and k:
+        regioes[validos] = np.where(rotulos >= 0, escolhidos[np.maximum(rotulos, 0)], -1)
+    pedidos_df[coluna] = regioes
+    return pedidos_df
@@ -0,0 +1,213 @@
+"""
+Módulo de alocação de pedidos aos caminhões (bin packing em duas dimensões)
+
+- Heurística first-fit-decreasing / best-fit sobre arrays NumPy ordenados: os pedidos são
+  ordenados pelo maior tamanho relativo (kg ou caixas) e cada um vai para um caminhão já aberto
+  que o comporta em peso, caixas e número de pedidos; só então um novo caminhão é aberto.
+- Refinamento exato opcional por MILP (pulp) para regiões pequenas, partindo da solução heurística.
+- Resultado em arrays densos: caminhão (posição em caminhoes_df) e número de carga de cada pedido.
+"""
+
+import logging
+
+import numpy as np
+
+from diametro import VerificadorDiametro, dentro_do_diametro
+
+ESTRATEGIAS = ("first_fit", "best_fit")
+LIMITE_MILP = 40
+TEMPO_LIMITE_MILP_S = 10
+
+
+def _tamanhos(pesos, caixas, capacidades_kg, capacidades_cx):
+    maior_kg = max(float(np.max(capacidades_kg, initial=0)), 1e-9)
+    maior_cx = max(float(np.max(capacidades_cx, initial=0)), 1e-9)
+    return np.maximum(pesos / maior_kg, caixas / maior_cx)
+
+
+def empacotar(pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=None, estrategia="best_fit",
+              disponiveis=None, latlon=None, distancia_maxima_km=None):
+    """
+    Empacota os pedidos nos caminhões com first-fit-decreasing ou best-fit-decreasing.
+
+    Parâmetros:
+      pesos, caixas (ndarray): Peso (kg) e caixas de cada pedido.
+      capacidades_kg, capacidades_cx (ndarray): Capacidade de cada caminhão.
+      max_pedidos (int): Máximo de pedidos por caminhão (opcional).
+      estrategia (str): "first_fit" (primeiro caminhão aberto que comporta) ou
+        "best_fit" (caminhão aberto que fica com a menor folga).
+      disponiveis (ndarray): Máscara booleana dos caminhões que podem ser usados.
+      latlon (ndarray): Coordenadas (n, 2) dos pedidos, necessárias com distancia_maxima_km.
+      distancia_maxima_km (float): Distância máxima entre pedidos de um caminhão (opcional),
+        verificada a cada pedido adicionado (módulo diametro).
+
+    Retorna:
+      ndarray: Posição do caminhão de cada pedido, ou -1 se não couber em nenhum.
+    """
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estratégia inválida: {estrategia}. Use uma de {ESTRATEGIAS}.")
+    pesos = np.nan_to_num(np.asarray(pesos, dtype=np.float64))
+    caixas = np.nan_to_num(np.asarray(caixas, dtype=np.float64))
+    capacidades_kg = np.nan_to_num(np.asarray(capacidades_kg, dtype=np.float64))
+    capacidades_cx = np.nan_to_num(np.asarray(capacidades_cx, dtype=np.float64))
+    n, k = len(pesos), len(capacidades_kg)
+    caminhoes = np.full(n, -1, dtype=np.int64)
+    if n == 0 or k == 0:
+        return caminhoes
+
+    # Caminhões abertos dos maiores para os menores; pedidos dos maiores para os menores
+    ordem_caminhoes = np.argsort(-(capacidades_kg / max(capacidades_kg.max(), 1e-9)
+                                   + capacidades_cx / max(capacidades_cx.max(), 1e-9)), kind="stable")
+    ordem_pedidos = np.argsort(-_tamanhos(pesos, caixas, capacidades_kg, capacidades_cx), kind="stable")
+
+    resto_kg = capacidades_kg[ordem_caminhoes].copy()
+    resto_cx = capacidades_cx[ordem_caminhoes].copy()
+    resto_pedidos = np.full(k, max_pedidos if max_pedidos else n, dtype=np.int64)
+    livres = np.ones(k, dtype=bool) if disponiveis is None else np.asarray(disponiveis, bool)[ordem_caminhoes]
+    abertos = np.zeros(k, dtype=bool)
+    escala_kg = np.maximum(capacidades_kg[ordem_caminhoes], 1e-9)
+    escala_cx = np.maximum(capacidades_cx[ordem_caminhoes], 1e-9)
+
+    verificadores = None
+    if distancia_maxima_km is not None:
+        latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    if distancia_maxima_km is not None and not dentro_do_diametro(latlon, distancia_maxima_km):
+        verificadores = [VerificadorDiametro(distancia_maxima_km) for _ in range(k)]
+
+    for i in ordem_pedidos:
+        cabe = livres & (resto_kg >= pesos[i]) & (resto_cx >= caixas[i]) & (resto_pedidos > 0)
+        if verificadores is not None and cabe.any():
+            for j in np.flatnonzero(cabe & abertos):
+                cabe[j] = verificadores[j].cabe(latlon[i])
+        if not cabe.any():
+            continue
+        candidatos = cabe & abertos
+        if not candidatos.any():
+            j = int(np.argmax(cabe))  # Abre o maior caminhão livre que comporta o pedido
+            abertos[j] = True
+        elif estrategia == "first_fit":
+            j = int(np.argmax(candidatos))
+        else:
+            folga = (resto_kg - pesos[i]) / escala_kg + (resto_cx - caixas[i]) / escala_cx
+            j = int(np.where(candidatos, folga, np.inf).argmin())
+        caminhoes[i] = j
+        if verificadores is not None:
+            verificadores[j].adicionar(latlon[i])
+        resto_kg[j] -= pesos[i]
+        resto_cx[j] -= caixas[i]
+        resto_pedidos[j] -= 1
+
+    alocados = caminhoes >= 0
+    caminhoes[alocados] = ordem_caminhoes[caminhoes[alocados]]
+    return caminhoes
+
+
+def refinar_milp(pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=None, inicial=None,
+                 tempo_limite_s=TEMPO_LIMITE_MILP_S):
+    """
+    Refinamento exato com pulp: minimiza o número de caminhões usados, com penalidade alta
+    para pedidos não alocados. A solução `inicial` (ex.: de empacotar) é usada como warm start.
+
+    Retorna:
+      ndarray: Posição do caminhão de cada pedido (-1 se não alocado), ou None se o solver
+      não encontrar solução melhor que a inicial.
+    """
+    import pulp
+
+    n, k = len(pesos), len(capacidades_kg)
+    limite_pedidos = max_pedidos if max_pedidos else n
+    penalidade = k + 1
+
+    modelo = pulp.LpProblem("alocacao_caminhoes", pulp.LpMinimize)
+    x = [[pulp.LpVariable(f"x_{i}_{j}", cat="Binary") for j in range(k)] for i in range(n)]
+    usado = [pulp.LpVariable(f"u_{j}", cat="Binary") for j in range(k)]
+    sobra = [pulp.LpVariable(f"s_{i}", cat="Binary") for i in range(n)]
+
+    modelo += pulp.lpSum(usado) + penalidade * pulp.lpSum(sobra)
+    for i in range(n):
+        modelo += pulp.lpSum(x[i]) + sobra[i] == 1
+    for j in range(k):
+        coluna = [x[i][j] for i in range(n)]
+        modelo += pulp.lpSum(float(pesos[i]) * coluna[i] for i in range(n)) <= float(capacidades_kg[j]) * usado[j]
+        modelo += pulp.lpSum(float(caixas[i]) * coluna[i] for i in range(n)) <= float(capacidades_cx[j]) * usado[j]
+        modelo += pulp.lpSum(coluna) <= limite_pedidos * usado[j]
+
+    custo_inicial = None
+    if inicial is not None:
+        for i in range(n):
+            sobra[i].setInitialValue(int(inicial[i] < 0))
+            for j in range(k):
+                x[i][j].setInitialValue(int(inicial[i] == j))
+        usados_iniciais = set(int(j) for j in inicial if j >= 0)
+        for j in range(k):
+            usado[j].setInitialValue(int(j in usados_iniciais))
+        custo_inicial = len(usados_iniciais) + penalidade * int(np.sum(inicial < 0))
+
+    solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=tempo_limite_s, warmStart=inicial is not None)
+    modelo.solve(solver)
+    if modelo.sol_status not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        logging.info(f"MILP de alocação sem solução: {pulp.LpStatus[modelo.status]}")
+        return None
+
+    caminhoes = np.full(n, -1, dtype=np.int64)
+    for i in range(n):
+        for j in range(k):
+            if (x[i][j].value() or 0) > 0.5:
+                caminhoes[i] = j
+                break
+    custo = len(set(caminhoes[caminhoes >= 0].tolist())) + penalidade * int(np.sum(caminhoes < 0))
+    if custo_inicial is not None and custo >= custo_inicial:
+        return None
+    return caminhoes
+
+
+def alocar_pedidos(pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=None, regioes=None,
+                   estrategia="best_fit", refinar=False, limite_milp=LIMITE_MILP,
+                   tempo_limite_milp_s=TEMPO_LIMITE_MILP_S, latlon=None, distancia_maxima_km=None):
+    """
+    Aloca os pedidos de cada região aos caminhões; um caminhão atende uma única região.
+
+    Parâmetros:
+      pesos, caixas (array-like): Peso (kg) e caixas de cada pedido.
+      capacidades_kg, capacidades_cx (array-like): Capacidade de cada caminhão.
+      max_pedidos (int): Máximo de pedidos por caminhão.
+      regioes (array-like): Região de cada pedido (opcional; -1 não é alocado).
+      estrategia (str): "first_fit" ou "best_fit".
+      refinar (bool): Se True, refina por MILP as regiões com até `limite_milp` pedidos
+        (sem restrição de distância; o refinamento é ignorado se distancia_maxima_km for informada).
+      latlon (ndarray), distancia_maxima_km (float): Limite opcional de distância entre pedidos de um caminhão.
+
+    Retorna:
+      ndarray: Posição do caminhão de cada pedido (-1 se não alocado).
+      ndarray: Número da carga de cada pedido (1..; 0 se não alocado).
+    """
+    pesos = np.nan_to_num(np.asarray(pesos, dtype=np.float64))
+    caixas = np.nan_to_num(np.asarray(caixas, dtype=np.float64))
+    capacidades_kg = np.nan_to_num(np.asarray(capacidades_kg, dtype=np.float64))
+    capacidades_cx = np.nan_to_num(np.asarray(capacidades_cx, dtype=np.float64))
+    n, k = len(pesos), len(capacidades_kg)
+    regioes = np.zeros(n, dtype=np.int64) if regioes is None else np.asarray(regioes)
+
+    caminhoes = np.full(n, -1, dtype=np.int64)
+    livres = np.ones(k, dtype=bool)
+    for regiao in np.unique(regioes[regioes >= 0]) if n else []:
+        pedidos = np.flatnonzero(regioes == regiao)
+        resultado = empacotar(pesos[pedidos], caixas[pedidos], capacidades_kg, capacidades_cx,
+                              max_pedidos, estrategia, livres,
+                              None if latlon is None else np.asarray(latlon)[pedidos], distancia_maxima_km)
+        if refinar and distancia_maxima_km is None and len(pedidos) <= limite_milp and livres.any():
+            indices_livres = np.flatnonzero(livres)
+            inicial = np.where(resultado >= 0, np.searchsorted(indices_livres, resultado), -1)
+            refinado = refinar_milp(pesos[pedidos], caixas[pedidos], capacidades_kg[indices_livres],
+                                    capacidades_cx[indices_livres], max_pedidos, inicial, tempo_limite_milp_s)
+            if refinado is not None:
+                resultado = np.where(refinado >= 0, indices_livres[np.maximum(refinado, 0)], -1)
+        caminhoes[pedidos] = resultado
+        livres[resultado[resultado >= 0]] = False
+
+    # Uma carga por caminhão usado, numeradas na ordem dos caminhões
+    cargas = np.zeros(n, dtype=np.int64)
+    alocados = caminhoes >= 0
+    _, numeros = np.unique(caminhoes[alocados], return_inverse=True)
+    cargas[alocados] = numeros + 1
+    return caminhoes, cargas
@@ -1,17 +1,21 @@
 from flask import Flask, request, jsonify, send_file
 import os
 import io
-import folium
 import pandas as pd
 import numpy as np
 import random
+import uuid
 from datetime import datetime
 import logging
 
-from geocoding import converter_enderecos
-from preprocessor import preprocessar_dados
+import armazenamento
+import leitura_excel
+from geocoding import geocodificar_em_lotes
 from optimization import run_genetic_algorithm
-from config import DATABASE_FOLDER
+from cache_conjuntos import CacheConjuntos
+from config import DATABASE_FOLDER, GA_ILHAS, GA_TEMPO_LIMITE_S, TAREFAS_PROCESSOS, CONJUNTOS_MEMORIA_MB
+from progresso import Progresso, RegistroProgresso
+from tarefas import CONCLUIDA, FilaTarefas, chave_tarefa
 
 # Configuração de logging para a API
 logging.basicConfig(level=logging.INFO, filename="api.log", filemode="a",
@@ -19,36 +23,104 @@ logging.basicConfig(level=logging.INFO, filename="api.log", filemode="a",
 
 app = Flask(__name__)
 
-if not os.path.exists(DATABASE_FOLDER):
-    os.makedirs(DATABASE_FOLDER)
+# Progresso das execuções de /resultado, consultado por GET /progresso/<id>
+progressos = RegistroProgresso()
+ETAPAS_RESULTADO = {"Leitura e geocodificação": 3, "Algoritmo genético": 2}
 
-def ler_planilha(nome_arquivo, colunas_obrigatorias):
+# Tarefas assíncronas de /resultado (POST /jobs), executadas num pool de processos
+fila_tarefas = FilaTarefas(TAREFAS_PROCESSOS)
+PARAMETROS_RESULTADO = ("geracoes", "tamanho_pop", "penalidade_sobrecarga", "semente", "ilhas", "tempo_limite_s")
+
+# Pedidos e caminhões já lidos e geocodificados, por hash do arquivo (preparados no /upload)
+conjuntos = CacheConjuntos(int(CONJUNTOS_MEMORIA_MB * 1024 * 1024))
+COLUNAS_ENDERECO = ["Endereço de Entrega", "Bairro de Entrega", "Cidade de Entrega"]
+COLUNAS_PEDIDOS_OPCIONAIS = ["Peso dos Itens", "Qtde. dos Itens"]
+# Opcionais para o /mapa, mas obrigatórias para o algoritmo genético de /resultado e /jobs
+COLUNAS_RESULTADO = ["Peso dos Itens"]
+COLUNAS_CAMINHOES = ["Placa", "Capac. Kg", "Capac. Cx", "Disponível"]
+
+def ler_planilha(nome_arquivo, colunas_obrigatorias, tipos=None):
     """
     Lê um arquivo .xlsx a partir da pasta de dados e valida as colunas obrigatórias.
+    O Excel só é convertido quando muda; as demais requisições leem o Parquet (módulo armazenamento).
     """
     caminho = os.path.join(DATABASE_FOLDER, nome_arquivo)
-    df = pd.read_excel(caminho, engine="openpyxl")
-    for coluna in colunas_obrigatorias:
-        if coluna not in df.columns:
-            logging.error(f"Coluna obrigatória '{coluna}' não encontrada em {nome_arquivo}.")
-            raise ValueError(f"Coluna obrigatória '{coluna}' não encontrada em {nome_arquivo}.")
-    return df
-
-def gerar_mapa(pedidos_df):
-    """
-    Gera um mapa interativo com Folium exibindo os pedidos.
-    """
-    if pedidos_df.empty:
-        return folium.Map(location=[0, 0], zoom_start=2)
-    centro = [pedidos_df.iloc[0]['Latitude'], pedidos_df.iloc[0]['Longitude']]
-    mapa = folium.Map(location=centro, zoom_start=12)
-    for _, row in pedidos_df.iterrows():
-        folium.Marker(
-            location=[row['Latitude'], row['Longitude']],
-            popup=row.get("Endereço Completo", "Sem endereço"),
-            icon=folium.Icon(color="blue")
-        ).add_to(mapa)
-    return mapa
+    nome = os.path.splitext(nome_arquivo)[0].lower()
+    try:
+        return armazenamento.importar_excel(caminho, f"api_{nome}", colunas_obrigatorias, tipos=tipos)
+    except ValueError as e:
+        logging.error(f"{e} ({nome_arquivo})")
+        raise
+
+def ler_pedidos_geocodificados(colunas_obrigatorias, colunas_opcionais=(), progresso=None):
+    """
+    Lê Pedidos.xlsx em lotes, apenas com as colunas usadas (obrigatórias e opcionais), e geocodifica
+    cada lote assim que é lido.
+    Uma planilha sem as colunas obrigatórias falha no cabeçalho, antes de qualquer geocodificação.
+    progresso(concluidos, total), se informado, recebe as linhas já lidas e geocodificadas.
+    """
+    caminho = os.path.join(DATABASE_FOLDER, "Pedidos.xlsx")
+    lotes = leitura_excel.ler_em_lotes(caminho, colunas_obrigatorias, colunas=colunas_obrigatorias + list(colunas_opcionais),
+                                       tipos=leitura_excel.TIPOS_PEDIDOS, progresso=progresso)
+    try:
+        partes = [lote for lote, _ in geocodificar_em_lotes(lotes)]
+    except ValueError as e:
+        logging.error(f"{e} (Pedidos.xlsx)")
+        raise
+    if not partes:
+        return pd.DataFrame(columns=colunas_obrigatorias + ["Endereço Completo", "Latitude", "Longitude"])
+    return pd.concat(partes, ignore_index=True)
+
+def pedidos_preparados(progresso=None):
+    """
+    Pedidos.xlsx lido e geocodificado, do cache em memória enquanto o arquivo não muda.
+    O DataFrame é compartilhado entre as requisições e não deve ser alterado.
+    progresso(concluidos, total), se informado, só é chamado quando o arquivo precisa ser preparado.
+    """
+    chave = ("pedidos", armazenamento.hash_arquivo(os.path.join(DATABASE_FOLDER, "Pedidos.xlsx")))
+    return conjuntos.obter(chave, lambda: ler_pedidos_geocodificados(COLUNAS_ENDERECO, COLUNAS_PEDIDOS_OPCIONAIS,
+                                                                      progresso))
+
+def caminhoes_preparados():
+    """
+    Caminhoes.xlsx validado, do cache em memória enquanto o arquivo não muda.
+    """
+    chave = ("caminhoes", armazenamento.hash_arquivo(os.path.join(DATABASE_FOLDER, "Caminhoes.xlsx")))
+    return conjuntos.obter(chave, lambda: ler_planilha("Caminhoes.xlsx", COLUNAS_CAMINHOES,
+                                                       leitura_excel.TIPOS_CAMINHOES))
+
+def verificar_colunas_resultado():
+    """
+    Valida no cabeçalho de Pedidos.xlsx as colunas de COLUNAS_RESULTADO, sem ler as linhas:
+    uma planilha sem elas é recusada antes de qualquer leitura ou geocodificação.
+    """
+    cabecalho = leitura_excel.ler_cabecalho(os.path.join(DATABASE_FOLDER, "Pedidos.xlsx"))
+    faltantes = [coluna for coluna in COLUNAS_RESULTADO if coluna not in cabecalho]
+    if faltantes:
+        raise ValueError(f"Colunas obrigatórias não encontradas na planilha: {', '.join(faltantes)}")
+
+def calcular_resultado(parametros=None, progresso=None):
+    """
+    Pipeline de /resultado: lê Caminhoes.xlsx e Pedidos.xlsx, geocodifica os pedidos e executa o algoritmo genético.
+
+    Parâmetros:
+      parametros (dict): Argumentos de run_genetic_algorithm (PARAMETROS_RESULTADO); padrão: ilhas e
+        tempo limite de config.
+      progresso (Progresso): Acompanhamento com as etapas de ETAPAS_RESULTADO (opcional).
+
+    Retorna:
+      dict: Contendo a solução ({pedido: caminhão}) e o fitness.
+    """
+    parametros = {"ilhas": GA_ILHAS, "tempo_limite_s": GA_TEMPO_LIMITE_S, **(parametros or {})}
+    progresso = progresso or Progresso(ETAPAS_RESULTADO)
+    caminhoes_df = caminhoes_preparados()
+    pedidos_df = pedidos_preparados(progresso.etapa("Leitura e geocodificação"))
+    progresso.concluir_etapa("Leitura e geocodificação")
+    if "Peso dos Itens" not in pedidos_df.columns:
+        raise ValueError("Colunas obrigatórias não encontradas na planilha: Peso dos Itens")
+    # O GA compara 'Peso dos Itens' com 'Capac. Kg', por isso recebe os pesos em kg (sem normalização)
+    return run_genetic_algorithm(pedidos_df, caminhoes_df, progresso=progresso.etapa("Algoritmo genético"),
+                                 **parametros)
 
 # ---------- Endpoints da API REST ----------
 
@@ -56,14 +128,28 @@ def gerar_mapa(pedidos_df):
 def upload_files():
     """
     POST /upload: Recebe os arquivos Pedidos.xlsx, Caminhoes.xlsx, IA.xlsx e os salva na pasta DATABASE_FOLDER.
+
+    Pedidos e caminhões são lidos (e os pedidos geocodificados) já no envio e ficam em memória
+    para /resultado e /mapa; uma planilha inválida é informada na resposta.
     """
+    preparadores = {"Pedidos.xlsx": ("pedidos", pedidos_preparados), "Caminhoes.xlsx": ("caminhoes", caminhoes_preparados)}
     result = {}
+    os.makedirs(DATABASE_FOLDER, exist_ok=True)
     for nome in ["Pedidos.xlsx", "Caminhoes.xlsx", "IA.xlsx"]:
         if nome in request.files:
             file = request.files[nome]
             caminho = os.path.join(DATABASE_FOLDER, nome)
             file.save(caminho)
             result[nome] = "Arquivo enviado com sucesso"
+            if nome in preparadores:
+                conjunto, preparar = preparadores[nome]
+                # A versão anterior do arquivo não será mais usada
+                conjuntos.descartar((conjunto,))
+                try:
+                    result[nome] += f" ({len(preparar())} linhas)"
+                except Exception as e:
+                    logging.error(f"Erro ao preparar {nome}: {e}")
+                    result[nome] += f", mas não pôde ser processado: {str(e)}"
         else:
             result[nome] = "Arquivo não enviado"
     return jsonify(result)
@@ -72,21 +158,79 @@ def upload_files():
 def get_resultado():
     """
     GET /resultado: Lê os arquivos de Pedidos e Caminhões, pré-processa e executa o algoritmo genético.
-    Retorna a melhor solução encontrada.
+    Retorna a melhor solução encontrada e o id da execução ('execucao').
+
+    O parâmetro opcional ?execucao=<id> define o id, para que o cliente acompanhe a execução
+    em GET /progresso/<id> enquanto esta requisição não responde.
     """
+    execucao_id = request.args.get("execucao") or uuid.uuid4().hex
+    progresso = progressos.registrar(execucao_id, Progresso(ETAPAS_RESULTADO))
     try:
-        pedidos_df = ler_planilha("Pedidos.xlsx", ["Endereço de Entrega", "Bairro de Entrega", "Cidade de Entrega", "Peso dos Itens"])
-        caminhoes_df = ler_planilha("Caminhoes.xlsx", ["Placa", "Capac. Kg", "Capac. Cx", "Disponível"])
+        # Lê (ou obtém do cache) as planilhas antes, para que um arquivo inválido responda 400
+        verificar_colunas_resultado()
+        caminhoes_preparados()
+        pedidos_preparados(progresso.etapa("Leitura e geocodificação"))
     except Exception as e:
         logging.error(f"Erro na leitura dos arquivos: {e}")
+        progresso.finalizar(e)
+        return jsonify({"error": f"Erro na leitura dos arquivos: {str(e)}", "execucao": execucao_id}), 400
+    try:
+        solucao = calcular_resultado(progresso=progresso)
+    except Exception as e:
+        progresso.finalizar(e)
+        raise
+    progresso.finalizar()
+    solucao["execucao"] = execucao_id
+    return jsonify(solucao)
+
+@app.route('/jobs', methods=['POST'])
+def post_job():
+    """
+    POST /jobs: Enfileira o cálculo de /resultado e retorna o id da tarefa (202; 200 se já calculado).
+
+    O corpo JSON opcional define parâmetros do algoritmo genético (PARAMETROS_RESULTADO).
+    Submissões com as mesmas planilhas e os mesmos parâmetros recebem a tarefa já em andamento
+    ou o resultado memorizado ('reaproveitada': true).
+    """
+    parametros = request.get_json(silent=True) or {}
+    desconhecidos = sorted(set(parametros) - set(PARAMETROS_RESULTADO))
+    if desconhecidos:
+        return jsonify({"error": f"Parâmetros desconhecidos: {', '.join(desconhecidos)}"}), 400
+    parametros = {"ilhas": GA_ILHAS, "tempo_limite_s": GA_TEMPO_LIMITE_S, **parametros}
+    try:
+        entradas = [armazenamento.hash_arquivo(os.path.join(DATABASE_FOLDER, nome))
+                    for nome in ("Pedidos.xlsx", "Caminhoes.xlsx")]
+        verificar_colunas_resultado()
+    except Exception as e:
         return jsonify({"error": f"Erro na leitura dos arquivos: {str(e)}"}), 400
 
-    pedidos_df["Endereço Completo"] = pedidos_df["Endereço de Entrega"] + ", " + pedidos_df["Bairro de Entrega"] + ", " + pedidos_df["Cidade de Entrega"]
-    pedidos_df = converter_enderecos(pedidos_df)
-    pedidos_df = preprocessar_dados(pedidos_df)
+    tarefa, reaproveitada = fila_tarefas.submeter(
+        chave_tarefa(entradas, parametros), calcular_resultado,
+        kwargs={"parametros": parametros}, etapas=ETAPAS_RESULTADO
+    )
+    status = 200 if tarefa["status"] == CONCLUIDA else 202
+    return jsonify({**tarefa, "reaproveitada": reaproveitada}), status, {"Location": f"/jobs/{tarefa['id']}"}
 
-    solucao = run_genetic_algorithm(pedidos_df, caminhoes_df)
-    return jsonify(solucao)
+@app.route('/jobs/<tarefa_id>', methods=['GET'])
+def get_job(tarefa_id):
+    """
+    GET /jobs/<id>: Status (pendente, executando, concluida, falhou), progresso e, quando concluída, o resultado.
+    """
+    tarefa = fila_tarefas.consultar(tarefa_id)
+    if tarefa is None:
+        return jsonify({"error": f"Tarefa '{tarefa_id}' não encontrada."}), 404
+    return jsonify(tarefa)
+
+@app.route('/progresso/<execucao_id>', methods=['GET'])
+def get_progresso(execucao_id):
+    """
+    GET /progresso/<id>: Etapa atual, fração concluída, tempo decorrido e estimativa de tempo restante
+    de uma execução de /resultado.
+    """
+    progresso = progressos.obter(execucao_id)
+    if progresso is None:
+        return jsonify({"error": f"Execução '{execucao_id}' não encontrada."}), 404
+    return jsonify(progresso.estado())
 
 @app.route('/mapa', methods=['GET'])
 def get_mapa():
@@ -94,15 +238,15 @@ def get_mapa():
     GET /mapa: Gera e retorna uma página HTML com o mapa interativo dos pedidos.
     """
     try:
-        pedidos_df = ler_planilha("Pedidos.xlsx", ["Endereço de Entrega", "Bairro de Entrega", "Cidade de Entrega"])
-        pedidos_df["Endereço Completo"] = pedidos_df["Endereço de Entrega"] + ", " + pedidos_df["Bairro de Entrega"] + ", " + pedidos_df["Cidade de Entrega"]
-        pedidos_df = converter_enderecos(pedidos_df)
+        pedidos_df = pedidos_preparados()
     except Exception as e:
         logging.error(f"Erro ao ler ou processar os pedidos: {e}")
         return jsonify({"error": f"Erro ao ler ou processar os pedidos: {str(e)}"}), 400
 
-    mapa = gerar_mapa(pedidos_df)
-    return mapa._repr_html_()
+    # Mesmo HTML enquanto os pedidos não mudam (módulo mapas; folium só é importado aqui)
+    import mapas
+    return mapas.html_mapa(pedidos_df)
 
 if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use servidor.py (gunicorn -c gunicorn.conf.py "servidor:criar_app()")
     app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
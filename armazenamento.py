@@ -0,0 +1,241 @@
+"""
+Módulo de armazenamento colunar (Parquet)
+
+Camada de armazenamento das planilhas de pedidos, frota e resultados em config.DATABASE_FOLDER.
+
+- Um Excel enviado é lido uma única vez e convertido em Parquet; o arquivo é nomeado pelo hash
+  do conteúdo ({nome}-{hash}.parquet), então reenviar o mesmo arquivo não o processa de novo.
+  A leitura é feita em lotes (módulo leitura_excel), validando o cabeçalho antes dos dados.
+- Cada conjunto de dados tem um ponteiro ({nome}.atual) para a versão em uso; as leituras internas
+  carregam o Parquet com memory map e apenas as colunas pedidas.
+- Excel só é gerado numa exportação explícita (exportar_excel).
+- Na primeira leitura de um conjunto sem Parquet, a planilha antiga correspondente (PLANILHAS_LEGADAS)
+  é importada automaticamente.
+"""
+
+import os
+import io
+import hashlib
+import logging
+import threading
+
+import pandas as pd
+
+from config import DATABASE_FOLDER
+import leitura_excel
+
+PASTA_COLUNAR = os.path.join(DATABASE_FOLDER, "colunar")
+VERSOES_MANTIDAS = 5
+
+# Planilhas usadas antes do armazenamento colunar, importadas na primeira leitura
+PLANILHAS_LEGADAS = {
+    "caminhoes": os.path.join(DATABASE_FOLDER, "caminhoes_frota.xlsx"),
+    "pedidos": os.path.join(DATABASE_FOLDER, "Pedidos.xlsx"),
+    "resultado": os.path.join(DATABASE_FOLDER, "roterizacao_resultado.xlsx"),
+}
+TIPOS_LEGADOS = {
+    "caminhoes": leitura_excel.TIPOS_CAMINHOES,
+    "pedidos": leitura_excel.TIPOS_PEDIDOS,
+    "resultado": leitura_excel.TIPOS_PEDIDOS,
+}
+
+_lock = threading.Lock()
+# (caminho, mtime, tamanho) -> hash, para não reler um arquivo que não mudou
+_hashes_por_arquivo = {}
+
+
+def hash_conteudo(dados):
+    """Hash (hex, 16 caracteres) de um conteúdo em bytes."""
+    return hashlib.sha256(dados).hexdigest()[:16]
+
+
+def hash_arquivo(caminho):
+    """
+    Hash do conteúdo de um arquivo, reaproveitado enquanto o arquivo não muda (mtime e tamanho).
+    """
+    estado = os.stat(caminho)
+    assinatura = (os.fspath(caminho), estado.st_mtime_ns, estado.st_size)
+    chave = _hashes_por_arquivo.get(assinatura)
+    if chave is None:
+        with open(caminho, "rb") as arquivo:
+            chave = hash_conteudo(arquivo.read())
+        _hashes_por_arquivo[assinatura] = chave
+    return chave
+
+
+def _caminho(nome, chave):
+    return os.path.join(PASTA_COLUNAR, f"{nome}-{chave}.parquet")
+
+
+def _ponteiro(nome):
+    return os.path.join(PASTA_COLUNAR, f"{nome}.atual")
+
+
+def versao_atual(nome):
+    """Hash da versão em uso do conjunto `nome`, ou None se ainda não existir."""
+    try:
+        with open(_ponteiro(nome), "r", encoding="utf-8") as arquivo:
+            chave = arquivo.read().strip()
+    except FileNotFoundError:
+        return None
+    return chave if os.path.exists(_caminho(nome, chave)) else None
+
+
+def _apontar(nome, chave):
+    # Temporários por processo: os trabalhadores da fila de tarefas podem gravar ao mesmo tempo
+    temporario = f"{_ponteiro(nome)}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(chave)
+    os.replace(temporario, _ponteiro(nome))
+    _limpar_versoes(nome, chave)
+
+
+def _limpar_versoes(nome, atual):
+    prefixo = f"{nome}-"
+    versoes = [
+        os.path.join(PASTA_COLUNAR, arquivo) for arquivo in os.listdir(PASTA_COLUNAR)
+        if arquivo.startswith(prefixo) and arquivo.endswith(".parquet")
+        and len(arquivo) == len(prefixo) + 16 + len(".parquet")
+    ]
+    versoes.sort(key=os.path.getmtime, reverse=True)
+    for caminho in versoes[VERSOES_MANTIDAS:]:
+        if caminho != _caminho(nome, atual):
+            os.remove(caminho)
+
+
+def _tipos_compativeis(df):
+    # Colunas de texto com valores de tipos misturados (ex.: placas numéricas e alfanuméricas)
+    # não têm tipo Arrow único: são gravadas como texto, preservando os ausentes
+    df = df.copy()
+    for coluna in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[coluna], skipna=True) not in ("string", "empty"):
+            df[coluna] = df[coluna].where(df[coluna].isna(), df[coluna].astype(str))
+    return df
+
+
+def _gravar(df, nome, chave, apontar=True):
+    destino = _caminho(nome, chave)
+    if not os.path.exists(destino):
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        _tipos_compativeis(df).to_parquet(temporario, index=False)
+        os.replace(temporario, destino)
+    if apontar:
+        _apontar(nome, chave)
+
+
+def _ler_bytes(origem):
+    if isinstance(origem, (bytes, bytearray)):
+        return bytes(origem)
+    if isinstance(origem, (str, os.PathLike)):
+        with open(origem, "rb") as arquivo:
+            return arquivo.read()
+    # Arquivo enviado (UploadedFile do Streamlit, FileStorage do Flask, BytesIO...)
+    if hasattr(origem, "getvalue"):
+        return origem.getvalue()
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+    return origem.read()
+
+
+def _validar_colunas(colunas, colunas_obrigatorias, descricao):
+    faltantes = [coluna for coluna in colunas_obrigatorias or [] if coluna not in colunas]
+    if faltantes:
+        raise ValueError(f"Colunas obrigatórias não encontradas em {descricao}: {', '.join(faltantes)}")
+
+
+def importar_excel(origem, nome, colunas_obrigatorias=None, colunas=None, tipos=None):
+    """
+    Importa uma planilha Excel para o armazenamento colunar e retorna seus dados.
+
+    Se o mesmo conteúdo já foi importado, carrega o Parquet existente sem abrir o Excel.
+
+    Parâmetros:
+      origem: Caminho, bytes ou arquivo enviado (.xlsx).
+      nome (str): Nome do conjunto de dados (ex.: "pedidos", "caminhoes").
+      colunas_obrigatorias (list): Colunas que a planilha precisa ter (ValueError se faltar).
+      colunas (list): Colunas a carregar (padrão: todas).
+      tipos (dict): {coluna: "texto" | "numero"} aplicado na conversão do Excel (leitura_excel).
+
+    Retorna:
+      DataFrame
+    """
+    chave = None
+    if isinstance(origem, (str, os.PathLike)):
+        estado = os.stat(origem)
+        assinatura = (os.fspath(origem), estado.st_mtime_ns, estado.st_size)
+        chave = _hashes_por_arquivo.get(assinatura)
+    if chave is None or not os.path.exists(_caminho(nome, chave)):
+        dados = _ler_bytes(origem)
+        chave = hash_conteudo(dados)
+        with _lock:
+            os.makedirs(PASTA_COLUNAR, exist_ok=True)
+            if not os.path.exists(_caminho(nome, chave)):
+                # Cabeçalho validado antes das linhas: uma planilha inválida falha sem ser lida inteira
+                df = leitura_excel.ler_excel(io.BytesIO(dados), colunas_obrigatorias, tipos=tipos)
+                _gravar(df, nome, chave, apontar=False)
+                logging.info(f"Planilha '{nome}' importada para {_caminho(nome, chave)}")
+        if isinstance(origem, (str, os.PathLike)):
+            _hashes_por_arquivo[assinatura] = chave
+    _validar_colunas(_colunas_gravadas(nome, chave), colunas_obrigatorias, nome)
+    with _lock:
+        if versao_atual(nome) != chave:
+            _apontar(nome, chave)
+    return _carregar_versao(nome, chave, colunas)
+
+
+def _colunas_gravadas(nome, chave):
+    import pyarrow.parquet as pq
+    return pq.read_schema(_caminho(nome, chave)).names
+
+
+def _carregar_versao(nome, chave, colunas=None):
+    return pd.read_parquet(_caminho(nome, chave), columns=colunas, memory_map=True)
+
+
+def carregar(nome, colunas=None):
+    """
+    Carrega a versão atual do conjunto `nome` (Parquet com memory map).
+
+    Parâmetros:
+      nome (str): Nome do conjunto de dados.
+      colunas (list): Colunas a carregar (padrão: todas).
+
+    Retorna:
+      DataFrame
+
+    Lança:
+      FileNotFoundError: Se o conjunto não existir nem houver planilha legada para importar.
+    """
+    chave = versao_atual(nome)
+    if chave is None:
+        legado = PLANILHAS_LEGADAS.get(nome)
+        if legado is None or not os.path.exists(legado):
+            raise FileNotFoundError(f"Conjunto de dados '{nome}' não encontrado em {PASTA_COLUNAR}.")
+        return importar_excel(legado, nome, colunas=colunas, tipos=TIPOS_LEGADOS.get(nome))
+    return _carregar_versao(nome, chave, colunas)
+
+
+def salvar(df, nome):
+    """
+    Grava um DataFrame como a nova versão do conjunto `nome`, identificada pelo hash do conteúdo.
+
+    Retorna:
+      str: Hash da versão gravada.
+    """
+    df = df.reset_index(drop=True)
+    conteudo = pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+    chave = hash_conteudo(conteudo + "\x1f".join(map(str, df.columns)).encode("utf-8"))
+    with _lock:
+        os.makedirs(PASTA_COLUNAR, exist_ok=True)
+        _gravar(df, nome, chave)
+    return chave
+
+
+def exportar_excel(dados):
+    """
+    Gera um Excel (bytes) para download, a partir de um DataFrame ou do nome de um conjunto.
+    """
+    df = carregar(dados) if isinstance(dados, str) else dados
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
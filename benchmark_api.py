@@ -0,0 +1,85 @@
+"""
+Benchmark de vazão da API REST
+
+Gerador de carga local: mantém `concorrencia` clientes fazendo requisições seguidas a cada
+endpoint durante `duracao` segundos e informa requisições por segundo e latências.
+
+    python benchmark_api.py --url http://127.0.0.1:5000 --endpoints /mapa /resultado --concorrencia 4 --duracao 30
+
+A API precisa estar no ar (servidor.py / gunicorn.conf.py, ou python api.py para comparar
+com o servidor de desenvolvimento) e com Pedidos.xlsx e Caminhoes.xlsx já enviados (POST /upload).
+"""
+
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def _percentil(valores, p):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir(url, concorrencia=4, duracao=30.0, timeout=600.0):
+    """
+    Carga sobre uma URL por `duracao` segundos, com `concorrencia` clientes.
+
+    Retorna:
+      dict: 'requisicoes', 'erros', 'req_por_s', 'p50_ms', 'p95_ms' e 'max_ms'.
+    """
+    latencias, erros = [], [0]
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao
+
+    def cliente():
+        sessao = requests.Session()
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            try:
+                ok = sessao.get(url, timeout=timeout).status_code < 400
+            except requests.RequestException:
+                ok = False
+            decorrido = time.perf_counter() - inicio
+            with lock:
+                if ok:
+                    latencias.append(decorrido)
+                else:
+                    erros[0] += 1
+
+    inicio = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for _ in range(concorrencia):
+            executor.submit(cliente)
+    total_s = time.monotonic() - inicio
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros[0],
+        "req_por_s": len(latencias) / total_s,
+        "p50_ms": _percentil(latencias, 50) * 1000,
+        "p95_ms": _percentil(latencias, 95) * 1000,
+        "max_ms": max(latencias, default=float("nan")) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de vazão da API REST")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--endpoints", nargs="+", default=["/mapa", "/resultado"])
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--duracao", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<12} {'req/s':>8} {'ok':>6} {'erros':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for endpoint in args.endpoints:
+        r = medir(args.url.rstrip("/") + endpoint, args.concorrencia, args.duracao)
+        print(f"{endpoint:<12} {r['req_por_s']:>8.2f} {r['requisicoes']:>6} {r['erros']:>6} "
+              f"{r['p50_ms']:>9.0f} {r['p95_ms']:>9.0f} {r['max_ms']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
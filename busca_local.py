@@ -0,0 +1,346 @@
+"""
+Módulo de busca local para rotas
+
+Melhora rotas (listas de índices da matriz de distâncias) com 2-opt e Or-opt.
+
+- Cada movimento é avaliado pela diferença das arestas removidas/adicionadas (O(1)),
+  sem recalcular a distância total da rota.
+- Os candidatos são restritos às listas dos k vizinhos mais próximos de cada ponto,
+  com "don't-look bits": só voltam a ser examinados os pontos cujas arestas mudaram.
+- Rotas abertas (padrão) mantêm o primeiro ponto fixo, como o depósito, e terminam em qualquer ponto;
+  rotas fechadas (fechada=True) voltam ao início.
+- A matriz precisa ser simétrica: os deltas O(1) (e a inversão de trechos) supõem d[a][b] == d[b][a].
+  Com uma matriz assimétrica, um movimento "de melhora" pode piorar a rota e a busca não termina,
+  por isso ela é recusada com ValueError.
+
+Se o numba estiver instalado, os laços internos são compilados; caso contrário rodam em Python puro
+sobre listas, o que ainda melhora uma rota de 1.000 paradas em fração de segundo. O numba só é
+importado na primeira busca (_compilar_funcoes), não na importação do módulo.
+"""
+
+import os
+import threading
+import importlib.util
+
+import numpy as np
+
+USAR_NUMBA = (importlib.util.find_spec("numba") is not None
+              and os.environ.get("ROTEIRIZACAO_DESATIVAR_NUMBA") != "1")
+
+EPSILON = 1e-9
+
+_FUNCOES_COMPILAVEIS = []
+_compiladas = False
+_lock_compilacao = threading.Lock()
+
+
+def _compilar(funcao):
+    # Só registra: a compilação é feita por _compilar_funcoes, no primeiro uso
+    _FUNCOES_COMPILAVEIS.append(funcao.__name__)
+    return funcao
+
+
+def _compilar_funcoes():
+    """Substitui as funções registradas por _compilar pelas versões do numba (uma única vez)."""
+    global _compiladas
+    if _compiladas or not USAR_NUMBA:
+        return
+    with _lock_compilacao:
+        if not _compiladas:
+            from numba import njit
+            globais = globals()
+            for nome in _FUNCOES_COMPILAVEIS:
+                globais[nome] = njit(cache=True)(globais[nome])
+            _compiladas = True
+
+
+@_compilar
+def _dist(m, a, b):
+    # -1 representa o "fim aberto" de uma rota não fechada (custo zero)
+    if a < 0 or b < 0:
+        return 0.0
+    return m[a][b]
+
+
+@_compilar
+def _sucessor(tour, pos_no, n, fechada):
+    if pos_no + 1 < n:
+        return tour[pos_no + 1]
+    return tour[0] if fechada else -1
+
+
+@_compilar
+def _predecessor(tour, pos_no, n, fechada):
+    if pos_no > 0:
+        return tour[pos_no - 1]
+    return tour[n - 1] if fechada else -1
+
+
+@_compilar
+def _inverter(tour, pos, inicio, fim):
+    while inicio < fim:
+        a = tour[inicio]
+        b = tour[fim]
+        tour[inicio] = b
+        tour[fim] = a
+        pos[b] = inicio
+        pos[a] = fim
+        inicio += 1
+        fim -= 1
+
+
+@_compilar
+def _enfileirar(fila, na_fila, cauda, tamanho, no):
+    if not na_fila[no]:
+        na_fila[no] = True
+        fila[cauda % tamanho] = no
+        cauda += 1
+    return cauda
+
+
+@_compilar
+def _dois_opt(tour, pos, m, vizinhos, fechada):
+    """Laço principal do 2-opt com listas de vizinhos e don't-look bits. Retorna o ganho total."""
+    n = len(tour)
+    k = len(vizinhos[0]) if n > 0 else 0
+    fila = [0] * n
+    na_fila = [False] * n
+    cauda = 0
+    for i in range(n):
+        cauda = _enfileirar(fila, na_fila, cauda, n, tour[i])
+    cabeca = 0
+    ganho_total = 0.0
+
+    while cabeca < cauda:
+        a = fila[cabeca % n]
+        cabeca += 1
+        na_fila[a] = False
+        melhorou = True
+        while melhorou:
+            melhorou = False
+            i = pos[a]
+            # Direção 1: aresta (a, sucessor de a)
+            b = _sucessor(tour, i, n, fechada)
+            if b >= 0:
+                d_ab = _dist(m, a, b)
+                for t in range(k):
+                    c = vizinhos[a][t]
+                    d_ac = _dist(m, a, c)
+                    if d_ac >= d_ab:
+                        break
+                    j = pos[c]
+                    d = _sucessor(tour, j, n, fechada)
+                    if c == b or d == a:
+                        continue
+                    delta = d_ac + _dist(m, b, d) - d_ab - _dist(m, c, d)
+                    if delta < -EPSILON:
+                        if i < j:
+                            _inverter(tour, pos, i + 1, j)
+                        else:
+                            _inverter(tour, pos, j + 1, i)
+                        ganho_total -= delta
+                        for no in (a, b, c, d):
+                            if no >= 0:
+                                cauda = _enfileirar(fila, na_fila, cauda, n, no)
+                        melhorou = True
+                        break
+            if melhorou:
+                continue
+            # Direção 2: aresta (predecessor de a, a)
+            i = pos[a]
+            b = _predecessor(tour, i, n, fechada)
+            if b < 0:
+                continue
+            d_ab = _dist(m, a, b)
+            for t in range(k):
+                c = vizinhos[a][t]
+                d_ac = _dist(m, a, c)
+                if d_ac >= d_ab:
+                    break
+                j = pos[c]
+                d = _predecessor(tour, j, n, fechada)
+                if c == b or d == a or d < 0:
+                    continue
+                delta = d_ac + _dist(m, b, d) - d_ab - _dist(m, c, d)
+                if delta < -EPSILON:
+                    if i < j:
+                        _inverter(tour, pos, i, j - 1)
+                    else:
+                        _inverter(tour, pos, j, i - 1)
+                    ganho_total -= delta
+                    for no in (a, b, c, d):
+                        cauda = _enfileirar(fila, na_fila, cauda, n, no)
+                    melhorou = True
+                    break
+    return ganho_total
+
+
+@_compilar
+def _mover_segmento(tour, pos, i, tamanho, j, invertido):
+    """Move tour[i:i+tamanho] para logo depois da posição j (fora do segmento)."""
+    segmento = [tour[i + s] for s in range(tamanho)]
+    if invertido:
+        segmento = segmento[::-1]
+    if j > i:
+        for p in range(i + tamanho, j + 1):
+            tour[p - tamanho] = tour[p]
+        inicio = j - tamanho + 1
+        fim = j
+    else:
+        for p in range(i - 1, j, -1):
+            tour[p + tamanho] = tour[p]
+        inicio = j + 1
+        fim = i + tamanho - 1
+    for s in range(tamanho):
+        if j > i:
+            tour[inicio + s] = segmento[s]
+        else:
+            tour[j + 1 + s] = segmento[s]
+    for p in range(min(i, inicio), max(fim, i + tamanho - 1) + 1):
+        pos[tour[p]] = p
+
+
+@_compilar
+def _or_opt(tour, pos, m, vizinhos, fechada, tamanho_max):
+    """Move segmentos de 1..tamanho_max pontos para junto de um vizinho próximo. Retorna o ganho total."""
+    n = len(tour)
+    k = len(vizinhos[0]) if n > 0 else 0
+    ganho_total = 0.0
+    melhorou = True
+    while melhorou:
+        melhorou = False
+        for inicio_busca in range(n):
+            for tamanho in range(1, tamanho_max + 1):
+                i = inicio_busca
+                if i + tamanho > n or (not fechada and i == 0) or tamanho >= n - 1:
+                    continue
+                s1 = tour[i]
+                s2 = tour[i + tamanho - 1]
+                p = _predecessor(tour, i, n, fechada)
+                x = _sucessor(tour, i + tamanho - 1, n, fechada)
+                ganho_remocao = _dist(m, p, s1) + _dist(m, s2, x) - _dist(m, p, x)
+                if ganho_remocao <= EPSILON:
+                    continue
+                aplicado = False
+                for ponta in (s1, s2):
+                    for t in range(k):
+                        v = vizinhos[ponta][t]
+                        if _dist(m, ponta, v) >= ganho_remocao:
+                            break
+                        jv = pos[v]
+                        # Inserção depois de v e depois do predecessor de v
+                        for j in (jv, jv - 1):
+                            if j < 0:
+                                if not fechada:
+                                    continue
+                                j = n - 1
+                            if i <= j < i + tamanho:
+                                continue
+                            c = tour[j]
+                            if c == p:
+                                continue
+                            e = _sucessor(tour, j, n, fechada)
+                            d_ce = _dist(m, c, e)
+                            custo_direto = _dist(m, c, s1) + _dist(m, s2, e) - d_ce
+                            custo_invertido = _dist(m, c, s2) + _dist(m, s1, e) - d_ce
+                            invertido = custo_invertido < custo_direto
+                            custo = custo_invertido if invertido else custo_direto
+                            if custo < ganho_remocao - EPSILON:
+                                _mover_segmento(tour, pos, i, tamanho, j, invertido)
+                                ganho_total += ganho_remocao - custo
+                                aplicado = True
+                                break
+                        if aplicado:
+                            break
+                    if aplicado:
+                        break
+                if aplicado:
+                    melhorou = True
+                    break
+    return ganho_total
+
+
+def vizinhos_mais_proximos(matriz, k=10):
+    """
+    Retorna um array (n, k) com os índices dos k vizinhos mais próximos de cada ponto,
+    ordenados por distância crescente (o próprio ponto é excluído).
+    """
+    matriz = np.asarray(matriz)
+    n = len(matriz)
+    k = max(0, min(k, n - 1))
+    if k == 0:
+        return np.zeros((n, 0), dtype=np.int64)
+    distancias = matriz.astype(np.float64, copy=True)
+    np.fill_diagonal(distancias, np.inf)
+    candidatos = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+    ordem = np.take_along_axis(distancias, candidatos, axis=1).argsort(axis=1)
+    return np.take_along_axis(candidatos, ordem, axis=1).astype(np.int64)
+
+
+def _preparar(rota, matriz, k, vizinhos):
+    _compilar_funcoes()
+    rota = [int(r) for r in rota]
+    indices = np.asarray(rota, dtype=np.int64)
+    # A busca roda sobre a submatriz dos pontos da rota, com índices locais 0..n-1
+    sub = np.asarray(matriz, dtype=np.float64)[np.ix_(indices, indices)]
+    if not np.allclose(sub, sub.T):
+        raise ValueError("A busca local (2-opt/Or-opt) exige uma matriz de distâncias simétrica.")
+    if vizinhos is None:
+        vizinhos = vizinhos_mais_proximos(sub, k)
+    n = len(rota)
+    tour = np.arange(n, dtype=np.int64)
+    pos = np.arange(n, dtype=np.int64)
+    if not USAR_NUMBA:
+        sub, vizinhos, tour, pos = sub.tolist(), np.asarray(vizinhos).tolist(), tour.tolist(), pos.tolist()
+    return indices, sub, vizinhos, tour, pos
+
+
+def dois_opt(rota, matriz, k=10, fechada=False, vizinhos=None):
+    """
+    Aplica 2-opt com avaliação O(1) por movimento e listas de k vizinhos.
+
+    Parâmetros:
+      rota (list): Ordem inicial (índices da matriz). Em rotas abertas, o primeiro ponto é fixo.
+      matriz (ndarray): Matriz de distâncias (ex.: distancias.matriz_distancias).
+      k (int): Tamanho das listas de vizinhos candidatos.
+      fechada (bool): Se True, considera o retorno do último ponto ao primeiro.
+      vizinhos (ndarray): Listas de vizinhos já calculadas para a rota (opcional).
+
+    Retorna:
+      list: Rota melhorada (índices da matriz).
+
+    Levanta:
+      ValueError: Se a matriz não for simétrica.
+    """
+    return otimizar_rota(rota, matriz, k=k, fechada=fechada, or_opt=False, vizinhos=vizinhos)
+
+
+def otimizar_rota(rota, matriz, k=10, fechada=False, or_opt=True, tamanho_segmento=3, vizinhos=None):
+    """
+    Alterna 2-opt e Or-opt até que nenhum movimento melhore a rota.
+
+    Parâmetros:
+      rota (list): Ordem inicial (índices da matriz). Em rotas abertas, o primeiro ponto é fixo.
+      matriz (ndarray): Matriz de distâncias.
+      k (int): Tamanho das listas de vizinhos candidatos.
+      fechada (bool): Se True, considera o retorno do último ponto ao primeiro.
+      or_opt (bool): Se True, também move segmentos de até `tamanho_segmento` pontos.
+      tamanho_segmento (int): Tamanho máximo dos segmentos do Or-opt.
+      vizinhos (ndarray): Listas de vizinhos já calculadas para a rota (opcional).
+
+    Retorna:
+      list: Rota melhorada (índices da matriz).
+
+    Levanta:
+      ValueError: Se a matriz não for simétrica.
+    """
+    if len(rota) < 4:
+        return list(rota)
+    indices, sub, vizinhos, tour, pos = _preparar(rota, matriz, k, vizinhos)
+    while True:
+        ganho = _dois_opt(tour, pos, sub, vizinhos, fechada)
+        if or_opt:
+            ganho += _or_opt(tour, pos, sub, vizinhos, fechada, tamanho_segmento)
+        if not or_opt or ganho <= EPSILON:
+            break
+    return indices[np.asarray(tour, dtype=np.int64)].tolist()
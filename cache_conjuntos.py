@@ -0,0 +1,98 @@
+"""
+Módulo de cache de conjuntos de dados em memória
+
+Guarda, no processo, os DataFrames já preparados (lidos, validados e geocodificados) de cada
+arquivo enviado, para que os endpoints seguintes não repitam o trabalho:
+
+- A chave inclui o hash do conteúdo do arquivo (armazenamento.hash_arquivo): um arquivo novo
+  gera outra chave, e a versão antiga deixa de ser usada e sai do cache pelo LRU.
+- O cache é limitado pela memória ocupada pelos DataFrames (memory_usage(deep=True)), descartando
+  os usados há mais tempo.
+- Requisições simultâneas pela mesma chave preparam o conjunto uma única vez.
+"""
+
+import threading
+from collections import OrderedDict
+
+LIMITE_MEMORIA_PADRAO = 256 * 1024 * 1024
+
+
+def tamanho_em_memoria(df):
+    """Bytes ocupados por um DataFrame, incluindo o conteúdo das colunas de texto."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class CacheConjuntos:
+    """
+    Cache LRU de DataFrames limitado pela memória.
+
+    Parâmetros:
+      limite_bytes (int): Memória máxima somada dos conjuntos guardados. Um conjunto maior que o
+        limite é retornado, mas não é guardado.
+    """
+
+    def __init__(self, limite_bytes=LIMITE_MEMORIA_PADRAO):
+        self._limite_bytes = limite_bytes
+        self._conjuntos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._preparando = {}
+
+    @property
+    def bytes_em_uso(self):
+        return self._bytes
+
+    def __contains__(self, chave):
+        with self._lock:
+            return chave in self._conjuntos
+
+    def obter(self, chave, preparar):
+        """
+        Retorna o conjunto da chave, preparando-o com preparar() se não estiver no cache.
+
+        O DataFrame retornado é compartilhado entre as requisições: quem precisar alterá-lo deve
+        trabalhar sobre uma cópia.
+
+        Parâmetros:
+          chave (tuple): Identificação do conjunto, com o hash do arquivo de origem.
+          preparar (callable): Função sem argumentos que retorna o DataFrame.
+
+        Retorna:
+          DataFrame: O conjunto preparado.
+        """
+        with self._lock:
+            if chave in self._conjuntos:
+                self._conjuntos.move_to_end(chave)
+                return self._conjuntos[chave][0]
+            trava = self._preparando.setdefault(chave, threading.Lock())
+
+        with trava:
+            with self._lock:
+                if chave in self._conjuntos:
+                    self._conjuntos.move_to_end(chave)
+                    return self._conjuntos[chave][0]
+            try:
+                df = preparar()
+                self._guardar(chave, df)
+            finally:
+                with self._lock:
+                    self._preparando.pop(chave, None)
+        return df
+
+    def _guardar(self, chave, df):
+        tamanho = tamanho_em_memoria(df)
+        if tamanho > self._limite_bytes:
+            return
+        with self._lock:
+            self._conjuntos[chave] = (df, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self._limite_bytes:
+                _, (_, liberado) = self._conjuntos.popitem(last=False)
+                self._bytes -= liberado
+
+    def descartar(self, prefixo):
+        """Remove os conjuntos cuja chave começa por `prefixo` (ex.: ("pedidos",))."""
+        with self._lock:
+            for chave in [c for c in self._conjuntos if c[:len(prefixo)] == prefixo]:
+                _, tamanho = self._conjuntos.pop(chave)
+                self._bytes -= tamanho
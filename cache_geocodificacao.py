@@ -0,0 +1,196 @@
+"""
+Módulo de cache de geocodificação
+
+Armazena as coordenadas já geocodificadas em um único banco SQLite (modo WAL),
+compartilhado pelo Dashboard (subir_pedidos / ia_analise_pedidos), pelo módulo geocoding e pela API.
+
+- Consultas em lote com `IN (...)` apenas para os endereços únicos de um envio.
+- Gravação somente das entradas novas (INSERT OR IGNORE), sem reescrever o cache inteiro.
+- Importação única dos caches antigos em Excel (coordenadas_salvas.xlsx e coordenadas_cache.xlsx).
+"""
+
+import os
+import math
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from config import DATABASE_FOLDER
+
+CACHE_DB = os.path.join(DATABASE_FOLDER, "geocodificacao.db")
+PLANILHAS_LEGADAS = ("coordenadas_salvas.xlsx", "coordenadas_cache.xlsx")
+
+# Limite seguro de parâmetros por consulta no SQLite
+LOTE_CONSULTA = 900
+
+_conexoes = threading.local()
+
+
+def _criar_tabela(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS coordenadas (
+            endereco TEXT PRIMARY KEY,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            fonte TEXT,
+            atualizado_em TEXT
+        ) WITHOUT ROWID
+    ''')
+    conn.commit()
+
+
+def conectar(caminho=None):
+    """
+    Retorna a conexão SQLite do cache para a thread atual, criando o banco se necessário.
+
+    Na primeira criação do banco, os caches antigos em Excel são importados automaticamente.
+    """
+    caminho = caminho or CACHE_DB
+    por_caminho = getattr(_conexoes, "por_caminho", None)
+    if por_caminho is None:
+        por_caminho = _conexoes.por_caminho = {}
+    conn = por_caminho.get(caminho)
+    if conn is not None:
+        return conn
+
+    novo = not os.path.exists(caminho)
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    conn = sqlite3.connect(caminho)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _criar_tabela(conn)
+    por_caminho[caminho] = conn
+    if novo and caminho == CACHE_DB:
+        importar_planilhas_legadas(caminho=caminho)
+    return conn
+
+
+def fechar():
+    """
+    Fecha as conexões da thread atual (ex.: antes de um fork, para que os processos filhos
+    abram as suas em vez de herdar a do processo principal).
+    """
+    por_caminho = getattr(_conexoes, "por_caminho", None) or {}
+    for conn in por_caminho.values():
+        conn.close()
+    por_caminho.clear()
+
+
+def coordenada_valida(coords):
+    """
+    Indica se uma tupla (latitude, longitude) pode ser guardada no cache.
+    """
+    if not coords or len(coords) != 2:
+        return False
+    lat, lon = coords
+    if lat is None or lon is None:
+        return False
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return False
+    if math.isnan(lat) or math.isnan(lon):
+        return False
+    return not (lat == 0 and lon == 0)
+
+
+def buscar_coordenadas(enderecos, caminho=None):
+    """
+    Busca em lote as coordenadas conhecidas de uma coleção de endereços.
+
+    Parâmetros:
+      enderecos (iterable): Endereços a consultar (duplicatas são ignoradas).
+      caminho (str): Caminho do banco; usa CACHE_DB se None.
+
+    Retorna:
+      dict: {endereco: (latitude, longitude)} apenas para os endereços encontrados.
+    """
+    unicos = list(dict.fromkeys(e for e in enderecos if isinstance(e, str)))
+    if not unicos:
+        return {}
+    conn = conectar(caminho)
+    encontrados = {}
+    for inicio in range(0, len(unicos), LOTE_CONSULTA):
+        lote = unicos[inicio:inicio + LOTE_CONSULTA]
+        marcadores = ",".join("?" * len(lote))
+        cursor = conn.execute(
+            f"SELECT endereco, latitude, longitude FROM coordenadas WHERE endereco IN ({marcadores})",
+            lote
+        )
+        for endereco, lat, lon in cursor:
+            encontrados[endereco] = (lat, lon)
+    return encontrados
+
+
+def salvar_coordenadas(coordenadas, fonte=None, caminho=None):
+    """
+    Grava no cache apenas as coordenadas novas e válidas.
+
+    Parâmetros:
+      coordenadas (dict): {endereco: (latitude, longitude)}.
+      fonte (str): Origem das coordenadas (ex.: "opencage", "nominatim", "xlsx").
+      caminho (str): Caminho do banco; usa CACHE_DB se None.
+
+    Retorna:
+      int: Número de linhas efetivamente inseridas.
+    """
+    agora = datetime.now().isoformat(timespec="seconds")
+    linhas = [
+        (endereco, float(coords[0]), float(coords[1]), fonte, agora)
+        for endereco, coords in coordenadas.items()
+        if isinstance(endereco, str) and coordenada_valida(coords)
+    ]
+    if not linhas:
+        return 0
+    conn = conectar(caminho)
+    antes = conn.total_changes
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO coordenadas (endereco, latitude, longitude, fonte, atualizado_em) "
+            "VALUES (?, ?, ?, ?, ?)",
+            linhas
+        )
+    return conn.total_changes - antes
+
+
+def importar_planilha(arquivo, caminho=None):
+    """
+    Importa um cache antigo em Excel (colunas 'Endereço', 'Latitude', 'Longitude').
+
+    Retorna:
+      int: Número de endereços novos importados.
+    """
+    try:
+        df = pd.read_excel(arquivo, engine="openpyxl", usecols=["Endereço", "Latitude", "Longitude"])
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logging.error(f"Erro ao importar o cache '{arquivo}': {e}")
+        return 0
+    coordenadas = dict(zip(df["Endereço"], zip(df["Latitude"], df["Longitude"])))
+    return salvar_coordenadas(coordenadas, fonte="xlsx", caminho=caminho)
+
+
+def importar_planilhas_legadas(pasta=DATABASE_FOLDER, caminho=None):
+    """
+    Importação única dos caches em Excel existentes na pasta de dados.
+
+    Retorna:
+      int: Total de endereços novos importados.
+    """
+    total = 0
+    for nome in PLANILHAS_LEGADAS:
+        importados = importar_planilha(os.path.join(pasta, nome), caminho=caminho)
+        if importados:
+            logging.info(f"{importados} coordenadas importadas de {nome}.")
+        total += importados
+    return total
+
+
+if __name__ == "__main__":
+    importados = importar_planilhas_legadas()
+    total = conectar().execute("SELECT COUNT(*) FROM coordenadas").fetchone()[0]
+    print(f"{importados} coordenadas novas importadas; {total} endereços em {CACHE_DB}.")
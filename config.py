@@ -3,19 +3,53 @@ Configuração do sistema de roteirização
 
 - Define parâmetros gerais, como pasta de dados.
 - Utiliza variáveis de ambiente para informações sensíveis (por exemplo, chave da API).
+- Só define valores: importar este módulo não cria pastas nem arquivos (quem grava em
+  DATABASE_FOLDER cria a pasta quando precisa).
 """
 
 import os
 
 DATABASE_FOLDER = "database"
-if not os.path.exists(DATABASE_FOLDER):
-    os.makedirs(DATABASE_FOLDER)
 
 # Parâmetros de geocodificação
 GEOCODER_USER_AGENT = os.environ.get("GEOCODER_USER_AGENT", "logistica_app")
 OPENCAGE_API_KEY = os.environ.get("OPENCAGE_API_KEY", "6f522c67add14152926990afbe127384")
+OPENCAGE_URL = os.environ.get("OPENCAGE_URL", "https://api.opencagedata.com/geocode/v1/json")
+NOMINATIM_URL = os.environ.get("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+
+# Limites de requisições por segundo de cada provedor e paralelismo da geocodificação em lote
+OPENCAGE_REQ_POR_SEGUNDO = float(os.environ.get("OPENCAGE_REQ_POR_SEGUNDO", "10"))
+NOMINATIM_REQ_POR_SEGUNDO = float(os.environ.get("NOMINATIM_REQ_POR_SEGUNDO", "1"))
+GEOCODER_MAX_WORKERS = int(os.environ.get("GEOCODER_MAX_WORKERS", "8"))
+
+# Coordenadas manuais para endereços que nenhum provedor resolve
+COORDENADAS_MANUAIS = {
+    "Rua Araújo Leite, 146, Centro, Piedade, São Paulo, Brasil": (-23.71241093449893, -47.41796911054548)
+}
+
+# Orçamento de tempo (segundos) da busca do VRP no OR-Tools
+VRP_TEMPO_LIMITE_S = float(os.environ.get("VRP_TEMPO_LIMITE_S", "30"))
+
+# Modelo de ilhas dos algoritmos genéticos: número de processos (1 = serial, 0 = um por núcleo)
+# e orçamento global de tempo (segundos, 0 = sem limite)
+GA_ILHAS = int(os.environ.get("GA_ILHAS", "1"))
+GA_TEMPO_LIMITE_S = float(os.environ.get("GA_TEMPO_LIMITE_S", "0")) or None
+
+# Processos da fila de tarefas assíncronas da API (POST /jobs)
+TAREFAS_PROCESSOS = int(os.environ.get("TAREFAS_PROCESSOS", "2"))
+
+# Memória máxima (MB) dos conjuntos preparados que a API mantém entre /upload, /resultado e /mapa
+CONJUNTOS_MEMORIA_MB = float(os.environ.get("CONJUNTOS_MEMORIA_MB", "256"))
+
+# Servidor de produção da API (gunicorn -c gunicorn.conf.py "servidor:criar_app()"):
+# endereço, processos (0 = um por núcleo), threads por processo e tempo limite de uma requisição.
+# Um processo por padrão: a fila de tarefas (POST /jobs) e o progresso (GET /progresso/<id>)
+# ficam na memória do processo, e com vários workers o cliente pode cair num que não os conhece
+API_BIND = os.environ.get("API_BIND", "0.0.0.0:5000")
+API_PROCESSOS = int(os.environ.get("API_PROCESSOS", "1"))
+API_THREADS = int(os.environ.get("API_THREADS", "4"))
+API_TEMPO_LIMITE_S = int(os.environ.get("API_TEMPO_LIMITE_S", "300"))
 
 # Parâmetros de rota de partida
 endereco_partida = "Avenida Antonio Ortega, 3604 - Pinhal, Cabreúva - SP, São Paulo, Brasil"
-endereco_partida_coords = (-23,24468, -47,05971
-)
+endereco_partida_coords = (-23.24468, -47.05971)
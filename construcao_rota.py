@@ -0,0 +1,128 @@
+"""
+Módulo de construção de rotas
+
+Heurística do vizinho mais próximo sobre uma matriz de distâncias já calculada.
+
+- Cada passo escolhe o próximo ponto com um argmin mascarado do NumPy (sem listas de tuplas).
+- A rota pode partir do depósito (config.endereco_partida_coords), informado como o vetor
+  de distâncias do depósito até cada ponto, sem aumentar a matriz.
+- O modo multi-início executa k partidas diferentes, opcionalmente num pool de processos,
+  e devolve a melhor.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Abaixo deste número de pontos o custo de criar processos supera o ganho do paralelismo
+MIN_PONTOS_PROCESSOS = 500
+
+_matriz_processo = None
+_deposito_processo = None
+
+
+def vizinho_mais_proximo(matriz, inicio=0):
+    """
+    Constrói uma rota pelo vizinho mais próximo a partir do ponto `inicio`.
+
+    Retorna:
+      ndarray: Ordem dos índices da matriz.
+    """
+    n = len(matriz)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rota = np.empty(n, dtype=np.int64)
+    visitado = np.zeros(n, dtype=bool)
+    atual = int(inicio)
+    rota[0] = atual
+    visitado[atual] = True
+    for passo in range(1, n):
+        atual = int(np.where(visitado, np.inf, matriz[atual]).argmin())
+        rota[passo] = atual
+        visitado[atual] = True
+    return rota
+
+
+def custo_rota(rota, matriz, distancias_deposito=None, fechada=False):
+    """
+    Custo de uma rota; com depósito, inclui a saída do depósito (e o retorno se fechada=True).
+    """
+    custo = float(matriz[rota[:-1], rota[1:]].sum(dtype=np.float64)) if len(rota) > 1 else 0.0
+    if distancias_deposito is not None and len(rota):
+        custo += float(distancias_deposito[rota[0]])
+        if fechada:
+            custo += float(distancias_deposito[rota[-1]])
+    elif fechada and len(rota) > 1:
+        custo += float(matriz[rota[-1], rota[0]])
+    return custo
+
+
+def _avaliar_inicio(matriz, inicio, distancias_deposito, fechada):
+    rota = vizinho_mais_proximo(matriz, inicio)
+    return custo_rota(rota, matriz, distancias_deposito, fechada), rota
+
+
+def _iniciar_processo(matriz, distancias_deposito):
+    global _matriz_processo, _deposito_processo
+    _matriz_processo = matriz
+    _deposito_processo = distancias_deposito
+
+
+def _avaliar_inicio_processo(inicio, fechada):
+    return _avaliar_inicio(_matriz_processo, inicio, _deposito_processo, fechada)
+
+
+def escolher_inicios(matriz, n_inicios, distancias_deposito=None, semente=42):
+    """
+    Escolhe os pontos de partida do multi-início: os mais próximos do depósito, se houver,
+    ou o ponto 0 mais pontos sorteados (semente fixa, para resultados reproduzíveis).
+    """
+    n = len(matriz)
+    n_inicios = max(1, min(n_inicios, n))
+    if distancias_deposito is not None:
+        return np.argsort(distancias_deposito, kind="stable")[:n_inicios].tolist()
+    rng = np.random.default_rng(semente)
+    outros = rng.permutation(np.arange(1, n))[:n_inicios - 1]
+    return [0] + outros.tolist()
+
+
+def rota_vizinho_mais_proximo(matriz, distancias_deposito=None, n_inicios=1, fechada=False,
+                              processos=None, semente=42):
+    """
+    Vizinho mais próximo com multi-início opcional.
+
+    Parâmetros:
+      matriz (ndarray): Matriz de distâncias já calculada (ex.: distancias.matriz_distancias).
+      distancias_deposito (ndarray): Distância do depósito até cada ponto. Se informado, a rota parte dele.
+      n_inicios (int): Número de partidas diferentes; a melhor rota é retornada.
+      fechada (bool): Se True, o custo inclui o retorno ao início (ou ao depósito).
+      processos (int): Tamanho do pool de processos; None usa os núcleos disponíveis
+        e 1 executa tudo no processo atual.
+      semente (int): Semente para o sorteio das partidas.
+
+    Retorna:
+      list: Ordem dos índices da matriz.
+      float: Custo da rota.
+    """
+    matriz = np.asarray(matriz)
+    n = len(matriz)
+    if n == 0:
+        return [], 0.0
+    inicios = escolher_inicios(matriz, n_inicios, distancias_deposito, semente)
+
+    if processos is None:
+        processos = os.cpu_count() or 1
+    processos = min(processos, len(inicios))
+    if processos > 1 and n >= MIN_PONTOS_PROCESSOS:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo,
+                                 initargs=(matriz, distancias_deposito)) as executor:
+            resultados = list(executor.map(_avaliar_inicio_processo, inicios, [fechada] * len(inicios)))
+    else:
+        resultados = [_avaliar_inicio(matriz, inicio, distancias_deposito, fechada) for inicio in inicios]
+
+    melhor_custo, melhor_rota = min(resultados, key=lambda r: r[0])
+    if distancias_deposito is None and fechada:
+        # Em um ciclo o ponto de partida é arbitrário: gira a rota para começar no índice 0
+        melhor_rota = np.roll(melhor_rota, -int(np.flatnonzero(melhor_rota == 0)[0]))
+    return melhor_rota.tolist(), melhor_custo
@@ -1,53 +1,306 @@
+"""
+Camada única de persistência SQLite (frota, pedidos, planilhas de IA e execuções de roteirização)
+
+- Uma conexão por thread (threading.local), reaproveitada entre chamadas, em modo WAL.
+- Gravações em lote com executemany e upserts (ON CONFLICT), numa única transação.
+- Índices por placa, endereço e id da execução, para consultas de histórico sem abrir planilhas.
+"""
+
+import os
+import json
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+BANCO_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "roteirizacao.db")
+
+ESQUEMA = '''
+    CREATE TABLE IF NOT EXISTS ia_planilhas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        dados BLOB NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS frota (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        placa TEXT UNIQUE,
+        transportador TEXT,
+        modelo TEXT,
+        capacidade REAL,
+        capacidade_cx REAL,
+        disponivel TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS pedidos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        numero_pedido TEXT UNIQUE,
+        endereco TEXT NOT NULL,
+        bairro TEXT,
+        cidade TEXT,
+        peso_itens REAL,
+        qtde_itens REAL,
+        latitude REAL,
+        longitude REAL,
+        ordem_entrega INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_pedidos_endereco ON pedidos (endereco);
+
+    CREATE TABLE IF NOT EXISTS execucoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        criado_em TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        parametros TEXT,
+        n_pedidos INTEGER,
+        n_cargas INTEGER,
+        distancia_km REAL
+    );
+
+    CREATE TABLE IF NOT EXISTS alocacoes (
+        execucao_id INTEGER NOT NULL REFERENCES execucoes (id) ON DELETE CASCADE,
+        numero_pedido TEXT,
+        endereco TEXT,
+        placa TEXT,
+        carga INTEGER,
+        regiao INTEGER,
+        ordem_entrega INTEGER,
+        latitude REAL,
+        longitude REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_alocacoes_execucao ON alocacoes (execucao_id);
+    CREATE INDEX IF NOT EXISTS idx_alocacoes_placa ON alocacoes (placa);
+    CREATE INDEX IF NOT EXISTS idx_alocacoes_endereco ON alocacoes (endereco);
+'''
+
+# Colunas das planilhas -> colunas das tabelas
+COLUNAS_FROTA = {
+    'Placa': 'placa', 'Transportador': 'transportador', 'Descrição Veículo': 'modelo',
+    'Capac. Kg': 'capacidade', 'Capac. Cx': 'capacidade_cx', 'Disponível': 'disponivel',
+}
+COLUNAS_PEDIDOS = {
+    'Nº Pedido': 'numero_pedido', 'Endereço Completo': 'endereco', 'Bairro de Entrega': 'bairro',
+    'Cidade de Entrega': 'cidade', 'Peso dos Itens': 'peso_itens', 'Qtde. dos Itens': 'qtde_itens',
+    'Latitude': 'latitude', 'Longitude': 'longitude', 'Ordem de Entrega TSP': 'ordem_entrega',
+}
+COLUNAS_ALOCACOES = {
+    'Nº Pedido': 'numero_pedido', 'Endereço Completo': 'endereco', 'Placa': 'placa', 'Carga': 'carga',
+    'Região': 'regiao', 'Ordem de Entrega TSP': 'ordem_entrega', 'Latitude': 'latitude', 'Longitude': 'longitude',
+}
+
+
+def _linhas(df, mapeamento, extras=None):
+    """
+    Converte as colunas mapeadas de um DataFrame em tuplas prontas para executemany
+    (NaN vira NULL e tipos NumPy viram tipos Python). Colunas ausentes ficam NULL.
+    """
+    colunas = list(mapeamento.values()) + list(extras or {})
+    dados = pd.DataFrame({
+        destino: df[origem] if origem in df.columns else None for origem, destino in mapeamento.items()
+    }, index=df.index)
+    for nome, valor in (extras or {}).items():
+        dados[nome] = valor
+    dados = dados.astype(object).where(dados.notna(), None)
+    return colunas, [tuple(v.item() if hasattr(v, "item") else v for v in linha) for linha in dados.itertuples(index=False)]
+
+
+class Database:
+    """
+    Acesso ao banco SQLite da aplicação.
+
+    Parâmetros:
+      caminho (str): Arquivo do banco (padrão: database/roteirizacao.db).
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or BANCO_PADRAO
+        self._local = threading.local()
+
+    @property
+    def conexao(self):
+        """Conexão da thread atual (criada na primeira chamada e reaproveitada)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transacao(self):
+        """Executa um bloco numa transação: commit no fim, rollback em caso de erro."""
+        conn = self.conexao
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def close(self):
+        """Fecha a conexão da thread atual."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def create_tables(self):
+        with self.transacao() as conn:
+            conn.executescript(ESQUEMA)
+
+    def _consultar(self, sql, parametros=()):
+        return pd.read_sql_query(sql, self.conexao, params=parametros)
+
+    # ---------- Frota ----------
+
+    def salvar_frota(self, caminhoes_df):
+        """
+        Grava (upsert por placa) todos os caminhões de um DataFrame com as colunas da planilha de frota.
+        Caminhões sem placa são sempre inseridos como novos registros.
+
+        Retorna:
+          int: Número de linhas gravadas.
+        """
+        colunas, linhas = _linhas(caminhoes_df, COLUNAS_FROTA)
+        atualizacao = ", ".join(f"{c} = excluded.{c}" for c in colunas if c != "placa")
+        with self.transacao() as conn:
+            conn.executemany(
+                f"INSERT INTO frota ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+                f"ON CONFLICT (placa) DO UPDATE SET {atualizacao}",
+                linhas,
+            )
+        return len(linhas)
+
+    def insert_frota(self, modelo, capacidade, placa=None):
+        self.salvar_frota(pd.DataFrame([{'Descrição Veículo': modelo, 'Capac. Kg': capacidade, 'Placa': placa}]))
+
+    def atualizar_caminhao(self, id, modelo, capacidade, placa):
+        with self.transacao() as conn:
+            conn.execute("UPDATE frota SET modelo = ?, capacidade = ?, placa = ? WHERE id = ?",
+                         (modelo, capacidade, placa, id))
+
+    def consultar_frota(self):
+        return self._consultar("SELECT * FROM frota ORDER BY id")
+
+    # ---------- Pedidos ----------
+
+    def salvar_pedidos(self, pedidos_df):
+        """
+        Grava os pedidos de um DataFrame; pedidos com o mesmo 'Nº Pedido' são atualizados.
+
+        Retorna:
+          int: Número de linhas gravadas.
+        """
+        df = pedidos_df
+        if 'Endereço Completo' not in df.columns and 'Endereço de Entrega' in df.columns:
+            df = df.assign(**{'Endereço Completo': df['Endereço de Entrega']})
+        colunas, linhas = _linhas(df, COLUNAS_PEDIDOS)
+        atualizacao = ", ".join(f"{c} = excluded.{c}" for c in colunas if c != "numero_pedido")
+        with self.transacao() as conn:
+            conn.executemany(
+                f"INSERT INTO pedidos ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+                f"ON CONFLICT (numero_pedido) DO UPDATE SET {atualizacao}",
+                linhas,
+            )
+        return len(linhas)
+
+    def inserir_pedido(self, endereco, latitude, longitude, peso_itens, ordem_entrega):
+        self.salvar_pedidos(pd.DataFrame([{
+            'Endereço Completo': endereco, 'Latitude': latitude, 'Longitude': longitude,
+            'Peso dos Itens': peso_itens, 'Ordem de Entrega TSP': ordem_entrega,
+        }]))
+
+    def salvar_coordenadas(self, coordenadas):
+        """
+        Atualiza latitude/longitude dos pedidos a partir de {endereco: (lat, lon)}.
+        """
+        if not coordenadas:
+            return 0
+        linhas = [(float(lat), float(lon), endereco) for endereco, (lat, lon) in coordenadas.items()]
+        with self.transacao() as conn:
+            conn.executemany("UPDATE pedidos SET latitude = ?, longitude = ? WHERE endereco = ?", linhas)
+        return len(linhas)
+
+    def consultar_pedidos(self):
+        return self._consultar("SELECT * FROM pedidos ORDER BY id")
+
+    # ---------- Planilhas de IA ----------
+
+    def insert_ia_planilha(self, nome, dados):
+        with self.transacao() as conn:
+            conn.execute("INSERT INTO ia_planilhas (nome, dados) VALUES (?, ?)", (nome, dados))
+
+    def query_ia_planilhas(self):
+        return self.conexao.execute("SELECT * FROM ia_planilhas").fetchall()
+
+    # ---------- Execuções de roteirização ----------
+
+    def registrar_execucao(self, pedidos_df, parametros=None, distancia_km=None):
+        """
+        Guarda uma execução de roteirização e a alocação de cada pedido (placa, carga, região, ordem).
+
+        Parâmetros:
+          pedidos_df (DataFrame): Pedidos roteirizados.
+          parametros (dict): Parâmetros usados (gravados como JSON).
+          distancia_km (float): Distância total da roteirização, se conhecida.
+
+        Retorna:
+          int: Id da execução.
+        """
+        n_cargas = int(pedidos_df['Carga'].replace(0, pd.NA).nunique()) if 'Carga' in pedidos_df.columns else None
+        with self.transacao() as conn:
+            cursor = conn.execute(
+                "INSERT INTO execucoes (parametros, n_pedidos, n_cargas, distancia_km) VALUES (?, ?, ?, ?)",
+                (json.dumps(parametros or {}, ensure_ascii=False, default=str), len(pedidos_df), n_cargas,
+                 None if distancia_km is None else float(distancia_km)),
+            )
+            execucao_id = cursor.lastrowid
+            colunas, linhas = _linhas(pedidos_df, COLUNAS_ALOCACOES, {"execucao_id": execucao_id})
+            conn.executemany(
+                f"INSERT INTO alocacoes ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})",
+                linhas,
+            )
+        return execucao_id
+
+    def consultar_execucoes(self, limite=50):
+        """Últimas execuções, da mais recente para a mais antiga."""
+        return self._consultar("SELECT * FROM execucoes ORDER BY id DESC LIMIT ?", (int(limite),))
+
+    def consultar_alocacoes(self, execucao_id=None, placa=None, endereco=None):
+        """
+        Alocações filtradas por execução, placa e/ou endereço (todas usam índice).
+        """
+        filtros, parametros = [], []
+        for coluna, valor in (("execucao_id", execucao_id), ("placa", placa), ("endereco", endereco)):
+            if valor is not None:
+                filtros.append(f"{coluna} = ?")
+                parametros.append(valor)
+        onde = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+        return self._consultar(f"SELECT * FROM alocacoes {onde} ORDER BY execucao_id, carga, ordem_entrega",
+                               tuple(parametros))
+
+
+# Funções mantidas por compatibilidade: recebem o objeto retornado por connect_db
+def connect_db(db_name=None):
+    return Database(db_name)
 
-def connect_db(db_name="database.db"):
-    conn = sqlite3.connect(db_name)
-    return conn
 
 def create_tables(conn):
-    cursor = conn.cursor()
-    
-    # Tabela para armazenar as planilhas de IA
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ia_planilhas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            dados BLOB NOT NULL
-        )
-    ''')
-    
-    # Tabela para armazenar informações da frota
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS frota (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            modelo TEXT NOT NULL,
-            capacidade INTEGER NOT NULL,
-            placa TEXT NOT NULL UNIQUE
-        )
-    ''')
-    
-    conn.commit()
+    conn.create_tables()
+
 
 def insert_ia_planilha(conn, nome, dados):
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO ia_planilhas (nome, dados) VALUES (?, ?)
-    ''', (nome, dados))
-    conn.commit()
+    conn.insert_ia_planilha(nome, dados)
+
 
 def insert_frota(conn, modelo, capacidade, placa):
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO frota (modelo, capacidade, placa) VALUES (?, ?, ?)
-    ''', (modelo, capacidade, placa))
-    conn.commit()
+    conn.insert_frota(modelo, capacidade, placa)
+
 
 def query_ia_planilhas(conn):
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM ia_planilhas')
-    return cursor.fetchall()
+    return conn.query_ia_planilhas()
+
 
 def query_frota(conn):
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM frota')
-    return cursor.fetchall()
\ No newline at end of file
+    return conn.conexao.execute('SELECT * FROM frota').fetchall()
@@ -1,63 +1,32 @@
-import sqlite3
+from db.database import Database
+
+# Conexão por thread e em modo WAL, compartilhada por todas as funções do módulo
+_db = Database()
+
 
 def conectar_db():
-    conn = sqlite3.connect('frota_ia.db')
-    return conn
+    return _db.conexao
+
 
 def criar_tabelas():
-    conn = conectar_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS frota (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        modelo TEXT NOT NULL,
-        capacidade INTEGER NOT NULL,
-        placa TEXT NOT NULL UNIQUE
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS pedidos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        endereco TEXT NOT NULL,
-        peso INTEGER NOT NULL,
-        latitude REAL,
-        longitude REAL
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    _db.create_tables()
+
 
 def cadastrar_caminhao(modelo, capacidade, placa):
-    conn = conectar_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO frota (modelo, capacidade, placa) VALUES (?, ?, ?)
-    ''', (modelo, capacidade, placa))
-    
-    conn.commit()
-    conn.close()
+    _db.insert_frota(modelo, capacidade, placa)
+
+
+def salvar_caminhoes(caminhoes_df):
+    """
+    Grava (upsert por placa) todos os caminhões de uma planilha numa única transação.
+    """
+    criar_tabelas()
+    return _db.salvar_frota(caminhoes_df)
+
 
 def consultar_frota():
-    conn = conectar_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM frota')
-    resultados = cursor.fetchall()
-    
-    conn.close()
-    return resultados
+    return _db.conexao.execute('SELECT * FROM frota').fetchall()
+
 
 def atualizar_caminhao(id, modelo, capacidade, placa):
-    conn = conectar_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    UPDATE frota SET modelo = ?, capacidade = ?, placa = ? WHERE id = ?
-    ''', (modelo, capacidade, placa, id))
-    
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    _db.atualizar_caminhao(id, modelo, capacidade, placa)
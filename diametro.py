@@ -0,0 +1,164 @@
+"""
+Módulo de validação da distância máxima entre pedidos
+
+Responde "a maior distância entre dois pedidos é <= D?" e "quais pedidos violam D?" em O(n log n),
+no lugar de chamar geodesic para cada par.
+
+O par mais distante de um conjunto (e o ponto mais distante de qualquer ponto) está sempre
+entre os vértices da envoltória convexa. A envoltória é calculada no plano métrico local
+(cadeia monótona de Andrew) e as distâncias até seus h vértices usam haversine, em O(n h).
+
+VerificadorDiametro guarda só os vértices da envoltória de um grupo, para que a alocação
+consulte "este pedido cabe no grupo?" de forma incremental, a cada pedido adicionado.
+"""
+
+import math
+
+import numpy as np
+
+from distancias import RAIO_TERRA_KM, haversine_km, projetar_coordenadas
+
+
+def _cruzado(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def envoltoria_convexa(xy):
+    """
+    Índices dos vértices da envoltória convexa de pontos no plano (cadeia monótona), em O(n log n).
+    """
+    xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+    ordem = np.lexsort((xy[:, 1], xy[:, 0]))
+    # Pontos repetidos não alteram a envoltória
+    ordem = ordem[np.r_[True, np.any(np.diff(xy[ordem], axis=0) != 0, axis=1)]] if len(ordem) else ordem
+    if len(ordem) <= 2:
+        return ordem
+
+    pontos = xy[ordem].tolist()
+    inferior, superior = [], []
+    for i in range(len(pontos)):
+        while len(inferior) >= 2 and _cruzado(pontos[inferior[-2]], pontos[inferior[-1]], pontos[i]) <= 0:
+            inferior.pop()
+        inferior.append(i)
+    for i in reversed(range(len(pontos))):
+        while len(superior) >= 2 and _cruzado(pontos[superior[-2]], pontos[superior[-1]], pontos[i]) <= 0:
+            superior.pop()
+        superior.append(i)
+    return ordem[inferior[:-1] + superior[:-1]]
+
+
+def vertices_envoltoria(latlon):
+    """
+    Coordenadas (lat, lon) dos vértices da envoltória convexa dos pontos.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    return latlon[envoltoria_convexa(projetar_coordenadas(latlon))]
+
+
+def _distancias_ate(latlon, vertices):
+    return haversine_km(latlon[:, None, 0], latlon[:, None, 1], vertices[None, :, 0], vertices[None, :, 1])
+
+
+def diametro_km(latlon):
+    """
+    Maior distância (km) entre dois pontos do conjunto.
+    """
+    vertices = vertices_envoltoria(latlon)
+    if len(vertices) < 2:
+        return 0.0
+    return float(_distancias_ate(vertices, vertices).max())
+
+
+def dentro_do_diametro(latlon, distancia_maxima_km):
+    """
+    True se todas as distâncias entre os pontos forem menores ou iguais a distancia_maxima_km.
+    """
+    return diametro_km(latlon) <= distancia_maxima_km
+
+
+def pedidos_distantes(latlon, distancia_maxima_km):
+    """
+    Máscara dos pontos que estão a mais de distancia_maxima_km de algum outro ponto do conjunto.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    vertices = vertices_envoltoria(latlon)
+    if len(vertices) < 2:
+        return np.zeros(len(latlon), dtype=bool)
+    return _distancias_ate(latlon, vertices).max(axis=1) > distancia_maxima_km
+
+
+class VerificadorDiametro:
+    """
+    Verificação incremental da distância máxima de um grupo de pedidos.
+
+    Guarda apenas os vértices da envoltória convexa do grupo: um novo ponto cabe se estiver
+    a no máximo distancia_maxima_km de todos eles. Pontos que caem dentro da envoltória
+    (o caso comum depois dos primeiros pedidos) não a alteram; os de fora substituem apenas
+    a cadeia de arestas que "enxergam". A envoltória tem poucos vértices, por isso as contas
+    são feitas em Python puro, sem o custo fixo de criar arrays NumPy a cada consulta.
+    """
+
+    def __init__(self, distancia_maxima_km, latlon=None):
+        self.distancia_maxima_km = distancia_maxima_km
+        # Limite em termos de haversine: sin²(d / 2R), evitando asin/sqrt a cada comparação
+        self._limite = math.sin(min(distancia_maxima_km / (2 * RAIO_TERRA_KM), math.pi / 2)) ** 2
+        self._cos_referencia = None
+        self._latlon = []
+        self._xy = []
+        if latlon is not None and len(latlon):
+            latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+            self._cos_referencia = math.cos(math.radians(float(latlon[:, 0].mean())))
+            xy = [self._projetar(lat, lon) for lat, lon in latlon.tolist()]
+            indices = envoltoria_convexa(np.asarray(xy)).tolist()
+            self._latlon = [tuple(latlon[i]) for i in indices]
+            self._xy = [xy[i] for i in indices]
+
+    @property
+    def vertices(self):
+        """Vértices (lat, lon) da envoltória do grupo."""
+        return np.asarray(self._latlon, dtype=np.float64).reshape(-1, 2)
+
+    def _projetar(self, lat, lon):
+        return (lon * self._cos_referencia, lat)
+
+    def cabe(self, ponto):
+        """True se o ponto (lat, lon) pode entrar no grupo sem violar a distância máxima."""
+        lat, lon = float(ponto[0]), float(ponto[1])
+        fi = math.radians(lat)
+        cos_fi = math.cos(fi)
+        for lat_v, lon_v in self._latlon:
+            fi_v = math.radians(lat_v)
+            h = (math.sin((fi_v - fi) / 2) ** 2
+                 + cos_fi * math.cos(fi_v) * math.sin(math.radians(lon_v - lon) / 2) ** 2)
+            if h > self._limite:
+                return False
+        return True
+
+    def adicionar(self, ponto):
+        """Adiciona o ponto ao grupo, atualizando a envoltória se ele estiver fora dela."""
+        lat, lon = float(ponto[0]), float(ponto[1])
+        if self._cos_referencia is None:
+            self._cos_referencia = math.cos(math.radians(lat))
+        p = self._projetar(lat, lon)
+        h = len(self._xy)
+        if h < 3:
+            latlon = np.asarray(self._latlon + [(lat, lon)])
+            xy = self._xy + [p]
+            indices = envoltoria_convexa(np.asarray(xy)).tolist()
+            self._latlon = [tuple(latlon[i].tolist()) for i in indices]
+            self._xy = [xy[i] for i in indices]
+            return
+
+        # Envoltória em sentido anti-horário: as arestas com o ponto à direita são "visíveis"
+        # e formam uma cadeia contígua; seus vértices internos saem e o ponto entra no lugar
+        vertices = self._xy
+        visiveis = [_cruzado(vertices[i], vertices[(i + 1) % h], p) < 0 for i in range(h)]
+        if not any(visiveis):
+            return
+        inicio = next(i for i in range(h) if visiveis[i] and not visiveis[i - 1])
+        fim = inicio
+        while visiveis[(fim + 1) % h]:
+            fim += 1
+        manter = [(fim + 1 + i) % h for i in range(h - (fim - inicio) - 1)] + [inicio]
+        self._latlon = [self._latlon[i] for i in manter] + [(lat, lon)]
+        self._xy = [self._xy[i] for i in manter] + [p]
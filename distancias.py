@@ -0,0 +1,181 @@
+"""
+Módulo de distâncias
+
+Constrói matrizes de distâncias entre coordenadas (latitude, longitude) de forma vetorizada.
+
+- Haversine (padrão): uma única passada com broadcasting do NumPy.
+- Vincenty (opcional): fórmula inversa no elipsoide WGS-84, também vetorizada,
+  para quando a precisão métrica importa mais que o tempo de cálculo.
+
+A matriz é escrita em um buffer float32 e calculada em blocos de linhas, de forma que
+a memória temporária fica limitada a (tamanho_bloco x n) mesmo para 10 mil+ paradas.
+Todas as distâncias são retornadas em quilômetros.
+"""
+
+import numpy as np
+
+RAIO_TERRA_KM = 6371.0088
+
+# Elipsoide WGS-84 (usado pelo modo Vincenty)
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+METODOS = ("haversine", "vincenty")
+
+
+def coordenadas_do_df(pedidos_df, lat_coluna="Latitude", lon_coluna="Longitude"):
+    """
+    Extrai as coordenadas de um DataFrame como um array (n, 2) de float64.
+    """
+    return pedidos_df[[lat_coluna, lon_coluna]].to_numpy(dtype=np.float64)
+
+
+def projetar_coordenadas(latlon, latitude_referencia=None):
+    """
+    Projeta (lat, lon) em graus para um plano local (x, y) em km.
+
+    Parâmetros:
+      latlon (ndarray): Array (n, 2) com latitude e longitude.
+      latitude_referencia (float): Latitude do plano; padrão a média das latitudes.
+
+    Retorna:
+      ndarray: Array (n, 2) com x (leste) e y (norte) em km.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    if latitude_referencia is None:
+        latitude_referencia = float(latlon[:, 0].mean()) if len(latlon) else 0.0
+    escala = np.radians(1.0) * RAIO_TERRA_KM
+    return np.column_stack((
+        latlon[:, 1] * escala * np.cos(np.radians(latitude_referencia)),
+        latlon[:, 0] * escala,
+    ))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Distância de grande círculo (km) entre arrays de coordenadas em graus.
+
+    Os argumentos seguem as regras de broadcasting do NumPy, portanto
+    lat1[:, None] x lat2[None, :] produz a matriz completa em uma única passada.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def vincenty_km(lat1, lon1, lat2, lon2, max_iteracoes=200, tolerancia=1e-12):
+    """
+    Distância geodésica (km) no elipsoide WGS-84 pela fórmula inversa de Vincenty.
+
+    Vetorizada com broadcasting; os pares que não convergem (pontos quase antípodas)
+    recebem a distância haversine como aproximação.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (lat1, lon1, lat2, lon2))
+    )
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    ativo = np.ones(L.shape, dtype=bool)
+    sin_sigma = cos_sigma = sigma = cos2_alpha = cos_2sigma_m = np.zeros(L.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iteracoes):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_anterior = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            ativo = np.abs(lam - lam_anterior) > tolerancia
+            if not ativo.any():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (
+            cos_2sigma_m + B / 4 * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+            )
+        )
+        distancia = WGS84_B * A * (sigma - delta_sigma)
+
+    invalido = ativo | ~np.isfinite(distancia)
+    if invalido.any():
+        distancia = np.where(invalido, haversine_km(lat1, lon1, lat2, lon2), distancia)
+    return distancia
+
+
+_FUNCOES = {"haversine": haversine_km, "vincenty": vincenty_km}
+
+
+def matriz_distancias(coords, destinos=None, metodo="haversine", tamanho_bloco=1024, out=None):
+    """
+    Gera a matriz de distâncias (km) entre coordenadas.
+
+    Parâmetros:
+      coords (array-like): Coordenadas de origem (n, 2) em graus (latitude, longitude).
+      destinos (array-like): Coordenadas de destino (m, 2). Se None, usa as próprias origens.
+      metodo (str): "haversine" (padrão) ou "vincenty".
+      tamanho_bloco (int): Número de linhas calculadas por vez; limita a memória temporária.
+      out (ndarray): Buffer (n, m) opcional onde a matriz será escrita (ex.: np.memmap).
+
+    Retorna:
+      ndarray: Matriz float32 (n, m) com as distâncias em quilômetros.
+    """
+    if metodo not in _FUNCOES:
+        raise ValueError(f"Método de distância desconhecido: '{metodo}'. Use um de {METODOS}.")
+    funcao = _FUNCOES[metodo]
+
+    origem = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    simetrica = destinos is None
+    destino = origem if simetrica else np.asarray(destinos, dtype=np.float64).reshape(-1, 2)
+    n, m = len(origem), len(destino)
+
+    if out is None:
+        out = np.empty((n, m), dtype=np.float32)
+    elif out.shape != (n, m):
+        raise ValueError(f"Buffer de saída com formato {out.shape}; esperado {(n, m)}.")
+
+    lat_dest = destino[:, 0][None, :]
+    lon_dest = destino[:, 1][None, :]
+    tamanho_bloco = max(1, int(tamanho_bloco))
+    for inicio in range(0, n, tamanho_bloco):
+        fim = min(inicio + tamanho_bloco, n)
+        out[inicio:fim] = funcao(
+            origem[inicio:fim, 0][:, None], origem[inicio:fim, 1][:, None], lat_dest, lon_dest
+        )
+
+    if simetrica and n:
+        np.fill_diagonal(out, 0.0)
+    return out
+
+
+def distancia_rota(rota, matriz, fechada=False):
+    """
+    Soma as distâncias consecutivas de uma rota (lista de índices) com um único gather.
+
+    Se fechada=True, inclui o trecho de retorno do último ponto ao primeiro.
+    """
+    rota = np.asarray(rota, dtype=np.intp)
+    if len(rota) < 2:
+        return 0.0
+    total = float(matriz[rota[:-1], rota[1:]].sum(dtype=np.float64))
+    if fechada:
+        total += float(matriz[rota[-1], rota[0]])
+    return total
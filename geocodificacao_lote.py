@@ -0,0 +1,262 @@
+"""
+Módulo de geocodificação em lote
+
+Resolve de uma vez os endereços que não estão no cache (os "misses" de um envio),
+em paralelo com um pool de threads.
+
+- Cada provedor tem seu próprio limitador de taxa (token bucket) e sua própria sessão HTTP,
+  reutilizando conexões entre requisições.
+- Falhas transitórias (timeout, HTTP 429/5xx) são repetidas com backoff exponencial.
+- Os provedores são tentados em ordem: OpenCage -> Nominatim -> tabela manual.
+
+As URLs dos provedores vêm de config (OPENCAGE_URL / NOMINATIM_URL), o que permite
+apontar o pipeline para um servidor HTTP local de testes.
+"""
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import cache_geocodificacao
+
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+
+class LimitadorTaxa:
+    """
+    Token bucket thread-safe: libera no máximo `taxa` requisições por segundo,
+    com rajadas de até `capacidade` requisições (padrão 1: requisições espaçadas de 1/taxa,
+    para que nenhuma janela de um segundo passe do limite do provedor).
+    """
+
+    def __init__(self, taxa, capacidade=1):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._trava = threading.Lock()
+
+    def adquirir(self):
+        """Bloqueia até haver um token disponível."""
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._trava:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                # Tolerância para o arredondamento: sem ela, a espera residual pode ficar abaixo da
+                # resolução do relógio e o laço não termina
+                if self._tokens >= 1 - 1e-9:
+                    self._tokens = max(self._tokens - 1, 0.0)
+                    return
+                espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+
+
+class ErroTransitorio(Exception):
+    """Falha que vale a pena repetir (timeout, HTTP 429/5xx)."""
+
+
+class ProvedorHTTP:
+    """
+    Base dos provedores HTTP: sessão reutilizável, limite de taxa e repetição com backoff.
+    """
+
+    nome = "http"
+
+    def __init__(self, url, taxa, tentativas=3, backoff=0.5, timeout=10, pool=None):
+        self.url = url
+        self.limitador = LimitadorTaxa(taxa)
+        self.tentativas = tentativas
+        self.backoff = backoff
+        self.timeout = timeout
+        # requests só é importado quando um provedor HTTP é criado
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.sessao = requests.Session()
+        tamanho_pool = pool or config.GEOCODER_MAX_WORKERS
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho_pool)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+
+    def parametros(self, endereco):
+        raise NotImplementedError
+
+    def interpretar(self, dados):
+        raise NotImplementedError
+
+    def _requisitar(self, endereco):
+        import requests
+
+        self.limitador.adquirir()
+        try:
+            resposta = self.sessao.get(self.url, params=self.parametros(endereco), timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise ErroTransitorio(str(e))
+        if resposta.status_code in STATUS_REPETIR:
+            raise ErroTransitorio(f"HTTP {resposta.status_code}")
+        if resposta.status_code != 200:
+            logging.error(f"{self.nome}: HTTP {resposta.status_code} para '{endereco}'.")
+            return None
+        return self.interpretar(resposta.json())
+
+    def geocodificar(self, endereco):
+        """
+        Retorna (latitude, longitude) ou None, repetindo falhas transitórias com backoff exponencial.
+        """
+        for tentativa in range(self.tentativas):
+            try:
+                return self._requisitar(endereco)
+            except ErroTransitorio as e:
+                if tentativa == self.tentativas - 1:
+                    logging.error(f"{self.nome}: desistindo de '{endereco}' após {self.tentativas} tentativas ({e}).")
+                    return None
+                time.sleep(self.backoff * (2 ** tentativa) * (1 + random.random()))
+            except Exception as e:
+                logging.error(f"{self.nome}: erro ao geocodificar '{endereco}': {e}")
+                return None
+        return None
+
+
+class ProvedorOpenCage(ProvedorHTTP):
+    nome = "opencage"
+
+    def __init__(self, api_key=None, url=None, taxa=None, **kwargs):
+        super().__init__(url or config.OPENCAGE_URL,
+                         taxa if taxa is not None else config.OPENCAGE_REQ_POR_SEGUNDO, **kwargs)
+        self.api_key = api_key or config.OPENCAGE_API_KEY
+
+    def parametros(self, endereco):
+        return {"q": endereco, "key": self.api_key, "limit": 1, "no_annotations": 1}
+
+    def interpretar(self, dados):
+        if dados.get("status", {}).get("code") == 200 and dados.get("results"):
+            geometria = dados["results"][0]["geometry"]
+            return (float(geometria["lat"]), float(geometria["lng"]))
+        return None
+
+
+class ProvedorNominatim(ProvedorHTTP):
+    nome = "nominatim"
+
+    def __init__(self, user_agent=None, url=None, taxa=None, **kwargs):
+        super().__init__(url or config.NOMINATIM_URL,
+                         taxa if taxa is not None else config.NOMINATIM_REQ_POR_SEGUNDO, **kwargs)
+        self.sessao.headers["User-Agent"] = user_agent or config.GEOCODER_USER_AGENT
+
+    def parametros(self, endereco):
+        return {"q": endereco, "format": "json", "limit": 1}
+
+    def interpretar(self, dados):
+        if dados:
+            return (float(dados[0]["lat"]), float(dados[0]["lon"]))
+        return None
+
+
+class ProvedorManual:
+    """Último recurso: tabela de coordenadas cadastradas manualmente."""
+
+    nome = "manual"
+
+    def __init__(self, tabela=None):
+        self.tabela = config.COORDENADAS_MANUAIS if tabela is None else tabela
+
+    def geocodificar(self, endereco):
+        return self.tabela.get(endereco)
+
+
+_provedores_padrao = None
+_trava_provedores = threading.Lock()
+
+
+def provedores_padrao():
+    """
+    Cadeia padrão OpenCage -> Nominatim -> manual, criada uma única vez por processo
+    para que sessões HTTP e limitadores de taxa sejam compartilhados.
+    """
+    global _provedores_padrao
+    with _trava_provedores:
+        if _provedores_padrao is None:
+            _provedores_padrao = [ProvedorOpenCage(), ProvedorNominatim(), ProvedorManual()]
+        return _provedores_padrao
+
+
+def geocodificar_endereco(endereco, provedores=None):
+    """
+    Tenta os provedores em ordem e retorna ((latitude, longitude), nome_do_provedor) ou (None, None).
+    """
+    for provedor in provedores or provedores_padrao():
+        coords = provedor.geocodificar(endereco)
+        if coords is not None:
+            return coords, provedor.nome
+    return None, None
+
+
+def geocodificar_lote(enderecos, provedores=None, max_workers=None, progresso=None):
+    """
+    Geocodifica em paralelo uma lista de endereços (duplicatas são resolvidas uma só vez).
+
+    Parâmetros:
+      enderecos (iterable): Endereços a geocodificar, normalmente os misses do cache.
+      provedores (list): Cadeia de provedores; usa provedores_padrao() se None.
+      max_workers (int): Número de threads; usa config.GEOCODER_MAX_WORKERS se None.
+      progresso (callable): Função opcional chamada como progresso(concluidos, total).
+
+    Retorna:
+      dict: {endereco: (latitude, longitude) ou None}, e também
+      dict: {endereco: nome_do_provedor} para os endereços resolvidos.
+    """
+    unicos = list(dict.fromkeys(enderecos))
+    resultados, fontes = {}, {}
+    if not unicos:
+        return resultados, fontes
+    provedores = provedores or provedores_padrao()
+    max_workers = max_workers or config.GEOCODER_MAX_WORKERS
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unicos))) as executor:
+        futuros = executor.map(lambda e: geocodificar_endereco(e, provedores), unicos)
+        for concluidos, (endereco, (coords, fonte)) in enumerate(zip(unicos, futuros), start=1):
+            resultados[endereco] = coords
+            if fonte:
+                fontes[endereco] = fonte
+            if progresso:
+                progresso(concluidos, len(unicos))
+
+    logging.info(f"Geocodificação em lote: {len(fontes)}/{len(unicos)} endereços resolvidos.")
+    return resultados, fontes
+
+
+def resolver_enderecos(enderecos, provedores=None, max_workers=None, progresso=None, caminho_cache=None,
+                       estatisticas=None):
+    """
+    Consulta o cache SQLite em lote, geocodifica apenas os misses e grava os novos resultados.
+
+    Se `estatisticas` (dict) for informado, ele recebe as contagens 'cache' (hits),
+    'geocodificados' (misses resolvidos pelos provedores) e 'falhas'.
+
+    Retorna:
+      dict: {endereco: (latitude, longitude) ou None} para todos os endereços únicos recebidos.
+    """
+    unicos = list(dict.fromkeys(e for e in enderecos if isinstance(e, str)))
+    coordenadas = cache_geocodificacao.buscar_coordenadas(unicos, caminho=caminho_cache)
+    faltantes = [e for e in unicos if e not in coordenadas]
+    hits = len(coordenadas)
+    novos, fontes = geocodificar_lote(faltantes, provedores, max_workers, progresso)
+    coordenadas.update(novos)
+
+    por_fonte = {}
+    for endereco, fonte in fontes.items():
+        por_fonte.setdefault(fonte, {})[endereco] = novos[endereco]
+    for fonte, lote in por_fonte.items():
+        cache_geocodificacao.salvar_coordenadas(lote, fonte=fonte, caminho=caminho_cache)
+
+    if estatisticas is not None:
+        estatisticas["cache"] = estatisticas.get("cache", 0) + hits
+        estatisticas["geocodificados"] = estatisticas.get("geocodificados", 0) + len(fontes)
+        estatisticas["falhas"] = estatisticas.get("falhas", 0) + len(faltantes) - len(fontes)
+    return coordenadas
@@ -2,21 +2,22 @@
 Módulo de geocodificação
 
 Contém funções que convertem endereços em coordenadas.
-Utiliza caching em memória com functools.lru_cache para reduzir chamadas repetitivas.
+Cada endereço único é resolvido uma única vez por DataFrame (geocodificar_dataframe),
+consultando o cache SQLite antes de recorrer à geocodificação em lote.
 """
 
-import os
 import pandas as pd
 import numpy as np
 import logging
 from functools import lru_cache
-from geopy.geocoders import Nominatim
-from config import DATABASE_FOLDER, GEOCODER_USER_AGENT, OPENCAGE_API_KEY
+from config import GEOCODER_USER_AGENT, OPENCAGE_API_KEY
+import geocodificacao_lote
 
-logging.basicConfig(level=logging.INFO, filename="geocoding.log", filemode="a",
-                    format="%(asctime)s - %(levelname)s - %(message)s")
-
-geolocator = Nominatim(user_agent=GEOCODER_USER_AGENT)
+@lru_cache(maxsize=1)
+def _geolocalizador():
+    # geopy só é importado na primeira geocodificação por endereço
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent=GEOCODER_USER_AGENT)
 
 @lru_cache(maxsize=128)
 def geocode_endereco(endereco):
@@ -27,62 +28,140 @@ def geocode_endereco(endereco):
       tuple: (latitude, longitude) ou None se não conseguir geocodificar.
     """
     try:
-        local = geolocator.geocode(endereco)
+        local = _geolocalizador().geocode(endereco)
         if local:
             return (local.latitude, local.longitude)
     except Exception as e:
         logging.error(f"Erro na geocodificação do endereço '{endereco}': {e}")
     return None
 
-def converter_enderecos(df, endereco_coluna="Endereço Completo", cache_filename="coordenadas_cache.xlsx"):
+def geocodificar_dataframe(df, endereco_coluna="Endereço Completo", coordenadas_conhecidas=None,
+                           apenas_faltantes=False, caminho_cache=None, progresso=None):
+    """
+    Etapa de geocodificação deduplicada.
+
+    Fatoriza a coluna de endereços, resolve cada endereço único uma única vez
+    (coordenadas já conhecidas -> cache SQLite -> geocodificação em lote) e devolve
+    Latitude e Longitude para todas as linhas com uma indexação vetorizada.
+
+    Parâmetros:
+      df (DataFrame): DataFrame com os endereços.
+      endereco_coluna (str): Nome da coluna de endereços.
+      coordenadas_conhecidas (dict): {endereco: (lat, lon)} já carregado (ex.: por processar_pedidos).
+      apenas_faltantes (bool): Se True, só preenche linhas cuja Latitude/Longitude está vazia ou zerada.
+      caminho_cache (str): Caminho do banco de cache (padrão: cache_geocodificacao.CACHE_DB).
+      progresso (callable): Função opcional progresso(concluidos, total) da geocodificação em lote.
+
+    Retorna:
+      DataFrame: com colunas 'Latitude' e 'Longitude' populadas (NaN onde não foi possível geocodificar).
+      dict: Estatísticas 'linhas', 'unicos', 'conhecidos', 'cache', 'geocodificados' e 'falhas'.
+    """
+    codigos, unicos = pd.factorize(df[endereco_coluna])
+    n_unicos = len(unicos)
+
+    alvo = np.ones(len(df), dtype=bool)
+    if apenas_faltantes and 'Latitude' in df.columns and 'Longitude' in df.columns:
+        lat_atual = pd.to_numeric(df['Latitude'], errors='coerce').fillna(0).to_numpy()
+        lon_atual = pd.to_numeric(df['Longitude'], errors='coerce').fillna(0).to_numpy()
+        alvo = (lat_atual == 0) | (lon_atual == 0)
+    necessarios = np.zeros(n_unicos, dtype=bool)
+    necessarios[codigos[alvo & (codigos >= 0)]] = True
+
+    conhecidas = coordenadas_conhecidas or {}
+    # Uma posição extra no fim recebe as linhas sem endereço (código -1 do factorize)
+    lat_unicos = np.full(n_unicos + 1, np.nan)
+    lon_unicos = np.full(n_unicos + 1, np.nan)
+    estatisticas = {"linhas": int(alvo.sum()), "unicos": int(necessarios.sum()), "conhecidos": 0,
+                    "cache": 0, "geocodificados": 0, "falhas": 0}
+
+    pendentes = []
+    for i in np.flatnonzero(necessarios):
+        endereco = unicos[i]
+        coords = conhecidas.get(endereco)
+        if coords is not None and coords[0] is not None and coords[1] is not None:
+            lat_unicos[i], lon_unicos[i] = coords
+            estatisticas["conhecidos"] += 1
+        else:
+            pendentes.append(i)
+
+    if pendentes:
+        try:
+            resolvidas = geocodificacao_lote.resolver_enderecos(
+                [unicos[i] for i in pendentes], caminho_cache=caminho_cache,
+                progresso=progresso, estatisticas=estatisticas
+            )
+        except Exception as e:
+            logging.error(f"Erro na geocodificação em lote: {e}")
+            resolvidas = {}
+            estatisticas["falhas"] += len(pendentes)
+        for i in pendentes:
+            coords = resolvidas.get(unicos[i])
+            if coords is not None:
+                lat_unicos[i], lon_unicos[i] = coords
+                if coordenadas_conhecidas is not None:
+                    coordenadas_conhecidas[unicos[i]] = coords
+
+    latitudes = lat_unicos[codigos]
+    longitudes = lon_unicos[codigos]
+    if alvo.all():
+        df['Latitude'] = latitudes
+        df['Longitude'] = longitudes
+    else:
+        df['Latitude'] = np.where(alvo, latitudes, pd.to_numeric(df['Latitude'], errors='coerce'))
+        df['Longitude'] = np.where(alvo, longitudes, pd.to_numeric(df['Longitude'], errors='coerce'))
+
+    logging.info(f"Geocodificação: {estatisticas}")
+    return df, estatisticas
+
+def montar_endereco_completo(df):
+    """
+    Cria a coluna 'Endereço Completo' a partir do endereço, bairro e cidade de entrega.
+    """
+    df['Endereço Completo'] = (
+        df['Endereço de Entrega'].astype(str) + ', ' +
+        df['Bairro de Entrega'].astype(str) + ', ' +
+        df['Cidade de Entrega'].astype(str)
+    )
+    return df
+
+def geocodificar_em_lotes(lotes, endereco_coluna="Endereço Completo", coordenadas_conhecidas=None,
+                          caminho_cache=None):
+    """
+    Geocodifica os pedidos à medida que os lotes são lidos (ex.: leitura_excel.ler_em_lotes).
+
+    As coordenadas resolvidas num lote ficam em coordenadas_conhecidas, então um endereço
+    repetido em lotes seguintes não é consultado de novo.
+
+    Parâmetros:
+      lotes (iterable): DataFrames de pedidos; sem a coluna de endereços, ela é montada
+        por montar_endereco_completo.
+      endereco_coluna (str): Nome da coluna de endereços.
+      coordenadas_conhecidas (dict): {endereco: (lat, lon)} compartilhado entre os lotes.
+      caminho_cache (str): Caminho do banco de cache (padrão: cache_geocodificacao.CACHE_DB).
+
+    Retorna:
+      Iterator[tuple]: (DataFrame geocodificado, estatísticas) de cada lote.
+    """
+    conhecidas = {} if coordenadas_conhecidas is None else coordenadas_conhecidas
+    for lote in lotes:
+        if endereco_coluna not in lote.columns:
+            lote = montar_endereco_completo(lote)
+        yield geocodificar_dataframe(lote, endereco_coluna, conhecidas, caminho_cache=caminho_cache)
+
+def converter_enderecos(df, endereco_coluna="Endereço Completo", caminho_cache=None):
     """
     Atualiza o DataFrame com as colunas 'Latitude' e 'Longitude' para cada endereço.
     
-    Utiliza um arquivo de cache para evitar geocodificações repetitivas.
-    Atualiza o cache no disco somente se houver novas entradas.
+    Utiliza o cache SQLite compartilhado (cache_geocodificacao) para evitar geocodificações repetitivas:
+    cada endereço único é resolvido uma só vez pela etapa geocodificar_dataframe.
     
     Parâmetros:
       df (DataFrame): DataFrame com os endereços.
       endereco_coluna (str): Nome da coluna de endereços.
-      cache_filename (str): Nome do arquivo de cache.
+      caminho_cache (str): Caminho do banco de cache (padrão: cache_geocodificacao.CACHE_DB).
     
     Retorna:
       DataFrame: com colunas 'Latitude' e 'Longitude' populadas.
     """
-    cache_file = os.path.join(DATABASE_FOLDER, cache_filename)
-    
-    # Tenta carregar cache a partir do disco
-    try:
-        cache_df = pd.read_excel(cache_file, engine="openpyxl")
-        cache = dict(zip(cache_df['Endereço'], zip(cache_df['Latitude'], cache_df['Longitude'])))
-    except Exception as e:
-        logging.info(f"Cache não encontrado ou erro na leitura: {e}")
-        cache = {}
-    
-    latitudes = []
-    longitudes = []
-    for endereco in df[endereco_coluna]:
-        if endereco in cache:
-            lat, lon = cache[endereco]
-        else:
-            latlon = geocode_endereco(endereco)
-            if latlon is None:
-                lat, lon = (np.nan, np.nan)
-            else:
-                lat, lon = latlon
-            cache[endereco] = (lat, lon)
-        latitudes.append(lat)
-        longitudes.append(lon)
-
-    df['Latitude'] = latitudes
-    df['Longitude'] = longitudes
-
-    try:
-        cache_df = pd.DataFrame(list(cache.items()), columns=['Endereço', 'Coordenadas'])
-        cache_df[['Latitude', 'Longitude']] = pd.DataFrame(cache_df['Coordenadas'].tolist(), index=cache_df.index)
-        cache_df.drop(columns=['Coordenadas'], inplace=True)
-        cache_df.to_excel(cache_file, index=False)
-    except Exception as e:
-        logging.error(f"Erro ao atualizar o cache: {e}")
-    
-    return df
\ No newline at end of file
+    df, _ = geocodificar_dataframe(df, endereco_coluna, caminho_cache=caminho_cache)
+    return df
@@ -1,24 +1,30 @@
 import streamlit as st
 import pandas as pd
+from functools import partial
+
+import armazenamento
+from leitura_excel import TIPOS_CAMINHOES
+
+COLUNAS_CAMINHOES = ['Placa', 'Transportador', 'Descrição Veículo', 'Capac. Cx', 'Capac. Kg', 'Disponível']
 
 def cadastrar_caminhoes():
     st.title("Cadastro de Caminhões da Frota")
     
-    # Tenta carregar a frota existente ou cria uma nova
+    # Tenta carregar a frota existente (Parquet em database/colunar) ou cria uma nova
     try:
-        caminhoes_df = pd.read_excel("database/caminhoes_frota.xlsx", engine='openpyxl')
+        caminhoes_df = armazenamento.carregar("caminhoes")
     except FileNotFoundError:
-        caminhoes_df = pd.DataFrame(columns=[
-            'Placa', 'Transportador', 'Descrição Veículo', 'Capac. Cx', 'Capac. Kg', 'Disponível'
-        ])
+        caminhoes_df = pd.DataFrame(columns=COLUNAS_CAMINHOES)
     
     # Upload de nova planilha de caminhões
     uploaded_caminhoes = st.file_uploader("Escolha o arquivo Excel de Caminhões", type=["xlsx", "xlsm"])
     
     if uploaded_caminhoes is not None:
-        novo_caminhoes_df = pd.read_excel(uploaded_caminhoes, engine='openpyxl')
-        colunas_caminhoes = ['Placa', 'Transportador', 'Descrição Veículo', 'Capac. Cx', 'Capac. Kg', 'Disponível']
-        if not all(col in novo_caminhoes_df.columns for col in colunas_caminhoes):
+        # O Excel é convertido uma única vez por conteúdo; reenvios e reruns leem o Parquet
+        try:
+            novo_caminhoes_df = armazenamento.importar_excel(uploaded_caminhoes, "caminhoes_upload", COLUNAS_CAMINHOES,
+                                                                tipos=TIPOS_CAMINHOES)
+        except ValueError:
             st.error("As colunas necessárias não foram encontradas na planilha de caminhões.")
             return
         
@@ -29,19 +35,25 @@ def cadastrar_caminhoes():
         
         if st.button("Carregar Frota"):
             caminhoes_df = pd.concat([caminhoes_df, novo_caminhoes_df], ignore_index=True)
-            caminhoes_df.to_excel("database/caminhoes_frota.xlsx", index=False)
+            armazenamento.salvar(caminhoes_df, "caminhoes")
             st.success("Frota carregada com sucesso!")
     
     if st.button("Limpar Frota"):
-        caminhoes_df = pd.DataFrame(columns=[
-            'Placa', 'Transportador', 'Descrição Veículo', 'Capac. Cx', 'Capac. Kg', 'Disponível'
-        ])
-        caminhoes_df.to_excel("database/caminhoes_frota.xlsx", index=False)
+        caminhoes_df = pd.DataFrame(columns=COLUNAS_CAMINHOES)
+        armazenamento.salvar(caminhoes_df, "caminhoes")
         st.success("Frota limpa com sucesso!")
     
     st.subheader("Caminhões Cadastrados")
     edited_caminhoes_df = st.data_editor(caminhoes_df, num_rows="dynamic")
     
     if st.button("Salvar Alterações"):
-        edited_caminhoes_df.to_excel("database/caminhoes_frota.xlsx", index=False)
-        st.success("Alterações salvas com sucesso!")
\ No newline at end of file
+        armazenamento.salvar(edited_caminhoes_df, "caminhoes")
+        st.success("Alterações salvas com sucesso!")
+
+    # Excel só é gerado quando o download é pedido
+    st.download_button(
+        "Baixar planilha da frota",
+        data=partial(armazenamento.exportar_excel, edited_caminhoes_df),
+        file_name="caminhoes_frota.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
\ No newline at end of file
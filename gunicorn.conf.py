@@ -0,0 +1,27 @@
+"""
+Configuração do gunicorn para a API REST
+
+    gunicorn -c gunicorn.conf.py "servidor:criar_app()"
+
+Os valores vêm de config (variáveis de ambiente API_BIND, API_PROCESSOS, API_THREADS e
+API_TEMPO_LIMITE_S). Ver servidor.py.
+"""
+
+import multiprocessing
+
+# Só nomes que não são configurações do gunicorn ("config" é uma delas)
+from config import API_BIND, API_PROCESSOS, API_THREADS, API_TEMPO_LIMITE_S
+
+bind = API_BIND
+workers = API_PROCESSOS or multiprocessing.cpu_count()
+threads = max(1, API_THREADS)
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = API_TEMPO_LIMITE_S
+
+# Importa e aquece a API uma vez no processo principal; os workers a herdam pelo fork
+preload_app = True
+
+
+def post_fork(server, worker):
+    import servidor
+    servidor.aquecer_trabalhador()
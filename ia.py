@@ -1,6 +1,10 @@
+from __future__ import annotations
+
 import pandas as pd
-import folium
-from typing import Dict, Tuple, Any
+from typing import TYPE_CHECKING, Dict, Tuple, Any
+
+if TYPE_CHECKING:
+    import folium
 
 def agrupar_por_regiao(pedidos_df: pd.DataFrame, n_clusters: int) -> pd.DataFrame:
     """
@@ -83,22 +87,7 @@ def criar_mapa(pedidos_df: pd.DataFrame) -> folium.Map:
     """
     Cria um mapa interativo com base nas coordenadas dos pedidos.
     O centro do mapa é calculado com a média das latitudes e longitudes
-    dos pontos válidos.
+    dos pontos válidos (módulo mapas: GeoJSON agrupado, cores por placa/carga e rotas).
     """
-    if not pedidos_df.empty and 'Latitude' in pedidos_df and 'Longitude' in pedidos_df:
-        lat_media = pedidos_df.loc[pedidos_df['Latitude'] != 0, 'Latitude'].mean() or -23.0
-        lng_media = pedidos_df.loc[pedidos_df['Longitude'] != 0, 'Longitude'].mean() or -46.0
-    else:
-        lat_media, lng_media = -23.0, -46.0
-
-    mapa = folium.Map(location=[lat_media, lng_media], zoom_start=12)
-    for _, row in pedidos_df.iterrows():
-        lat = row.get('Latitude', 0)
-        lng = row.get('Longitude', 0)
-        endereco = row.get('Endereço Completo', 'Sem endereço')
-        if lat != 0 and lng != 0:
-            folium.Marker([lat, lng], popup=endereco).add_to(mapa)
-    return mapa
-
-# Exemplo (não recomendado pela comunidade Python):
-a = 10; b = 20; print(a + b)
+    import mapas  # folium só é importado quando um mapa é pedido
+    return mapas.gerar_mapa(pedidos_df)
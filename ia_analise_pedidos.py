@@ -1,59 +1,55 @@
-import requests
-import streamlit as st
-import random
-import networkx as nx
-from itertools import permutations
-from geopy.distance import geodesic
-from sklearn.cluster import KMeans
-import folium
-from config import endereco_partida, endereco_partida_coords
-import math
+from config import endereco_partida_coords, COORDENADAS_MANUAIS, GA_ILHAS, GA_TEMPO_LIMITE_S
+import numpy as np
 import pandas as pd
 import logging
-from geopy.geocoders import Nominatim
+import cache_geocodificacao
+import geocodificacao_lote
+from tsp_genetico import resolver_tsp_ga
+from instancia import criar_instancia
+import vrp
+import agrupar_por_regiao as agrupamento
+import alocacao
+from diametro import dentro_do_diametro
 
 def obter_coordenadas_opencage(endereco):
     """
     Obtém as coordenadas de um endereço utilizando a API do OpenCage.
+    A sessão HTTP e o limite de taxa são compartilhados (geocodificacao_lote).
     """
-    try:
-        api_key = "6f522c67add14152926990afbe127384"  # Substitua pela sua chave de API
-        url = f"https://api.opencagedata.com/geocode/v1/json?q={endereco}&key={api_key}"
-        response = requests.get(url)
-        data = response.json()
-        if 'status' in data and data['status']['code'] == 200 and 'results' in data:
-            location = data['results'][0]['geometry']
-            return (location['lat'], location['lng'])
-        else:
-            st.error(f"Não foi possível obter as coordenadas para o endereço: {endereco}.")
-            return None
-    except Exception as e:
-        st.error(f"Erro ao tentar obter as coordenadas: {e}")
-        return None
+    opencage, _, _ = geocodificacao_lote.provedores_padrao()
+    coords = opencage.geocodificar(endereco)
+    if coords is None:
+        logging.warning(f"Não foi possível obter as coordenadas para o endereço: {endereco}.")
+    return coords
 
 def obter_coordenadas_nominatim(endereco):
     """
     Obtém as coordenadas de um endereço utilizando a API do Nominatim (OpenStreetMap).
+    Reutiliza o mesmo cliente entre chamadas, em vez de criar um novo a cada fallback.
     """
-    try:
-        geolocator = Nominatim(user_agent="my_geocoder")
-        location = geolocator.geocode(endereco)
-        if location:
-            return (location.latitude, location.longitude)
-        else:
-            st.error(f"Não foi possível obter as coordenadas para o endereço: {endereco} usando Nominatim.")
-            return None
-    except Exception as e:
-        st.error(f"Erro ao tentar obter as coordenadas com Nominatim: {e}")
-        return None
-
-def obter_coordenadas_com_fallback(endereco, coordenadas_salvas):
+    _, nominatim, _ = geocodificacao_lote.provedores_padrao()
+    coords = nominatim.geocodificar(endereco)
+    if coords is None:
+        logging.warning(f"Não foi possível obter as coordenadas para o endereço: {endereco} usando Nominatim.")
+    return coords
+
+def obter_coordenadas_com_fallback(endereco, coordenadas_salvas=None):
     """
     Retorna as coordenadas salvas para um endereço ou tenta obtê-las via OpenCage.
     Se não obtiver, utiliza a API do Nominatim como fallback adicional.
+
+    Antes de consultar as APIs, o endereço é procurado no cache SQLite compartilhado
+    (cache_geocodificacao); coordenadas novas são gravadas nele.
     """
+    if coordenadas_salvas is None:
+        coordenadas_salvas = {}
     if endereco in coordenadas_salvas:
         return coordenadas_salvas[endereco]
+
+    coords = cache_geocodificacao.buscar_coordenadas([endereco]).get(endereco)
+    if coords is not None:
+        coordenadas_salvas[endereco] = coords
+        return coords
     
     # Tenta obter as coordenadas via OpenCage
     coords = obter_coordenadas_opencage(endereco)
@@ -62,14 +58,12 @@ def obter_coordenadas_com_fallback(endereco, coordenadas_salvas):
         coords = obter_coordenadas_nominatim(endereco)
     
     if coords is None:
-        # Exemplo de coordenadas manuais para endereços específicos
-        coordenadas_manuais = {
-            "Rua Araújo Leite, 146, Centro, Piedade, São Paulo, Brasil": (-23.71241093449893, -47.41796911054548)
-        }
-        coords = coordenadas_manuais.get(endereco, (None, None))
+        # Coordenadas manuais para endereços específicos
+        coords = COORDENADAS_MANUAIS.get(endereco, (None, None))
     
     if coords:
         coordenadas_salvas[endereco] = coords
+        cache_geocodificacao.salvar_coordenadas({endereco: coords})
     return coords
 
 def calcular_distancia(coords_1, coords_2):
@@ -77,203 +71,198 @@ def calcular_distancia(coords_1, coords_2):
     Calcula a distância em metros entre duas coordenadas.
     """
     if coords_1 and coords_2:
+        from geopy.distance import geodesic
         return geodesic(coords_1, coords_2).meters
     return None
 
 def criar_grafo_tsp(pedidos_df):
     """
-    Cria um grafo (usando NetworkX) para o problema do caixeiro viajante (TSP).
+    Cria a instância do problema do caixeiro viajante (TSP) a partir dos pedidos.
     O nó de partida é definido em config e os demais nós são os endereços únicos da planilha.
+
+    Retorna uma InstanciaRoteirizacao (coordenadas, endereços, matriz de distâncias);
+    um grafo NetworkX só é montado se for pedido explicitamente com instancia.grafo().
     """
-    G = nx.Graph()
-    enderecos = pedidos_df['Endereço Completo'].unique()
-    # Nó de partida
-    G.add_node(endereco_partida, pos=endereco_partida_coords)
-    for endereco in enderecos:
-        coords = (
-            pedidos_df.loc[pedidos_df['Endereço Completo'] == endereco, 'Latitude'].values[0],
-            pedidos_df.loc[pedidos_df['Endereço Completo'] == endereco, 'Longitude'].values[0]
-        )
-        G.add_node(endereco, pos=coords)
-    for (end1, end2) in permutations([endereco_partida] + list(enderecos), 2):
-        distancia = calcular_distancia(G.nodes[end1]['pos'], G.nodes[end2]['pos'])
-        if distancia is not None:
-            G.add_edge(end1, end2, weight=distancia)
-    return G
-
-def resolver_tsp_genetico(G):
+    return criar_instancia(pedidos_df)
+
+def resolver_tsp_genetico(instancia, geracoes=1000, tamanho_pop=100, paciencia=100, memetico=False, semente=None,
+                          ilhas=None, tempo_limite_s=None, progresso=None):
     """
-    Resolve o TSP utilizando um algoritmo genético simples.
-    Retorna a melhor rota encontrada e sua distância total.
+    Resolve o TSP utilizando um algoritmo genético sobre índices inteiros (módulo tsp_genetico).
+    A rota parte do endereço de partida e a distância (km) considera o retorno a ele.
+    Com ilhas > 1 executa o modelo de ilhas em processos paralelos (padrão config.GA_ILHAS),
+    limitado pelo orçamento tempo_limite_s (padrão config.GA_TEMPO_LIMITE_S).
+    progresso(concluidos, total) é chamado, se informado, com as gerações concluídas.
+    Retorna a melhor rota encontrada (lista de endereços) e sua distância total.
     """
-    def fitness(route):
-        return sum(G.edges[route[i], route[i+1]]['weight'] for i in range(len(route) - 1)) + \
-               G.edges[route[-1], route[0]]['weight']
-
-    def mutate(route):
-        i, j = random.sample(range(len(route)), 2)
-        route[i], route[j] = route[j], route[i]
-        return route
-
-    def crossover(route1, route2):
-        size = len(route1)
-        start, end = sorted(random.sample(range(size), 2))
-        child = [None] * size
-        child[start:end] = route1[start:end]
-        pointer = 0
-        for i in range(size):
-            if route2[i] not in child:
-                while child[pointer] is not None:
-                    pointer += 1
-                child[pointer] = route2[i]
-        return child
-
-    def genetic_algorithm(population, generations=1000, mutation_rate=0.01):
-        for _ in range(generations):
-            population = sorted(population, key=lambda route: fitness(route))
-            next_generation = population[:2]
-            for _ in range(len(population) // 2 - 1):
-                parents = random.sample(population[:10], 2)
-                child = crossover(parents[0], parents[1])
-                if random.random() < mutation_rate:
-                    child = mutate(child)
-                next_generation.append(child)
-            population = next_generation
-        return population[0], fitness(population[0])
-
-    nodes = list(G.nodes)
-    population = [random.sample(nodes, len(nodes)) for _ in range(100)]
-    best_route, best_distance = genetic_algorithm(population)
-    return best_route, best_distance
-
-def resolver_vrp(pedidos_df, caminhoes_df):
+    rota, distancia = resolver_tsp_ga(
+        instancia.matriz, tamanho_pop=tamanho_pop, geracoes=geracoes,
+        paciencia=paciencia, memetico=memetico, semente=semente,
+        ilhas=GA_ILHAS if ilhas is None else ilhas,
+        tempo_limite_s=GA_TEMPO_LIMITE_S if tempo_limite_s is None else tempo_limite_s,
+        progresso=progresso
+    )
+    return instancia.enderecos_da_rota(rota), distancia
+
+def resolver_vrp(pedidos_df, caminhoes_df, max_pedidos=None, tempo_limite_s=None, instancia=None,
+                 usar_rotas_anteriores=True, progresso=None):
     """
-    Resolve o problema do VRP utilizando OR-Tools.
+    Resolve o problema do VRP com capacidade (CVRP) utilizando OR-Tools (módulo vrp).
     
-    O algoritmo constrói uma matriz de distâncias com base nas coordenadas dos pedidos.
-    O número de veículos é determinado pelo número de caminhões disponíveis.
+    Usa a matriz de distâncias métrica da instância, o depósito definido em config,
+    as capacidades 'Capac. Kg'/'Capac. Cx' de cada caminhão e max_pedidos como limite de pedidos.
+    A busca usa guided local search limitada por tempo e parte das rotas da execução anterior, se houver;
+    progresso(concluidos, total), se informado, acompanha o tempo consumido da busca.
     
     Retorna:
-      dict: Rotas para cada veículo, ou
+      dict: Rotas (lista de endereços) para cada veículo, ou
       str: Mensagem de erro se a solução não for encontrada ou se OR-Tools não estiver instalado.
     """
     try:
-        from ortools.constraint_solver import routing_enums_pb2, pywrapcp
+        import ortools  # noqa: F401
     except ImportError:
         return "Erro: OR-Tools não está instalado. Instale com: pip3 install ortools"
 
-    # Obtenha as coordenadas dos pedidos
-    coords = list(zip(pedidos_df['Latitude'], pedidos_df['Longitude']))
-    if not coords:
+    if pedidos_df.empty:
         return "Sem pedidos para roteirização."
 
-    depot = 0  # Usando o primeiro pedido (ou defina um depot específico)
-
-    def calcular_dist(i, j):
-        return int(math.sqrt((coords[i][0] - coords[j][0])**2 + (coords[i][1] - coords[j][1])**2) * 1000)
-
-    N = len(coords)
-    distance_matrix = [[calcular_dist(i, j) for j in range(N)] for i in range(N)]
-
     num_vehicles = len(caminhoes_df)
     if num_vehicles < 1:
         return "Nenhum caminhão disponível para a roteirização."
 
-    # Cria o index manager e o modelo de roteamento
-    manager = pywrapcp.RoutingIndexManager(N, num_vehicles, depot)
-    routing = pywrapcp.RoutingModel(manager)
-
-    def distance_callback(from_index, to_index):
-        from_node = manager.IndexToNode(from_index)
-        to_node = manager.IndexToNode(to_index)
-        return distance_matrix[from_node][to_node]
-
-    transit_callback_index = routing.RegisterTransitCallback(distance_callback)
-    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
-
-    # Parâmetros de busca
-    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-    search_parameters.first_solution_strategy = (routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
-
-    solution = routing.SolveWithParameters(search_parameters)
-    if solution:
-        routes = {}
-        for vehicle_id in range(num_vehicles):
-            index = routing.Start(vehicle_id)
-            route = []
-            while not routing.IsEnd(index):
-                node = manager.IndexToNode(index)
-                route.append(pedidos_df.iloc[node]['Endereço Completo'])
-                index = solution.Value(routing.NextVar(index))
-            routes[f"Veículo {vehicle_id + 1}"] = route
-        return routes
+    if instancia is None:
+        instancia = criar_instancia(pedidos_df)
+    n = len(instancia)
+    nos = instancia.no_do_pedido
+
+    def demanda_por_no(coluna):
+        if coluna not in pedidos_df.columns:
+            return np.zeros(n)
+        valores = pd.to_numeric(pedidos_df[coluna], errors='coerce').fillna(0).to_numpy()
+        return np.bincount(nos[nos >= 0], weights=valores[nos >= 0], minlength=n)
+
+    def capacidade(coluna):
+        if coluna not in caminhoes_df.columns:
+            return np.full(num_vehicles, np.iinfo(np.int32).max)
+        return pd.to_numeric(caminhoes_df[coluna], errors='coerce').fillna(0).to_numpy()
+
+    if 'Placa' in caminhoes_df.columns:
+        veiculos = caminhoes_df['Placa'].astype(str).tolist()
     else:
+        veiculos = [f"Veículo {i + 1}" for i in range(num_vehicles)]
+
+    rotas_iniciais = None
+    if usar_rotas_anteriores:
+        rotas_iniciais = vrp.rotas_iniciais_por_endereco(vrp.carregar_rotas_anteriores(), veiculos, instancia.indice)
+
+    rotas, descartados = vrp.resolver_cvrp(
+        instancia.matriz,
+        demandas_kg=demanda_por_no('Peso dos Itens'),
+        demandas_cx=demanda_por_no('Qtde. dos Itens'),
+        capacidades_kg=capacidade('Capac. Kg'),
+        capacidades_cx=capacidade('Capac. Cx'),
+        pedidos_por_no=np.bincount(nos[nos >= 0], minlength=n),
+        max_pedidos=max_pedidos,
+        tempo_limite_s=tempo_limite_s,
+        rotas_iniciais=rotas_iniciais,
+        progresso=progresso,
+    )
+    if rotas is None:
         return "Não foi encontrada solução para o problema VRP."
 
-from geopy.distance import geodesic
+    routes = {veiculo: instancia.enderecos_da_rota(rota) for veiculo, rota in zip(veiculos, rotas)}
+    if descartados:
+        routes["Não atendidos"] = instancia.enderecos_da_rota(descartados)
+    try:
+        vrp.salvar_rotas({veiculo: rota for veiculo, rota in routes.items() if veiculo in veiculos})
+    except OSError as e:
+        logging.error(f"Erro ao salvar as rotas do VRP: {e}")
+    return routes
 
-def otimizar_aproveitamento_frota(pedidos_df, caminhoes_df, percentual_frota, max_pedidos, n_clusters, distancia_maxima_km=50):
+def otimizar_aproveitamento_frota(pedidos_df, caminhoes_df, percentual_frota, max_pedidos, n_clusters, distancia_maxima_km=50,
+                                  progresso=None):
     """
-    Otimiza a alocação dos pedidos aos caminhões disponíveis, agrupando os pedidos em regiões,
-    atribuindo números de carga e placas, e validando distâncias.
+    Otimiza a alocação dos pedidos aos caminhões disponíveis, agrupando os pedidos em regiões
+    que cabem num caminhão, atribuindo números de carga e placas, e validando distâncias.
+    Os pedidos que ficam sem região são empacotados nos caminhões ainda livres (módulo alocacao).
 
     Parâmetros:
       pedidos_df (DataFrame): DataFrame contendo os pedidos.
       caminhoes_df (DataFrame): DataFrame contendo os caminhões.
       percentual_frota (float): Percentual da frota a ser usada.
       max_pedidos (int): Número máximo de pedidos por caminhão.
-      n_clusters (int): Número de regiões para agrupar.
+      n_clusters (int): Número mínimo de regiões (uma por caminhão) a usar.
       distancia_maxima_km (float): Distância máxima permitida entre pedidos de um mesmo caminhão.
+      progresso (callable): Função opcional progresso(concluidos, total) do agrupamento.
     
     Retorna:
-      DataFrame: DataFrame atualizado com as colunas 'Placa' e 'Carga'.
+      DataFrame: DataFrame atualizado com as colunas 'Placa' e 'Carga'. Pedidos sem caminhão ficam com
+      Carga 0 e Placa vazia; os de regiões descartadas pela distância mantêm a 'Região' (ver regioes_descartadas).
     """
-    # Inicializa as colunas
-    pedidos_df['Carga'] = 0
-    pedidos_df['Placa'] = ""
-    carga_numero = 1
-
     # Ajusta a capacidade dos caminhões conforme o percentual informado
     caminhoes_df['Capac. Kg'] *= (percentual_frota / 100)
     caminhoes_df['Capac. Cx'] *= (percentual_frota / 100)
 
     # Filtra somente caminhões com disponibilidade "Ativo"
-    caminhoes_df = caminhoes_df[caminhoes_df['Disponível'] == 'Ativo']
-
-    # Agrupa os pedidos em regiões
-    pedidos_df = agrupar_por_regiao(pedidos_df, n_clusters)
-
-    for regiao in pedidos_df['Região'].unique():
-        pedidos_regiao = pedidos_df[pedidos_df['Região'] == regiao]
-        for _, caminhao in caminhoes_df.iterrows():
-            capacidade_peso = caminhao['Capac. Kg']
-            capacidade_caixas = caminhao['Capac. Cx']
-            pedidos_alocados = pedidos_regiao[
-                (pedidos_regiao['Peso dos Itens'] <= capacidade_peso) &
-                (pedidos_regiao['Qtde. dos Itens'] <= capacidade_caixas)
-            ]
-
-            # Valida as distâncias antes de alocar os pedidos
-            coordenadas = pedidos_alocados[['Latitude', 'Longitude']].values
-            if not validar_distancias(coordenadas, distancia_maxima_km):
-                continue  # Pula este caminhão se os pedidos estão muito distantes
-
-            pedidos_alocados = pedidos_alocados.sample(n=min(max_pedidos, len(pedidos_alocados)))
-            if not pedidos_alocados.empty():
-                pedidos_df.loc[pedidos_alocados.index, 'Carga'] = carga_numero
-                pedidos_df.loc[pedidos_alocados.index, 'Placa'] = caminhao['Placa']
-                capacidade_peso -= pedidos_alocados['Peso dos Itens'].sum()
-                capacidade_caixas -= pedidos_alocados['Qtde. dos Itens'].sum()
-                carga_numero += 1
-
-    if pedidos_df['Placa'].isnull().any() or pedidos_df['Carga'].isnull().any():
-        st.error("Não foi possível atribuir placas ou números de carga a alguns pedidos.")
+    caminhoes_df = caminhoes_df[caminhoes_df['Disponível'] == 'Ativo'].reset_index(drop=True)
+
+    # Agrupa os pedidos em regiões do tamanho de um caminhão (Capac. Kg, Capac. Cx, max_pedidos e
+    # distância máxima entre pedidos):
+    # cada região já é a carga de um caminhão, então a alocação é feita numa única passada
+    pedidos_df = agrupamento.agrupar_por_capacidade(pedidos_df, caminhoes_df, max_pedidos, n_clusters,
+                                                    distancia_maxima_km=distancia_maxima_km, progresso=progresso)
+    regioes = pedidos_df['Região'].to_numpy(copy=True)
+
+    # Valida as distâncias de cada região; regiões muito espalhadas ficam sem caminhão
+    for regiao in np.unique(regioes[regioes >= 0]):
+        coordenadas = pedidos_df.loc[regioes == regiao, ['Latitude', 'Longitude']].values
+        if not validar_distancias(coordenadas, distancia_maxima_km):
+            logging.warning(f"Os pedidos da região {regiao} excedem {distancia_maxima_km} km entre si e não foram alocados.")
+            regioes = np.where(regioes == regiao, -1, regioes)
+
+    # Sobras da atribuição gulosa e pedidos de regiões descartadas: bin packing (best-fit-decreasing)
+    # nos caminhões que nenhuma região usou, respeitando capacidades, max_pedidos e a distância máxima
+    coordenadas = pedidos_df[['Latitude', 'Longitude']].to_numpy(dtype=np.float64)
+    sobras = np.flatnonzero((regioes < 0) & np.isfinite(coordenadas).all(axis=1))
+    livres = np.setdiff1d(np.arange(len(caminhoes_df)), regioes[regioes >= 0])
+    if len(sobras) and len(livres):
+        caminhoes, _ = alocacao.alocar_pedidos(
+            pd.to_numeric(pedidos_df['Peso dos Itens'], errors='coerce').to_numpy()[sobras],
+            pd.to_numeric(pedidos_df['Qtde. dos Itens'], errors='coerce').to_numpy()[sobras],
+            pd.to_numeric(caminhoes_df['Capac. Kg'], errors='coerce').to_numpy()[livres],
+            pd.to_numeric(caminhoes_df['Capac. Cx'], errors='coerce').to_numpy()[livres],
+            max_pedidos=max_pedidos,
+            latlon=coordenadas[sobras],
+            distancia_maxima_km=distancia_maxima_km,
+        )
+        empacotados = caminhoes >= 0
+        regioes[sobras[empacotados]] = livres[caminhoes[empacotados]]
+        # A região de um pedido empacotado passa a ser a do seu caminhão
+        pedidos_df.loc[pedidos_df.index[sobras[empacotados]], 'Região'] = regioes[sobras[empacotados]]
+
+    # Carga numerada na ordem das regiões usadas; placa do caminhão da região
+    alocados = regioes >= 0
+    _, cargas = np.unique(regioes[alocados], return_inverse=True)
+    pedidos_df['Carga'] = 0
+    pedidos_df.loc[alocados, 'Carga'] = cargas + 1
+    pedidos_df['Placa'] = np.where(alocados, caminhoes_df['Placa'].to_numpy(dtype=object)[np.maximum(regioes, 0)], "")
+
+    if not alocados.all():
+        logging.warning(f"Não foi possível atribuir placas ou números de carga a {int((~alocados).sum())} pedidos.")
     
     return pedidos_df
 
+def regioes_descartadas(pedidos_df):
+    """
+    Regiões que otimizar_aproveitamento_frota deixou sem caminhão por excederem a distância máxima.
+    """
+    descartados = (pedidos_df['Região'] >= 0) & (pedidos_df['Carga'] == 0)
+    return sorted(pedidos_df.loc[descartados, 'Região'].unique().tolist())
+
 def agrupar_por_regiao(pedidos_df, n_clusters):
     """
-    Agrupa os pedidos em regiões usando K-Means com base nas colunas de Latitude e Longitude.
+    Agrupa os pedidos em regiões com o serviço de agrupamento (módulo agrupar_por_regiao):
+    K-Means num plano métrico local, com warm start e cache pelo conjunto de coordenadas.
     Adiciona/atualiza a coluna "Região" no DataFrame.
 
     Parâmetros:
@@ -284,48 +273,29 @@ def agrupar_por_regiao(pedidos_df, n_clusters):
       DataFrame: DataFrame com a coluna 'Região' atualizada.
     """
     if pedidos_df.empty:
-        st.error("O DataFrame de pedidos está vazio. Não é possível agrupar por região.")
+        logging.error("O DataFrame de pedidos está vazio. Não é possível agrupar por região.")
         pedidos_df['Região'] = []
         return pedidos_df
 
     # Verifica se as colunas 'Latitude' e 'Longitude' existem
     if 'Latitude' not in pedidos_df.columns or 'Longitude' not in pedidos_df.columns:
-        st.error("As colunas 'Latitude' e 'Longitude' são necessárias para o agrupamento.")
+        logging.error("As colunas 'Latitude' e 'Longitude' são necessárias para o agrupamento.")
         pedidos_df['Região'] = []
         return pedidos_df
 
     try:
-        # Obtém as coordenadas para o agrupamento
-        coordenadas = pedidos_df[['Latitude', 'Longitude']].values
-
-        # Aplica o algoritmo K-Means
-        kmeans = KMeans(n_clusters=min(n_clusters, len(pedidos_df)), random_state=42)
-        pedidos_df['Região'] = kmeans.fit_predict(coordenadas)
-
-        return pedidos_df
+        return agrupamento.agrupar_por_regiao(pedidos_df, n_clusters, coluna='Região')
     except ValueError as e:
-        st.error(f"Erro ao agrupar por região: {e}")
+        logging.error(f"Erro ao agrupar por região: {e}")
         pedidos_df['Região'] = []
         return pedidos_df
 
 def criar_mapa(pedidos_df):
     """
-    Cria e retorna um mapa Folium com marcadores para cada pedido e para o endereço de partida.
+    Cria e retorna um mapa Folium com os pedidos (cores por placa, rotas por carga) e o endereço de partida.
     """
-    mapa = folium.Map(location=endereco_partida_coords, zoom_start=6)
-    for _, row in pedidos_df.iterrows():
-        popup_text = f"<b>Placa: {row['Placa']}</b><br>Endereço: {row['Endereço Completo']}"
-        folium.Marker(
-            location=[row['Latitude'], row['Longitude']],
-            popup=popup_text,
-            icon=folium.Icon(color='blue')
-        ).add_to(mapa)
-    folium.Marker(
-        location=endereco_partida_coords,
-        popup="Endereço de Partida",
-        icon=folium.Icon(color='red')
-    ).add_to(mapa)
-    return mapa
+    import mapas  # folium só é importado quando um mapa é pedido
+    return mapas.gerar_mapa(pedidos_df, partida=endereco_partida_coords)
 
 def validar_distancias(coordenadas, distancia_maxima_km=50):
     """
@@ -341,8 +311,5 @@ def validar_distancias(coordenadas, distancia_maxima_km=50):
     if len(coordenadas) < 2:
         return True  # Se houver menos de dois pontos, não há distâncias para validar.
 
-    for i, coord1 in enumerate(coordenadas):
-        for coord2 in coordenadas[i + 1:]:
-            if geodesic(coord1, coord2).kilometers > distancia_maxima_km:
-                return False
-    return True
+    # Diâmetro pela envoltória convexa (módulo diametro), em vez de geodesic para cada par
+    return dentro_do_diametro(coordenadas, distancia_maxima_km)
@@ -0,0 +1,268 @@
+"""
+Módulo do modelo de ilhas para algoritmos genéticos
+
+Executa N populações independentes ("ilhas") em processos separados.
+A cada `geracoes_por_epoca` gerações, cada ilha publica seus melhores indivíduos numa
+memória compartilhada e recebe os da ilha anterior (topologia em anel), substituindo seus piores.
+Todas as ilhas respeitam o mesmo prazo global de relógio e a mesma parada por estagnação.
+
+O problema é um objeto picklável com a interface:
+  n_genes                                   -> número de genes de um indivíduo
+  iniciar(rng)                              -> (populacao, custos)
+  geracao(populacao, custos, rng, numero)   -> (populacao, custos)
+Custos menores são melhores. Cada ilha recebe uma semente derivada (SeedSequence.spawn),
+portanto, sem prazo de relógio, o resultado é reproduzível.
+
+Um callback opcional progresso(concluidos, total) recebe as gerações concluídas (ou a fração
+do prazo de relógio já consumida, se for maior).
+
+Uma ilha que morre sem publicar resultado (OOM, sinal) é registrada como erro: o processo
+principal rompe a barreira e as demais ilhas encerram com o melhor que já têm. Com
+tempo_limite_s, a espera termina FOLGA_ENCERRAMENTO_S depois do prazo, mesmo que alguma
+ilha não responda (ela é encerrada à força).
+"""
+
+import os
+import time
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+TIMEOUT_BARREIRA_S = 600
+INTERVALO_PROGRESSO_S = 0.5
+FOLGA_ENCERRAMENTO_S = 30
+
+
+def _informar(progresso, numero, geracoes, inicio, tempo_limite_s):
+    if progresso is None:
+        return
+    if tempo_limite_s:
+        numero = max(numero, geracoes * min((time.time() - inicio) / tempo_limite_s, 1.0))
+    progresso(numero, geracoes)
+
+
+def executar_serial(problema, geracoes, semente=None, tempo_limite_s=None, paciencia=None, progresso=None):
+    """
+    Executa uma única população no processo atual.
+
+    Retorna:
+      ndarray: Melhor indivíduo.
+      float: Custo do melhor indivíduo.
+    """
+    rng = np.random.default_rng(semente)
+    inicio = time.time()
+    prazo = inicio + tempo_limite_s if tempo_limite_s else None
+    populacao, custos = problema.iniciar(rng)
+    melhor_custo = float(custos.min())
+    sem_melhoria = 0
+    for numero in range(geracoes):
+        populacao, custos = problema.geracao(populacao, custos, rng, numero)
+        _informar(progresso, numero + 1, geracoes, inicio, tempo_limite_s)
+        atual = float(custos.min())
+        if atual < melhor_custo - 1e-9:
+            melhor_custo = atual
+            sem_melhoria = 0
+        else:
+            sem_melhoria += 1
+            if paciencia is not None and sem_melhoria >= paciencia:
+                break
+        if prazo is not None and time.time() >= prazo:
+            break
+    melhor = int(custos.argmin())
+    return populacao[melhor].copy(), float(custos[melhor])
+
+
+def _anexar(nome, forma, dtype):
+    memoria = shared_memory.SharedMemory(name=nome)
+    return memoria, np.ndarray(forma, dtype=dtype, buffer=memoria.buf)
+
+
+def _executar_ilha(ilha, n_ilhas, problema, semente, geracoes, geracoes_por_epoca, n_migrantes,
+                   prazo, paciencia_epocas, nomes, barreira, resultados):
+    memorias = []
+    try:
+        mem_genes, genes = _anexar(nomes[0], (n_ilhas, n_migrantes, problema.n_genes), np.int64)
+        mem_custos, custos_mig = _anexar(nomes[1], (n_ilhas, n_migrantes), np.float64)
+        mem_parar, parar = _anexar(nomes[2], (n_ilhas,), np.int8)
+        mem_feitas, feitas = _anexar(nomes[3], (n_ilhas,), np.int64)
+        memorias = [mem_genes, mem_custos, mem_parar, mem_feitas]
+
+        rng = np.random.default_rng(semente)
+        populacao, custos = problema.iniciar(rng)
+        origem = (ilha - 1) % n_ilhas
+        melhor_global = np.inf
+        epocas_sem_melhoria = 0
+        numero = 0
+        while numero < geracoes:
+            for _ in range(min(geracoes_por_epoca, geracoes - numero)):
+                populacao, custos = problema.geracao(populacao, custos, rng, numero)
+                numero += 1
+            feitas[ilha] = numero
+
+            # Publica a elite e o pedido de parada; depois todas as ilhas leem o mesmo estado
+            elite = np.argsort(custos)[:n_migrantes]
+            genes[ilha] = populacao[elite]
+            custos_mig[ilha] = custos[elite]
+            parar[ilha] = 1 if prazo is not None and time.time() >= prazo else 0
+            try:
+                barreira.wait(TIMEOUT_BARREIRA_S)
+            except threading.BrokenBarrierError:
+                break  # Outra ilha falhou ou o processo principal desistiu de esperar
+
+            piores = np.argsort(custos)[-n_migrantes:]
+            populacao[piores] = genes[origem]
+            custos[piores] = custos_mig[origem]
+            melhor_epoca = float(custos_mig.min())
+            if melhor_epoca < melhor_global - 1e-9:
+                melhor_global = melhor_epoca
+                epocas_sem_melhoria = 0
+            else:
+                epocas_sem_melhoria += 1
+            encerrar = bool(parar.any()) or (
+                paciencia_epocas is not None and epocas_sem_melhoria >= paciencia_epocas
+            )
+            try:
+                barreira.wait(TIMEOUT_BARREIRA_S)
+            except threading.BrokenBarrierError:
+                break
+            if encerrar:
+                break
+
+        melhor = int(custos.argmin())
+        resultados.put((ilha, populacao[melhor].copy(), float(custos[melhor])))
+    except Exception as e:
+        barreira.abort()
+        resultados.put((ilha, None, repr(e)))
+    finally:
+        for memoria in memorias:
+            memoria.close()
+
+
+def _coletar(processos, resultados, barreira, limite, feitas, informar):
+    """
+    Recebe o resultado de cada ilha sem esperar para sempre por uma ilha morta ou travada.
+
+    Retorna:
+      dict: {ilha: (ilha, individuo ou None, custo ou mensagem de erro)}.
+    """
+    coletados = {}
+    desistir_em = None
+    while len(coletados) < len(processos):
+        try:
+            ilha, individuo, custo = resultados.get(timeout=INTERVALO_PROGRESSO_S)
+            coletados[ilha] = (ilha, individuo, custo)
+            continue
+        except queue.Empty:
+            pass
+        informar(int(feitas.min()))
+
+        mortas = [ilha for ilha, processo in enumerate(processos)
+                  if ilha not in coletados and processo.exitcode is not None]
+        if mortas:
+            # Uma ilha que terminou normalmente deixa o resultado na fila antes de sair
+            try:
+                while True:
+                    ilha, individuo, custo = resultados.get(timeout=INTERVALO_PROGRESSO_S)
+                    coletados[ilha] = (ilha, individuo, custo)
+            except queue.Empty:
+                pass
+            for ilha in mortas:
+                if ilha not in coletados:
+                    coletados[ilha] = (ilha, None, f"ilha {ilha} terminou sem resultado "
+                                                   f"(exitcode {processos[ilha].exitcode})")
+                    barreira.abort()
+
+        agora = time.time()
+        if limite is not None and agora >= limite and desistir_em is None:
+            # Prazo estourado: as ilhas paradas na barreira encerram com o melhor que têm
+            barreira.abort()
+            desistir_em = agora + FOLGA_ENCERRAMENTO_S
+        elif desistir_em is not None and agora >= desistir_em:
+            for ilha in range(len(processos)):
+                if ilha not in coletados:
+                    coletados[ilha] = (ilha, None, f"ilha {ilha} não respondeu até o prazo")
+    return coletados
+
+
+def executar_ilhas(problema, geracoes, n_ilhas=None, geracoes_por_epoca=20, n_migrantes=2,
+                   semente=None, tempo_limite_s=None, paciencia=None, progresso=None):
+    """
+    Executa o modelo de ilhas e retorna o melhor indivíduo entre todas as ilhas.
+
+    Parâmetros:
+      problema: Objeto com n_genes, iniciar(rng) e geracao(populacao, custos, rng, numero).
+      geracoes (int): Número máximo de gerações de cada ilha.
+      n_ilhas (int): Número de ilhas/processos; None usa os núcleos disponíveis. 1 executa em série.
+      geracoes_por_epoca (int): Intervalo de gerações entre migrações.
+      n_migrantes (int): Quantos indivíduos de elite migram a cada época.
+      semente (int): Semente base; cada ilha recebe uma semente derivada.
+      tempo_limite_s (float): Orçamento global de relógio, compartilhado pelas ilhas.
+      paciencia (int): Gerações sem melhoria global antes de parar (arredondadas para épocas).
+      progresso (callable): Função opcional progresso(concluidos, total), chamada pelo processo
+        principal com as gerações da ilha mais atrasada.
+
+    Levanta:
+      RuntimeError: Se nenhuma ilha retornar um indivíduo.
+
+    Retorna:
+      ndarray: Melhor indivíduo.
+      float: Custo do melhor indivíduo.
+    """
+    n_ilhas = n_ilhas or os.cpu_count() or 1
+    sementes = np.random.SeedSequence(semente).spawn(n_ilhas)
+    if n_ilhas == 1:
+        return executar_serial(problema, geracoes, sementes[0], tempo_limite_s, paciencia, progresso)
+
+    n_migrantes = max(1, n_migrantes)
+    geracoes_por_epoca = max(1, geracoes_por_epoca)
+    paciencia_epocas = None if paciencia is None else max(1, -(-paciencia // geracoes_por_epoca))
+    inicio = time.time()
+    prazo = inicio + tempo_limite_s if tempo_limite_s else None
+
+    formas = [((n_ilhas, n_migrantes, problema.n_genes), np.int64), ((n_ilhas, n_migrantes), np.float64),
+              ((n_ilhas,), np.int8), ((n_ilhas,), np.int64)]
+    memorias = [
+        shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(forma)) * np.dtype(dtype).itemsize))
+        for forma, dtype in formas
+    ]
+    contexto = mp.get_context()
+    barreira = contexto.Barrier(n_ilhas)
+    resultados = contexto.Queue()
+    processos = [
+        contexto.Process(
+            target=_executar_ilha,
+            args=(ilha, n_ilhas, problema, sementes[ilha], geracoes, geracoes_por_epoca, n_migrantes,
+                  prazo, paciencia_epocas, [m.name for m in memorias], barreira, resultados),
+            daemon=True,
+        )
+        for ilha in range(n_ilhas)
+    ]
+    # Gerações concluídas por ilha, lidas pelo processo principal para informar o progresso
+    feitas = np.ndarray((n_ilhas,), dtype=np.int64, buffer=memorias[3].buf)
+    feitas[:] = 0
+    try:
+        for processo in processos:
+            processo.start()
+        coletados = _coletar(processos, resultados, barreira,
+                             None if prazo is None else prazo + FOLGA_ENCERRAMENTO_S, feitas,
+                             lambda numero: _informar(progresso, numero, geracoes, inicio, tempo_limite_s))
+        for processo in processos:
+            processo.join(FOLGA_ENCERRAMENTO_S)
+            if processo.is_alive():
+                processo.terminate()
+                processo.join()
+    finally:
+        del feitas
+        for memoria in memorias:
+            memoria.close()
+            memoria.unlink()
+
+    erros = [custo for _, individuo, custo in coletados.values() if individuo is None]
+    validos = [(custo, ilha, individuo) for ilha, individuo, custo in coletados.values() if individuo is not None]
+    if not validos:
+        raise RuntimeError(f"Todas as ilhas falharam: {erros}")
+    custo, _, individuo = min(validos, key=lambda r: (r[0], r[1]))
+    return individuo, custo
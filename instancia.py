@@ -0,0 +1,99 @@
+"""
+Módulo da instância de roteirização
+
+Representação compacta de um problema de roteirização, compartilhada por todos os solvers
+(vizinho mais próximo, busca local, algoritmo genético e VRP), no lugar de um grafo completo.
+
+- coordenadas: array (n, 2) com o depósito na posição 0 e os endereços únicos em seguida.
+- enderecos / indice: nome de cada nó e o caminho inverso endereço -> índice.
+- no_do_pedido: para cada linha do DataFrame de pedidos, o índice do seu nó.
+- matriz: matriz de distâncias (km, float32), calculada uma única vez.
+
+Um grafo NetworkX só é construído se alguém pedir explicitamente por grafo().
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from config import endereco_partida, endereco_partida_coords
+from distancias import matriz_distancias
+
+DEPOSITO = 0
+
+
+@dataclass
+class InstanciaRoteirizacao:
+    coordenadas: np.ndarray
+    enderecos: list
+    matriz: np.ndarray
+    no_do_pedido: np.ndarray = None
+    deposito: int = DEPOSITO
+    indice: dict = field(init=False, repr=False)
+    _grafo: object = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.indice = {endereco: i for i, endereco in enumerate(self.enderecos)}
+
+    def __len__(self):
+        return len(self.enderecos)
+
+    @property
+    def distancias_deposito(self):
+        """Distância do depósito até cada nó."""
+        return self.matriz[self.deposito]
+
+    def enderecos_da_rota(self, rota):
+        """Converte uma rota de índices em uma lista de endereços."""
+        return [self.enderecos[i] for i in rota]
+
+    def grafo(self):
+        """
+        Visão NetworkX (grafo completo com pesos em metros), construída sob demanda e guardada.
+        """
+        if self._grafo is None:
+            import networkx as nx
+            G = nx.complete_graph(len(self))
+            G = nx.relabel_nodes(G, dict(enumerate(self.enderecos)))
+            for endereco, pos in zip(self.enderecos, map(tuple, self.coordenadas.tolist())):
+                G.nodes[endereco]['pos'] = pos
+            for u, v, dados in G.edges(data=True):
+                dados['weight'] = float(self.matriz[self.indice[u], self.indice[v]]) * 1000.0
+            self._grafo = G
+        return self._grafo
+
+
+def criar_instancia(pedidos_df, endereco_coluna='Endereço Completo', deposito=None,
+                    nome_deposito=None, metodo="haversine"):
+    """
+    Cria a instância a partir dos pedidos, com um nó por endereço único.
+
+    Parâmetros:
+      pedidos_df (DataFrame): Pedidos com 'Endereço Completo', 'Latitude' e 'Longitude'.
+      endereco_coluna (str): Coluna de endereços.
+      deposito (tuple): Coordenadas do depósito; padrão config.endereco_partida_coords.
+      nome_deposito (str): Nome do nó do depósito; padrão config.endereco_partida.
+      metodo (str): Método da matriz de distâncias ("haversine" ou "vincenty").
+
+    Retorna:
+      InstanciaRoteirizacao
+    """
+    deposito = endereco_partida_coords if deposito is None else deposito
+    nome_deposito = endereco_partida if nome_deposito is None else nome_deposito
+
+    codigos, unicos = pd.factorize(pedidos_df[endereco_coluna])
+    # Coordenadas da primeira ocorrência de cada endereço, sem varrer o DataFrame por endereço
+    validos = np.flatnonzero(codigos >= 0)
+    _, primeiras = np.unique(codigos[validos], return_index=True)
+    primeiras = validos[primeiras]
+    latlon = pedidos_df[['Latitude', 'Longitude']].to_numpy(dtype=np.float64)[primeiras]
+
+    coordenadas = np.vstack((np.asarray(deposito, dtype=np.float64).reshape(1, 2), latlon))
+    no_do_pedido = np.where(codigos >= 0, codigos + 1, -1)
+    return InstanciaRoteirizacao(
+        coordenadas=coordenadas,
+        enderecos=[nome_deposito] + list(unicos),
+        matriz=matriz_distancias(coordenadas, metodo=metodo),
+        no_do_pedido=no_do_pedido,
+    )
@@ -0,0 +1,195 @@
+"""
+Módulo de leitura de planilhas Excel em lotes
+
+Lê planilhas grandes linha a linha (openpyxl em modo read_only, ou python-calamine quando
+instalado), sem montar o workbook inteiro em memória:
+
+- O cabeçalho (primeira linha) é validado antes de qualquer linha de dados: uma planilha sem as
+  colunas obrigatórias falha imediatamente, sem ler o restante do arquivo.
+- Só as colunas pedidas são extraídas, em lotes de `tamanho_lote` linhas (DataFrames).
+- Os tipos são convertidos em cada lote (texto / número), conforme o mapa `tipos`.
+"""
+
+import io
+import os
+
+import pandas as pd
+
+TAMANHO_LOTE = 5000
+
+# Tipos das colunas conhecidas das planilhas de pedidos e de frota
+TIPOS_PEDIDOS = {
+    "Placa": "texto", "Nº Pedido": "texto", "Cód. Cliente": "texto", "Nome Cliente": "texto",
+    "Endereço de Entrega": "texto", "Bairro de Entrega": "texto", "Cidade de Entrega": "texto",
+    "Qtde. dos Itens": "numero", "Peso dos Itens": "numero", "Latitude": "numero", "Longitude": "numero",
+}
+TIPOS_CAMINHOES = {
+    "Placa": "texto", "Transportador": "texto", "Descrição Veículo": "texto", "Disponível": "texto",
+    "Capac. Cx": "numero", "Capac. Kg": "numero",
+}
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+
+def _abrir(origem):
+    if isinstance(origem, (bytes, bytearray)):
+        return io.BytesIO(origem)
+    if isinstance(origem, (str, os.PathLike)):
+        return origem
+    # Arquivo enviado (UploadedFile do Streamlit, FileStorage do Flask, BytesIO...)
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+    return origem
+
+
+# Os leitores retornam (número de linhas declarado na planilha ou None, iterador das linhas)
+
+def _linhas_openpyxl(origem, aba):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(origem, read_only=True, data_only=True)
+    planilha = workbook[aba] if aba is not None else workbook.worksheets[0]
+
+    def linhas():
+        try:
+            yield from planilha.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    return planilha.max_row, linhas()
+
+
+def _linhas_calamine(origem, aba):
+    if isinstance(origem, (str, os.PathLike)):
+        workbook = CalamineWorkbook.from_path(os.fspath(origem))
+    else:
+        workbook = CalamineWorkbook.from_filelike(origem)
+    planilha = workbook.get_sheet_by_name(aba) if aba is not None else workbook.get_sheet_by_index(0)
+
+    def linhas():
+        iterador = planilha.iter_rows() if hasattr(planilha, "iter_rows") else iter(planilha.to_python())
+        for linha in iterador:
+            # O calamine representa células vazias como ""
+            yield tuple(None if valor == "" else valor for valor in linha)
+    return getattr(planilha, "height", None), linhas()
+
+
+def _linhas(origem, aba):
+    origem = _abrir(origem)
+    if CalamineWorkbook is not None:
+        return _linhas_calamine(origem, aba)
+    return _linhas_openpyxl(origem, aba)
+
+
+def _nomes_colunas(cabecalho):
+    # Mesmos nomes que o pd.read_excel daria: "Unnamed: i" para vazios e sufixo .1, .2 para repetidos
+    nomes, vistos = [], {}
+    for i, valor in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if valor is None else valor
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float):
+        if valor != valor:
+            return None
+        if valor.is_integer():
+            return str(int(valor))
+    return str(valor)
+
+
+def _converter(df, tipos):
+    for coluna, tipo in (tipos or {}).items():
+        if coluna not in df.columns:
+            continue
+        if tipo == "numero":
+            df[coluna] = pd.to_numeric(df[coluna], errors="coerce")
+        elif tipo == "texto":
+            df[coluna] = pd.Series([_texto(valor) for valor in df[coluna].tolist()], index=df.index, dtype="str")
+        else:
+            raise ValueError(f"Tipo de coluna inválido para '{coluna}': {tipo}. Use 'texto' ou 'numero'.")
+    return df
+
+
+def ler_cabecalho(origem, aba=None):
+    """
+    Nomes das colunas da planilha (primeira linha), sem ler as linhas de dados.
+    """
+    _, linhas = _linhas(origem, aba)
+    try:
+        return _nomes_colunas(next(linhas, ()))
+    finally:
+        linhas.close()
+
+
+def ler_em_lotes(origem, colunas_obrigatorias=None, colunas=None, tipos=None, tamanho_lote=TAMANHO_LOTE, aba=None,
+                 progresso=None):
+    """
+    Lê uma planilha Excel em lotes de linhas.
+
+    O cabeçalho é validado na primeira iteração, antes de qualquer linha de dados.
+
+    Parâmetros:
+      origem: Caminho, bytes ou arquivo enviado (.xlsx).
+      colunas_obrigatorias (list): Colunas que a planilha precisa ter (ValueError se faltar).
+      colunas (list): Colunas a extrair (padrão: todas). Colunas pedidas que não existem são ignoradas.
+      tipos (dict): {coluna: "texto" | "numero"} para converter os tipos em cada lote.
+      tamanho_lote (int): Número de linhas por lote.
+      aba (str): Nome da aba (padrão: a primeira).
+      progresso (callable): Função opcional progresso(concluidos, total) com as linhas já entregues,
+        chamada depois que cada lote é consumido (total pela dimensão declarada na planilha).
+
+    Retorna:
+      Iterator[DataFrame]: Lotes com as colunas pedidas, na ordem da planilha.
+    """
+    total, linhas = _linhas(origem, aba)
+    total = max(total - 1, 0) if total else None
+    lidas = 0
+    try:
+        nomes = _nomes_colunas(next(linhas, ()))
+        faltantes = [coluna for coluna in colunas_obrigatorias or [] if coluna not in nomes]
+        if faltantes:
+            raise ValueError(f"Colunas obrigatórias não encontradas na planilha: {', '.join(faltantes)}")
+
+        selecionadas = [i for i, nome in enumerate(nomes) if colunas is None or nome in colunas]
+        nomes_selecionados = [nomes[i] for i in selecionadas]
+        lote = []
+        for linha in linhas:
+            valores = tuple(linha[i] if i < len(linha) else None for i in selecionadas)
+            if all(valor is None for valor in valores):
+                continue  # Linhas em branco, como no pd.read_excel
+            lote.append(valores)
+            if len(lote) >= tamanho_lote:
+                yield _converter(pd.DataFrame(lote, columns=nomes_selecionados), tipos)
+                lidas += len(lote)
+                lote = []
+                if progresso is not None and total:
+                    progresso(min(lidas, total), total)
+        if lote:
+            yield _converter(pd.DataFrame(lote, columns=nomes_selecionados), tipos)
+            lidas += len(lote)
+        if progresso is not None:
+            progresso(lidas, lidas)
+    finally:
+        linhas.close()
+
+
+def ler_excel(origem, colunas_obrigatorias=None, colunas=None, tipos=None, tamanho_lote=TAMANHO_LOTE, aba=None):
+    """
+    Lê a planilha inteira com ler_em_lotes e retorna um único DataFrame.
+    """
+    lotes = list(ler_em_lotes(origem, colunas_obrigatorias, colunas, tipos, tamanho_lote, aba))
+    if not lotes:
+        nomes = [nome for nome in ler_cabecalho(origem, aba) if colunas is None or nome in colunas]
+        return pd.DataFrame(columns=nomes)
+    return pd.concat(lotes, ignore_index=True)
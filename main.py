@@ -1,17 +1,59 @@
 import streamlit as st
 import pandas as pd
-from streamlit_folium import folium_static
-import requests
-import time
+import streamlit.components.v1 as components
 import datetime
-import os
-from geopy.distance import geodesic  # Biblioteca para calcular distâncias geográficas
+from functools import partial
+import logging
 
 st.set_page_config(layout="wide")
 
 from gerenciamento_frota import cadastrar_caminhoes
-from subir_pedidos import processar_pedidos, salvar_coordenadas
+from subir_pedidos import processar_pedidos
+from geocoding import geocodificar_dataframe
 import ia_analise_pedidos as ia
+import armazenamento
+from config import endereco_partida_coords
+from diametro import dentro_do_diametro
+from progresso import Progresso, texto_estado
+from database.db.database import Database
+
+LINHAS_PREVIA = 1000
+
+# ---------- Etapas com cache ----------
+# Cada etapa é chaveada pelo hash do conteúdo de que depende (planilha, frota, parâmetros):
+# um rerun do Streamlit (ex.: mover um slider) só recalcula as etapas cujas chaves mudaram.
+# Argumentos com "_" não entram na chave; os DataFrames são identificados pelas chaves de conteúdo.
+
+def hash_dataframe(df, colunas=None):
+    """Hash do conteúdo de um DataFrame (ou de algumas colunas), em ordem de linhas."""
+    if colunas is not None:
+        df = df[colunas]
+    return armazenamento.hash_conteudo(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def geocodificar_pedidos(chave, _pedidos_df, _coordenadas_salvas, apenas_faltantes=False):
+    pedidos_df, estatisticas = geocodificar_dataframe(
+        _pedidos_df, coordenadas_conhecidas=_coordenadas_salvas, apenas_faltantes=apenas_faltantes
+    )
+    pedidos_df['Latitude'] = pedidos_df['Latitude'].fillna(0)
+    pedidos_df['Longitude'] = pedidos_df['Longitude'].fillna(0)
+    return pedidos_df, estatisticas
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def carregar_caminhoes(versao):
+    return armazenamento.carregar("caminhoes")
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def alocar_frota(chave, versao_caminhoes, percentual_frota, max_pedidos, n_clusters, max_distancia_km,
+                 _pedidos_df, _caminhoes_df):
+    # otimizar_aproveitamento_frota altera as capacidades do DataFrame recebido: usa uma cópia
+    return ia.otimizar_aproveitamento_frota(_pedidos_df, _caminhoes_df.copy(), percentual_frota, max_pedidos, n_clusters,
+                                            distancia_maxima_km=max_distancia_km)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def instancia_roteirizacao(chave, _pedidos_df):
+    # Matriz de distâncias somente leitura, compartilhada entre reruns sem cópia
+    return ia.criar_grafo_tsp(_pedidos_df)
 
 # Exemplo de função para definir a ordem de entrega por carga
 def definir_ordem_por_carga(pedidos_df, ordem_tsp):
@@ -28,29 +70,88 @@ def definir_ordem_por_carga(pedidos_df, ordem_tsp):
             pedidos_df.at[idx, 'Ordem de Entrega TSP'] = f"{carga}-{seq}"
     return pedidos_df
 
-def obter_coordenadas(x, coordenadas_salvas):
-    return ia.obter_coordenadas_com_fallback(x, coordenadas_salvas)
+def exibir_estatisticas_geocodificacao(estatisticas):
+    hits = estatisticas['conhecidos'] + estatisticas['cache']
+    st.caption(
+        f"Geocodificação: {estatisticas['linhas']} linhas, {estatisticas['unicos']} endereços únicos — "
+        f"{hits} hits no cache, {estatisticas['geocodificados']} geocodificados, {estatisticas['falhas']} sem coordenadas."
+    )
+
+def exibir_previa(pedidos_df):
+    """
+    Exibe as primeiras LINHAS_PREVIA linhas, destacando em vermelho as placas em rodízio hoje.
+    Estilizar e enviar a planilha inteira ao navegador a cada rerun é o que mais pesa em planilhas grandes.
+    """
+    previa = pedidos_df.head(LINHAS_PREVIA)
+    if len(pedidos_df) > LINHAS_PREVIA:
+        st.caption(f"Exibindo as primeiras {LINHAS_PREVIA} de {len(pedidos_df)} linhas.")
+    if 'Placa' not in previa.columns:
+        st.dataframe(previa)
+        return
+
+    today = datetime.datetime.now().weekday()
+    rodizio_map = {
+        0: {'1', '2'},
+        1: {'3', '4'},
+        2: {'5', '6'},
+        3: {'7', '8'},
+        4: {'9', '0'}
+    }
+    rodizio_numbers = rodizio_map.get(today, set())
+
+    def rodizio_style(val):
+        if isinstance(val, str) and val.strip():
+            last_digit = val.strip()[-1]
+            if last_digit in rodizio_numbers:
+                return 'color: red'
+        return ''
+
+    st.dataframe(previa.style.map(rodizio_style, subset=['Placa']))
+
+def exibir_roteirizacao(resultado):
+    """
+    Exibe um resultado de roteirização guardado em st.session_state.
+    """
+    pedidos_df = resultado["pedidos_df"]
+    if "tsp" in resultado:
+        melhor_rota, menor_distancia = resultado["tsp"]
+        st.write("Melhor rota TSP:")
+        st.write("\n".join(melhor_rota))
+        st.write(f"Menor distância TSP: {menor_distancia:.1f} km")
+    if "vrp" in resultado:
+        st.write(f"Melhor rota VRP: {resultado['vrp']}")
+
+    st.write("Dados dos Pedidos:")
+    st.dataframe(pedidos_df)
+    # HTML guardado por hash do resultado (módulo mapas): os reruns não remontam o mapa
+    import mapas
+    components.html(mapas.html_mapa(pedidos_df, partida=endereco_partida_coords), height=510)
+
+    st.write(f"Resultado salvo em database/colunar (execução {resultado['execucao_id']} registrada no histórico).")
+    st.download_button(
+        "Baixar planilha",
+        data=partial(armazenamento.exportar_excel, pedidos_df),
+        file_name="roterizacao_resultado.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
 
 def verificar_distancias(pedidos_df, max_distancia_km):
-    regioes = pedidos_df['Região'].unique()
-    for regiao in regioes:
-        pedidos_regiao = pedidos_df[pedidos_df['Região'] == regiao]
-        coordenadas = pedidos_regiao[['Latitude', 'Longitude']].values
-        for i, coord1 in enumerate(coordenadas):
-            for coord2 in coordenadas[i+1:]:
-                distancia = geodesic(coord1, coord2).km
-                if distancia > max_distancia_km:
-                    return False, regiao
+    """
+    Verifica, para cada região alocada, se a maior distância entre pedidos não passa de max_distancia_km.
+    Retorna (True, None) ou (False, região com problema).
+    """
+    # Pedidos sem caminhão (região -1 ou região descartada pela distância) ficam com carga 0
+    alocados = pedidos_df[(pedidos_df['Região'] >= 0) & (pedidos_df['Carga'] > 0)]
+    for regiao, pedidos_regiao in alocados.groupby('Região', sort=True):
+        coordenadas = pedidos_regiao[['Latitude', 'Longitude']].to_numpy(dtype=float)
+        if not dentro_do_diametro(coordenadas, max_distancia_km):
+            return False, regiao
     return True, None
 
-def agrupar_por_proximidade(pedidos_df, n_clusters):
-    from sklearn.cluster import KMeans
-    coordenadas = pedidos_df[['Latitude', 'Longitude']].values
-    kmeans = KMeans(n_clusters=n_clusters)
-    pedidos_df['Região'] = kmeans.fit_predict(coordenadas)
-    return pedidos_df
-
 def main():
+    # Os módulos de cálculo só registram mensagens; o destino é definido aqui (e em api.py)
+    logging.basicConfig(level=logging.INFO, filename="roteirizacao.log", filemode="a",
+                        format="%(asctime)s - %(levelname)s - %(message)s")
     st.title("Roteirizador de Pedidos")
     
     st.markdown(
@@ -84,17 +185,11 @@ def main():
             st.info("Aguardando envio da planilha de pedidos.")
         else:
             pedidos_df, coordenadas_salvas = pedidos_result
+            chave = st.session_state["pedidos_chave"]
             
             with st.spinner("Obtendo coordenadas..."):
-                pedidos_df['Latitude'] = pedidos_df['Endereço Completo'].apply(
-                    lambda x: ia.obter_coordenadas_com_fallback(x, coordenadas_salvas)[0]
-                )
-                pedidos_df['Longitude'] = pedidos_df['Endereço Completo'].apply(
-                    lambda x: ia.obter_coordenadas_com_fallback(x, coordenadas_salvas)[1]
-                )
-            pedidos_df['Latitude'] = pedidos_df['Latitude'].fillna(0)
-            pedidos_df['Longitude'] = pedidos_df['Longitude'].fillna(0)
-            salvar_coordenadas(coordenadas_salvas)
+                pedidos_df, estatisticas = geocodificar_pedidos(chave, pedidos_df, coordenadas_salvas)
+            exibir_estatisticas_geocodificacao(estatisticas)
             
             st.write("Cabeçalho da planilha:", list(pedidos_df.columns))
             st.markdown("### Configurações para Roteirização")
@@ -114,34 +209,29 @@ def main():
                 st.warning("A coluna 'Carga' não foi encontrada. Ela será criada com valores padrão.")
                 pedidos_df['Carga'] = pedidos_df.index
 
-            if 'Placa' in pedidos_df.columns:
-                today = datetime.datetime.now().weekday()
-                rodizio_map = {
-                    0: {'1', '2'},
-                    1: {'3', '4'},
-                    2: {'5', '6'},
-                    3: {'7', '8'},
-                    4: {'9', '0'}
-                }
-                rodizio_numbers = rodizio_map.get(today, set())
-
-                def rodizio_style(val):
-                    if isinstance(val, str) and val.strip():
-                        last_digit = val.strip()[-1]
-                        if last_digit in rodizio_numbers:
-                            return 'color: red'
-                    return ''
-                
-                st.dataframe(pedidos_df.style.applymap(rodizio_style, subset=['Placa']))
-            else:
-                st.dataframe(pedidos_df)
+            exibir_previa(pedidos_df)
+
+            versao_caminhoes = armazenamento.versao_atual("caminhoes")
+            parametros = {
+                "pedidos": chave, "caminhoes": versao_caminhoes, "n_clusters": n_clusters,
+                "percentual_frota": percentual_frota, "max_pedidos": max_pedidos,
+                "max_distancia_km": max_distancia_km, "aplicar_tsp": aplicar_tsp, "aplicar_vrp": aplicar_vrp,
+            }
             
             if st.button("Roteirizar"):
-                st.write("Roteirização em execução...")
-                progress_bar = st.empty()
-                for progresso in range(100):
-                    time.sleep(0.05)
-                    progress_bar.progress(progresso + 1)
+                # Barra com a fração real das etapas (pesos aproximados pelo custo de cada uma) e o ETA
+                etapas = {"Agrupamento": 3}
+                if aplicar_tsp or aplicar_vrp:
+                    etapas["Matriz de distâncias"] = 1
+                if aplicar_tsp:
+                    etapas["TSP"] = 4
+                if aplicar_vrp:
+                    etapas["VRP"] = 4
+                etapas["Gravação"] = 1
+                progress_bar = st.progress(0.0, text="Roteirização em execução...")
+                progresso = Progresso(
+                    etapas, lambda estado: progress_bar.progress(estado["fracao"], text=texto_estado(estado))
+                )
 
                 pedidos_df = pedidos_df[pedidos_df['Peso dos Itens'] > 0]
 
@@ -159,31 +249,31 @@ def main():
                     st.stop()
 
                 try:
-                    caminhoes_df = pd.read_excel("database/caminhoes_frota.xlsx", engine="openpyxl")
+                    caminhoes_df = carregar_caminhoes(versao_caminhoes)
                 except FileNotFoundError:
                     st.error("Nenhum caminhão cadastrado. Cadastre a frota na opção 'Cadastro da Frota'.")
                     return
-
-                # Usando a função de agrupamento por proximidade
-                pedidos_df = agrupar_por_proximidade(pedidos_df, n_clusters)
+                # Na primeira leitura a planilha legada da frota é importada e passa a ter versão
+                versao_caminhoes = parametros["caminhoes"] = armazenamento.versao_atual("caminhoes")
+
+                # Agrupamento com capacidade: cada região cabe num caminhão e recebe sua placa.
+                # Etapas em cache informam só início e fim: o cache do Streamlit não permite atualizar
+                # de dentro delas uma barra criada fora
+                progresso.etapa("Agrupamento")
+                pedidos_df = alocar_frota(chave, versao_caminhoes, percentual_frota, max_pedidos, n_clusters,
+                                          max_distancia_km, pedidos_df, caminhoes_df)
+                progresso.concluir_etapa("Agrupamento")
+                for regiao in ia.regioes_descartadas(pedidos_df):
+                    st.warning(f"Os pedidos da região {regiao} excedem {max_distancia_km} km entre si e não foram alocados.")
+                if (pedidos_df['Placa'] == "").any():
+                    st.error("Não foi possível atribuir placas ou números de carga a alguns pedidos.")
 
                 if 'Região' not in pedidos_df.columns or pedidos_df['Região'].isnull().all():
-                    st.error("A coluna 'Região' não foi criada ou está vazia. Verifique os dados e a função 'agrupar_por_proximidade'.")
+                    st.error("A coluna 'Região' não foi criada ou está vazia. "
+                             "Verifique os dados e a função 'otimizar_aproveitamento_frota'.")
                     st.stop()
 
-                pedidos_df = ia.otimizar_aproveitamento_frota(pedidos_df, caminhoes_df, percentual_frota, max_pedidos, n_clusters)
-
-                regioes = pedidos_df['Região'].unique()
-                placas_disponiveis = caminhoes_df['Placa'].tolist()
-
-                if len(regioes) > len(placas_disponiveis):
-                    st.error("O número de regiões excede o número de caminhões disponíveis. Adicione mais caminhões.")
-                    st.stop()
-
-                regiao_para_placa = {regiao: placas_disponiveis[i] for i, regiao in enumerate(regioes)}
-                pedidos_df['Placa'] = pedidos_df['Região'].map(regiao_para_placa)
-
-                regioes_por_caminhao = pedidos_df.groupby('Placa')['Região'].nunique()
+                regioes_por_caminhao = pedidos_df[pedidos_df['Placa'] != ""].groupby('Placa')['Região'].nunique()
                 caminhoes_invalidos = regioes_por_caminhao[regioes_por_caminhao > 1]
 
                 if not caminhoes_invalidos.empty:
@@ -192,45 +282,54 @@ def main():
                         st.write(f"- Caminhão {placa}: {num_regioes} regiões associadas")
                     st.stop()
 
-                pedidos_df = ia.otimizar_aproveitamento_frota(pedidos_df, caminhoes_df, percentual_frota, max_pedidos, n_clusters)
-
                 # Verifica se as distâncias entre pedidos são menores que a distância máxima permitida
                 distancias_validas, regiao_problema = verificar_distancias(pedidos_df, max_distancia_km)
                 if not distancias_validas:
                     st.error(f"Erro: O caminhão foi alocado a pedidos muito distantes na região {regiao_problema}.")
                     st.stop()
 
+                resultado = {"parametros": parametros}
+                if aplicar_tsp or aplicar_vrp:
+                    progresso.etapa("Matriz de distâncias")
+                    instancia = instancia_roteirizacao(
+                        hash_dataframe(pedidos_df, ['Endereço Completo', 'Latitude', 'Longitude']), pedidos_df
+                    )
+                    progresso.concluir_etapa("Matriz de distâncias")
+
                 if aplicar_tsp:
-                    G = ia.criar_grafo_tsp(pedidos_df)
-                    melhor_rota, menor_distancia = ia.resolver_tsp_genetico(G)
-                    st.write("Melhor rota TSP:")
-                    st.write("\n".join(melhor_rota))
-                    st.write(f"Menor distância TSP: {menor_distancia}")
+                    melhor_rota, menor_distancia = ia.resolver_tsp_genetico(instancia, progresso=progresso.etapa("TSP"))
                     pedidos_df = definir_ordem_por_carga(pedidos_df, melhor_rota)
+                    resultado["tsp"] = (melhor_rota, menor_distancia)
 
                 if aplicar_vrp:
-                    rota_vrp = ia.resolver_vrp(pedidos_df, caminhoes_df)
-                    st.write(f"Melhor rota VRP: {rota_vrp}")
-
-                st.write("Dados dos Pedidos:")
-                st.dataframe(pedidos_df)
-                mapa = ia.criar_mapa(pedidos_df)
-                folium_static(mapa)
-
-                output_file_path = "database/roterizacao_resultado.xlsx"
-                pedidos_df.to_excel(output_file_path, index=False)
-                st.write(f"Arquivo salvo: {output_file_path}")
-                with open(output_file_path, "rb") as file:
-                    st.download_button(
-                        "Baixar planilha",
-                        data=file,
-                        file_name="roterizacao_resultado.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+                    # Mesmo percentual de capacidade usado na alocação
+                    caminhoes_vrp = caminhoes_df.assign(**{
+                        coluna: caminhoes_df[coluna] * (percentual_frota / 100) for coluna in ['Capac. Kg', 'Capac. Cx']
+                    })
+                    resultado["vrp"] = ia.resolver_vrp(pedidos_df, caminhoes_vrp, max_pedidos=max_pedidos,
+                                                       instancia=instancia, progresso=progresso.etapa("VRP"))
+
+                # Resultado gravado em Parquet; o Excel só é gerado quando o download é pedido
+                progresso.etapa("Gravação")
+                armazenamento.salvar(pedidos_df, "resultado")
+                historico = Database()
+                historico.create_tables()
+                resultado["execucao_id"] = historico.registrar_execucao(
+                    pedidos_df, {nome: valor for nome, valor in parametros.items() if nome not in ("pedidos", "caminhoes")},
+                    resultado["tsp"][1] if aplicar_tsp else None
+                )
+                resultado["pedidos_df"] = pedidos_df
+                st.session_state["roteirizacao"] = resultado
+                progresso.finalizar()
+
+            # O resultado fica na sessão: outros cliques (ex.: download) não refazem a roteirização,
+            # e qualquer mudança de planilha ou parâmetro o invalida
+            resultado = st.session_state.get("roteirizacao")
+            if resultado is not None and resultado["parametros"] == parametros:
+                exibir_roteirizacao(resultado)
 
     elif menu_opcao == "Cadastro da Frota":
         st.header("Cadastro da Frota")
-        from gerenciamento_frota import cadastrar_caminhoes
         if st.checkbox("Cadastrar Caminhões"):
             cadastrar_caminhoes()
     
@@ -243,19 +342,10 @@ def main():
         else:
             pedidos_df, coordenadas_salvas = pedidos_result
             with st.spinner("Atualizando coordenadas..."):
-                pedidos_df['Latitude'] = pedidos_df.apply(
-                    lambda row: ia.obter_coordenadas_com_fallback(row['Endereço Completo'], coordenadas_salvas)[0]
-                        if row.get('Latitude', 0) == 0 else row['Latitude'],
-                    axis=1
+                pedidos_df, estatisticas = geocodificar_pedidos(
+                    st.session_state["pedidos_chave"], pedidos_df, coordenadas_salvas, apenas_faltantes=True
                 )
-                pedidos_df['Longitude'] = pedidos_df.apply(
-                    lambda row: ia.obter_coordenadas_com_fallback(row['Endereço Completo'], coordenadas_salvas)[1]
-                        if row.get('Longitude', 0) == 0 else row['Longitude'],
-                    axis=1
-                )
-            pedidos_df['Latitude'] = pedidos_df['Latitude'].fillna(0)
-            pedidos_df['Longitude'] = pedidos_df['Longitude'].fillna(0)
-            salvar_coordenadas(coordenadas_salvas)
+            exibir_estatisticas_geocodificacao(estatisticas)
             
             for col in ['Latitude', 'Longitude']:
                 if col not in pedidos_df.columns:
@@ -264,20 +354,18 @@ def main():
 
             st.dataframe(pedidos_df)
             if st.button("Salvar alterações na planilha"):
-                os.makedirs("database", exist_ok=True)
-                pedidos_df.to_excel("database/Pedidos.xlsx", index=False)
+                armazenamento.salvar(pedidos_df, "pedidos")
                 st.success("Planilha editada e salva com sucesso!")
             
-            if os.path.exists("database/Pedidos.xlsx"):
-                with open("database/Pedidos.xlsx", "rb") as file:
-                    st.download_button(
-                        "Baixar planilha de Pedidos",
-                        data=file,
-                        file_name="Pedidos.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+            if armazenamento.versao_atual("pedidos") is not None:
+                st.download_button(
+                    "Baixar planilha de Pedidos",
+                    data=partial(armazenamento.exportar_excel, "pedidos"),
+                    file_name="Pedidos.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
             else:
-                st.error("O arquivo 'Pedidos.xlsx' não foi encontrado. Salve a planilha antes de tentar baixá-la.")
+                st.error("A planilha de pedidos não foi encontrada. Salve a planilha antes de tentar baixá-la.")
     
     elif menu_opcao == "API REST":
         st.header("Interação com API REST")
@@ -285,10 +373,13 @@ def main():
         st.markdown("""
         - **POST /upload**: Faz upload dos arquivos (Pedidos.xlsx, Caminhoes.xlsx, IA.xlsx).
         - **GET /resultado**: Retorna a solução do algoritmo genético.
+        - **POST /jobs** / **GET /jobs/<id>**: Executa /resultado em segundo plano e consulta status, progresso e resultado.
+        - **GET /progresso/<id>**: Acompanha uma execução de /resultado iniciada com ?execucao=<id>.
         - **GET /mapa**: Exibe o mapa interativo.
         """)
         if st.button("Testar /resultado"):
             try:
+                import requests
                 resposta = requests.get("http://localhost:5000/resultado")
                 st.json(resposta.json())
             except Exception as e:
@@ -0,0 +1,191 @@
+"""
+Módulo de mapas
+
+Mapas Folium dos pedidos montados a partir das colunas de coordenadas, sem um folium.Marker
+por linha:
+
+- Os pedidos viram uma única FeatureCollection GeoJSON (um ponto por pedido, com os campos do
+  popup nas propriedades), agrupada com MarkerCluster.
+- A cor de cada ponto vem da primeira coluna de COLUNAS_COR presente (Placa, Carga).
+- As rotas de cada carga (ou placa) são desenhadas como linhas, na ordem de entrega.
+- O HTML gerado é guardado por hash dos dados e das opções (html_mapa), para que a API (/mapa)
+  e o Dashboard reaproveitem o mesmo mapa enquanto o resultado não muda.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import folium
+from folium.plugins import MarkerCluster
+from folium.utilities import JsCode
+
+COLUNAS_COR = ("Placa", "Carga")
+COLUNAS_ROTA = ("Carga", "Placa")
+COLUNA_ORDEM = "Ordem de Entrega TSP"
+CAMPOS_POPUP = ("Nº Pedido", "Nome Cliente", "Endereço Completo", "Placa", "Carga", COLUNA_ORDEM)
+PALETA = (
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f",
+    "#bcbd22", "#17becf", "#393b79", "#637939", "#8c6d31", "#843c39", "#7b4173", "#3182bd",
+)
+COR_PADRAO = PALETA[0]
+CENTRO_PADRAO = (-23.0, -46.0)
+# A partir deste zoom os pontos aparecem todos, sem agrupamento
+ZOOM_SEM_AGRUPAMENTO = 15
+MAPAS_MANTIDOS = 16
+
+# Aplica a cor guardada nas propriedades de cada ponto
+_ESTILO_PONTO = JsCode("""
+function(feature, layer) {
+    if (layer.setStyle) {
+        layer.setStyle({color: feature.properties.cor, fillColor: feature.properties.cor});
+    }
+}
+""")
+
+_lock = threading.Lock()
+_html_por_chave = OrderedDict()
+
+
+def _coordenadas(df):
+    lat = pd.to_numeric(df["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(df["Longitude"], errors="coerce").to_numpy(dtype=float)
+    # Coordenada zero é o marcador de endereço não geocodificado
+    validos = np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+    return lat, lon, validos
+
+
+def _cores(df, cor_por):
+    coluna = next((c for c in cor_por if c in df.columns), None)
+    if coluna is None:
+        return np.full(len(df), COR_PADRAO, dtype=object)
+    codigos, _ = pd.factorize(df[coluna])
+    paleta = np.array(PALETA, dtype=object)
+    # Valores ausentes (código -1) ficam com a cor padrão
+    return np.where(codigos >= 0, paleta[codigos % len(PALETA)], COR_PADRAO)
+
+
+def _numero_ordem(valores):
+    # 'Ordem de Entrega TSP' vem como "<carga>-<seq>" (main.definir_ordem_por_carga) ou como número
+    texto = pd.Series(valores, dtype="str").str.rsplit("-", n=1).str[-1]
+    return pd.to_numeric(texto, errors="coerce").to_numpy(dtype=float)
+
+
+def _rotas(df, lat, lon, cores, partida):
+    coluna = next((c for c in COLUNAS_ROTA if c in df.columns), None)
+    if coluna is None:
+        return []
+    tabela = pd.DataFrame({"grupo": df[coluna].to_numpy(), "lat": lat, "lon": lon, "cor": cores})
+    if COLUNA_ORDEM in df.columns:
+        tabela["ordem"] = _numero_ordem(df[COLUNA_ORDEM].to_numpy())
+        tabela = tabela.sort_values("ordem", kind="stable")
+    linhas = []
+    for grupo, pontos in tabela.groupby("grupo", sort=False):
+        # Carga 0 / vazia = pedidos não alocados
+        if pd.isna(grupo) or grupo == 0 or grupo == "":
+            continue
+        coordenadas = np.column_stack([pontos["lon"].to_numpy(), pontos["lat"].to_numpy()]).tolist()
+        if partida is not None:
+            coordenadas.insert(0, [partida[1], partida[0]])
+        if len(coordenadas) >= 2:
+            linhas.append({
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": coordenadas},
+                "properties": {"rota": str(grupo), "cor": pontos["cor"].iloc[0]},
+            })
+    return linhas
+
+
+def gerar_mapa(pedidos_df, cor_por=COLUNAS_COR, rotas=True, partida=None, zoom_start=12):
+    """
+    Mapa com os pedidos agrupados (MarkerCluster) e, opcionalmente, as rotas.
+
+    Parâmetros:
+      pedidos_df (DataFrame): Pedidos com 'Latitude' e 'Longitude'; linhas sem coordenada válida são ignoradas.
+      cor_por (tuple): Colunas candidatas para a cor dos pontos (usa a primeira presente).
+      rotas (bool): Desenha uma linha por carga (ou placa), na ordem de 'Ordem de Entrega TSP' se existir.
+      partida (tuple): (lat, lon) do ponto de partida, marcado no mapa e usado como início das rotas.
+      zoom_start (int): Zoom inicial.
+
+    Retorna:
+      folium.Map: O mapa.
+    """
+    if pedidos_df.empty or "Latitude" not in pedidos_df.columns or "Longitude" not in pedidos_df.columns:
+        return folium.Map(location=list(partida or CENTRO_PADRAO), zoom_start=zoom_start)
+
+    df = pedidos_df.reset_index(drop=True)
+    lat, lon, validos = _coordenadas(df)
+    df, lat, lon = df[validos].reset_index(drop=True), lat[validos], lon[validos]
+    centro = [float(lat.mean()), float(lon.mean())] if len(df) else list(partida or CENTRO_PADRAO)
+    mapa = folium.Map(location=centro, zoom_start=zoom_start, prefer_canvas=True)
+    if not len(df):
+        return mapa
+
+    cores = _cores(df, cor_por)
+    campos = [c for c in CAMPOS_POPUP if c in df.columns]
+    # Chaves curtas nas propriedades (o popup mostra os nomes das colunas) e coordenadas com
+    # 6 casas (~0,1 m): o tamanho do HTML é dominado por essas repetições
+    chaves = [f"c{i}" for i in range(len(campos))]
+    propriedades = df[campos].astype("str").set_axis(chaves, axis=1).to_dict("records")
+    pontos = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [x, y]}, "properties": {**p, "cor": cor}}
+        for x, y, cor, p in zip(np.round(lon, 6).tolist(), np.round(lat, 6).tolist(), cores.tolist(), propriedades)
+    ]
+
+    if rotas:
+        linhas = _rotas(df, lat, lon, cores, partida)
+        if linhas:
+            folium.GeoJson(
+                {"type": "FeatureCollection", "features": linhas}, name="Rotas",
+                style_function=lambda f: {"color": f["properties"]["cor"], "weight": 3, "opacity": 0.7},
+                tooltip=folium.GeoJsonTooltip(fields=["rota"], aliases=["Rota"]),
+            ).add_to(mapa)
+
+    grupo = MarkerCluster(name="Pedidos", options={"disableClusteringAtZoom": ZOOM_SEM_AGRUPAMENTO,
+                                                    "chunkedLoading": True}).add_to(mapa)
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": pontos},
+        marker=folium.CircleMarker(radius=6, weight=1, fill=True, fill_opacity=0.85),
+        on_each_feature=_ESTILO_PONTO,
+        popup=folium.GeoJsonPopup(fields=chaves, aliases=campos) if campos else None,
+    ).add_to(grupo)
+
+    if partida is not None:
+        folium.Marker(location=list(partida), popup="Endereço de Partida", icon=folium.Icon(color="red")).add_to(mapa)
+    return mapa
+
+
+def chave_mapa(pedidos_df, **opcoes):
+    """Hash dos dados usados no mapa (coordenadas, cores, rotas e popup) e das opções."""
+    colunas = [c for c in ("Latitude", "Longitude") + CAMPOS_POPUP + COLUNAS_COR if c in pedidos_df.columns]
+    colunas = list(dict.fromkeys(colunas))
+    h = hashlib.sha256(repr((colunas, sorted(opcoes.items()))).encode("utf-8"))
+    if len(pedidos_df):
+        h.update(pd.util.hash_pandas_object(pedidos_df[colunas].astype("str"), index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def html_mapa(pedidos_df, **opcoes):
+    """
+    HTML completo do mapa de gerar_mapa, guardado por chave_mapa (as últimas MAPAS_MANTIDOS versões).
+
+    Parâmetros:
+      pedidos_df (DataFrame): Pedidos a exibir.
+      **opcoes: Argumentos de gerar_mapa (cor_por, rotas, partida, zoom_start).
+
+    Retorna:
+      str: Página HTML do mapa.
+    """
+    chave = chave_mapa(pedidos_df, **opcoes)
+    with _lock:
+        if chave in _html_por_chave:
+            _html_por_chave.move_to_end(chave)
+            return _html_por_chave[chave]
+    html = gerar_mapa(pedidos_df, **opcoes).get_root().render()
+    with _lock:
+        _html_por_chave[chave] = html
+        while len(_html_por_chave) > MAPAS_MANTIDOS:
+            _html_por_chave.popitem(last=False)
+    return html
@@ -2,98 +2,195 @@
 Módulo de otimização
 
 Contém funções do algoritmo genético para otimização de cargas.
+
+A população é uma matriz inteira (indivíduos x pedidos) com a posição do caminhão de cada pedido.
+O fitness de toda a população é calculado de uma vez com np.bincount (carga de cada caminhão),
+penalizando o excesso sobre a capacidade (em fração da capacidade de cada caminhão, para kg e
+caixas pesarem igual) e o número de caminhões usados.
 """
 
-import random
 import numpy as np
-import logging
+import pandas as pd
+
+from ilhas import executar_serial, executar_ilhas
 
-logging.basicConfig(level=logging.INFO, filename="optimization.log", filemode="a",
-                    format="%(asctime)s - %(levelname)s - %(message)s")
+def _coluna_numerica(df, coluna):
+    if coluna not in df.columns:
+        return None
+    return pd.to_numeric(df[coluna], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
 
-def populacao_inicial(pedidos_df, caminhoes_df, tamanho=50):
+def populacao_inicial(n_pedidos, n_caminhoes, tamanho=50, rng=None):
     """
     Cria uma população inicial aleatória de soluções.
-    
-    Cada solução é um dicionário mapeando IDs de pedidos a IDs de caminhões.
-    
+
+    Cada solução é uma linha com a posição do caminhão atribuído a cada pedido. Cada indivíduo
+    sorteia quantos caminhões usa (de 1 à frota toda), para a população já conter soluções
+    com menos caminhões.
+
     Retorna:
-      list: População de soluções.
+      ndarray: População (tamanho, n_pedidos).
     """
-    population = []
-    pedidos_ids = pedidos_df.index.tolist()
-    caminhoes_ids = caminhoes_df.index.tolist()
-    for _ in range(tamanho):
-        sol = {pedido: random.choice(caminhoes_ids) for pedido in pedidos_ids}
-        population.append(sol)
-    return population
+    rng = rng or np.random.default_rng()
+    usados = rng.integers(1, n_caminhoes + 1, size=tamanho)
+    caminhoes = np.argsort(rng.random((tamanho, n_caminhoes)), axis=1)
+    posicoes = (rng.random((tamanho, n_pedidos)) * usados[:, None]).astype(np.int64)
+    return np.take_along_axis(caminhoes, posicoes, axis=1)
 
-def avaliacao_fitness(solucao, pedidos_df, caminhoes_df):
+def cargas_por_caminhao(populacao, valores, n_caminhoes):
     """
-    Calcula o fitness de uma solução.
-    
-    Exemplo: usa o inverso da soma dos 'Peso dos Itens'.
-    
+    Soma `valores` por caminhão para cada indivíduo, com um único np.bincount.
+
     Retorna:
-      float: Valor de fitness.
+      ndarray: Cargas (indivíduos, n_caminhoes).
     """
-    fitness = 0
-    for pedido, caminhao in solucao.items():
-        fitness += pedidos_df.loc[pedido, "Peso dos Itens"]
-    return 1.0 / (fitness + 1e-6)
+    m, n = populacao.shape
+    deslocados = populacao + (np.arange(m) * n_caminhoes)[:, None]
+    pesos = None if valores is None else np.broadcast_to(valores, (m, n)).ravel()
+    return np.bincount(deslocados.ravel(), weights=pesos, minlength=m * n_caminhoes).reshape(m, n_caminhoes)
+
+def _excesso_relativo(cargas, capacidades):
+    # Excesso de cada caminhão como fração da sua capacidade: kg e caixas na mesma escala
+    capacidades = np.asarray(capacidades, dtype=np.float64)
+    escala = np.where(np.isfinite(capacidades) & (capacidades > 0), capacidades, 1.0)
+    return (np.clip(cargas - capacidades, 0, None) / escala).sum(axis=1)
+
+def avaliacao_fitness(populacao, pesos, capacidades_kg, caixas=None, capacidades_cx=None,
+                      penalidade_sobrecarga=10.0):
+    """
+    Calcula o fitness de todos os indivíduos.
+
+    Custo = caminhões usados + penalidade_sobrecarga * (excesso de kg + excesso de caixas), com o
+    excesso de cada caminhão dividido pela sua capacidade: com a penalidade padrão, passar 10% da
+    capacidade de um caminhão custa o mesmo que usar mais um caminhão.
+
+    Retorna:
+      ndarray: fitness = 1 / (1 + custo) de cada indivíduo (maior é melhor).
+    """
+    n_caminhoes = len(capacidades_kg)
+    usados = (cargas_por_caminhao(populacao, None, n_caminhoes) > 0).sum(axis=1)
+    excesso = _excesso_relativo(cargas_por_caminhao(populacao, pesos, n_caminhoes), capacidades_kg)
+    if caixas is not None and capacidades_cx is not None:
+        excesso += _excesso_relativo(cargas_por_caminhao(populacao, caixas, n_caminhoes), capacidades_cx)
+    return 1.0 / (1.0 + usados + penalidade_sobrecarga * excesso)
 
 def selecionar(population, fitnesses, num=10):
     """
     Seleciona as melhores soluções com base em sua fitness.
-    
+
     Retorna:
-      list: Subconjunto da população.
+      ndarray: Subconjunto da população.
     """
-    sorted_population = [sol for _, sol in sorted(zip(fitnesses, population), key=lambda x: x[0], reverse=True)]
-    return sorted_population[:num]
+    return population[np.argsort(fitnesses)[::-1][:num]]
 
-def cruzar(sol1, sol2):
+def cruzar(pais1, pais2, rng):
     """
-    Realiza crossover entre duas soluções.
+    Realiza crossover uniforme entre pares de soluções com uma máscara aleatória.
     """
-    filho = {}
-    for key in sol1.keys():
-        filho[key] = sol1[key] if random.random() < 0.5 else sol2[key]
-    return filho
+    return np.where(rng.random(pais1.shape) < 0.5, pais1, pais2)
 
-def mutacao(solucao, caminhoes_ids, taxa=0.1):
+def mutacao(populacao, n_caminhoes, rng, taxa=0.1):
     """
-    Aplica mutação à solução, alterando mapeamentos aleatórios.
+    Aplica mutação à população: cada posição da máscara recebe o caminhão de outro pedido
+    do mesmo indivíduo (sem abrir caminhões novos) ou, em 1 de cada 100 casos, um caminhão sorteado
+    (que pode estar fechado).
     """
-    for pedido in solucao.keys():
-        if random.random() < taxa:
-            solucao[pedido] = random.choice(caminhoes_ids)
-    return solucao
+    n = populacao.shape[1]
+    linhas, colunas = np.nonzero(rng.random(populacao.shape) < taxa)
+    novos = populacao[linhas, rng.integers(0, n, size=len(linhas))]
+    sorteados = rng.random(len(linhas)) < 0.01
+    novos[sorteados] = rng.integers(0, n_caminhoes, size=int(sorteados.sum()))
+    populacao[linhas, colunas] = novos
+    return populacao
 
-def run_genetic_algorithm(pedidos_df, caminhoes_df, geracoes=100, tamanho_pop=50):
+def fechar_caminhao(populacao, rng, taxa=0.2):
+    """
+    Em uma fração `taxa` dos indivíduos, fecha um dos caminhões usados: seus pedidos passam para
+    caminhões de outros pedidos do mesmo indivíduo. É o que permite ao GA reduzir a frota, já que
+    cruzamento e mutação raramente esvaziam um caminhão inteiro.
+    """
+    m, n = populacao.shape
+    for linha in np.flatnonzero(rng.random(m) < taxa):
+        individuo = populacao[linha]
+        fechado = individuo[rng.integers(0, n)]
+        mover = individuo == fechado
+        restantes = individuo[~mover]
+        if len(restantes):
+            individuo[mover] = restantes[rng.integers(0, len(restantes), size=int(mover.sum()))]
+    return populacao
+
+class ProblemaCargas:
+    """
+    Operadores do GA de cargas na interface usada por ilhas.executar_serial / executar_ilhas.
+    O custo (menor é melhor) é 1/fitness - 1: caminhões usados + penalidade de sobrecarga.
+    """
+
+    def __init__(self, pesos, capacidades_kg, caixas=None, capacidades_cx=None,
+                 penalidade_sobrecarga=10.0, tamanho_pop=50, num_pais=10, taxa_mutacao=0.1):
+        self.pesos = pesos
+        self.capacidades_kg = capacidades_kg
+        self.caixas = caixas
+        self.capacidades_cx = capacidades_cx
+        self.penalidade_sobrecarga = penalidade_sobrecarga
+        self.tamanho_pop = tamanho_pop
+        self.num_pais = min(num_pais, tamanho_pop)
+        self.taxa_mutacao = taxa_mutacao
+        self.n_genes = len(pesos)
+        self.n_caminhoes = len(capacidades_kg)
+
+    def custos(self, populacao):
+        fitnesses = avaliacao_fitness(populacao, self.pesos, self.capacidades_kg, self.caixas,
+                                      self.capacidades_cx, self.penalidade_sobrecarga)
+        return 1.0 / fitnesses - 1.0
+
+    def iniciar(self, rng):
+        populacao = populacao_inicial(self.n_genes, self.n_caminhoes, tamanho=self.tamanho_pop, rng=rng)
+        return populacao, self.custos(populacao)
+
+    def geracao(self, populacao, custos, rng, numero):
+        melhores = selecionar(populacao, -custos, num=self.num_pais)
+        pares = rng.integers(0, len(melhores), size=(2, self.tamanho_pop))
+        nova = cruzar(melhores[pares[0]], melhores[pares[1]], rng)
+        nova = mutacao(nova, self.n_caminhoes, rng, taxa=self.taxa_mutacao)
+        nova = fechar_caminhao(nova, rng)
+        # Elitismo: a melhor solução atual permanece na população
+        nova[0] = melhores[0]
+        return nova, self.custos(nova)
+
+def run_genetic_algorithm(pedidos_df, caminhoes_df, geracoes=100, tamanho_pop=50, penalidade_sobrecarga=10.0,
+                          semente=None, ilhas=1, tempo_limite_s=None, geracoes_por_epoca=10, n_migrantes=2,
+                          progresso=None):
     """
     Executa o algoritmo genético e retorna a melhor solução encontrada.
-    
+
+    Usa 'Peso dos Itens' contra 'Capac. Kg' e, se existirem, 'Qtde. dos Itens' contra 'Capac. Cx'.
+    Com ilhas > 1 (ou None, um por núcleo), executa o modelo de ilhas em processos paralelos
+    com migração de elite a cada `geracoes_por_epoca` gerações e orçamento global `tempo_limite_s`.
+    `progresso` é uma função opcional progresso(concluidos, total) das gerações.
+
     Retorna:
-      dict: Contendo a solução e o fitness.
+      dict: Contendo a solução ({pedido: caminhão}) e o fitness.
     """
-    population = populacao_inicial(pedidos_df, caminhoes_df, tamanho=tamanho_pop)
     pedidos_ids = pedidos_df.index.tolist()
     caminhoes_ids = caminhoes_df.index.tolist()
-    melhor_solucao = None
-    melhor_fitness = -np.inf
-    for _ in range(geracoes):
-        fitnesses = [avaliacao_fitness(sol, pedidos_df, caminhoes_df) for sol in population]
-        melhores = selecionar(population, fitnesses, num=10)
-        nova_pop = []
-        for _ in range(tamanho_pop):
-            sol1, sol2 = random.sample(melhores, 2)
-            filho = cruzar(sol1, sol2)
-            filho = mutacao(filho, caminhoes_ids)
-            nova_pop.append(filho)
-        population = nova_pop
-        melhor_iter = max(fitnesses)
-        if melhor_iter > melhor_fitness:
-            melhor_fitness = melhor_iter
-            melhor_solucao = population[fitnesses.index(melhor_iter)]
-    return {"solucao": melhor_solucao, "fitness": melhor_fitness} 
+    n_caminhoes = len(caminhoes_ids)
+    if not pedidos_ids or not n_caminhoes:
+        return {"solucao": {}, "fitness": 0.0}
+
+    pesos = _coluna_numerica(pedidos_df, "Peso dos Itens")
+    if pesos is None:
+        pesos = np.zeros(len(pedidos_ids))
+    capacidades_kg = _coluna_numerica(caminhoes_df, "Capac. Kg")
+    if capacidades_kg is None:
+        capacidades_kg = np.full(n_caminhoes, np.inf)
+    problema = ProblemaCargas(
+        pesos, capacidades_kg, _coluna_numerica(pedidos_df, "Qtde. dos Itens"),
+        _coluna_numerica(caminhoes_df, "Capac. Cx"), penalidade_sobrecarga, tamanho_pop
+    )
+
+    if ilhas == 1:
+        melhor_solucao, custo = executar_serial(problema, geracoes, semente, tempo_limite_s, progresso=progresso)
+    else:
+        melhor_solucao, custo = executar_ilhas(problema, geracoes, ilhas, geracoes_por_epoca, n_migrantes,
+                                               semente, tempo_limite_s, progresso=progresso)
+    solucao = dict(zip(pedidos_ids, np.asarray(caminhoes_ids)[melhor_solucao].tolist()))
+    return {"solucao": solucao, "fitness": 1.0 / (1.0 + custo)}
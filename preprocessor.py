@@ -6,10 +6,6 @@ Realiza a validação, limpeza e normalização dos dados recebidos nas planilha
 
 import pandas as pd
 import numpy as np
-import logging
-
-logging.basicConfig(level=logging.INFO, filename="preprocessor.log", filemode="a",
-                    format="%(asctime)s - %(levelname)s - %(message)s")
 
 def preprocessar_dados(df):
     """
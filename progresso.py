@@ -0,0 +1,142 @@
+"""
+Módulo de acompanhamento de progresso
+
+Uma execução (ex.: "Roteirizar" ou GET /resultado) é dividida em etapas com pesos relativos.
+Cada etapa recebe um callback no formato já usado pelo projeto, progresso(concluidos, total),
+e Progresso combina as etapas numa fração global e numa estimativa de tempo restante (ETA).
+
+O estado (Progresso.estado()) é um dict serializável em JSON: a barra do Streamlit o recebe
+por ao_atualizar e a API o devolve no endpoint de acompanhamento (GET /progresso/<id>).
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+INTERVALO_MINIMO_S = 0.2
+EXECUCOES_MANTIDAS = 100
+
+
+class Progresso:
+    """
+    Progresso de uma execução dividida em etapas.
+
+    Parâmetros:
+      etapas (dict | list): {nome: peso} ou lista de nomes (pesos iguais), na ordem de execução.
+      ao_atualizar (callable): Função opcional chamada com estado() a cada atualização
+        (no máximo uma vez a cada intervalo_minimo_s, exceto no início e no fim de cada etapa).
+      intervalo_minimo_s (float): Intervalo mínimo entre chamadas de ao_atualizar.
+    """
+
+    def __init__(self, etapas, ao_atualizar=None, intervalo_minimo_s=INTERVALO_MINIMO_S):
+        self._pesos = dict(etapas) if isinstance(etapas, dict) else {nome: 1.0 for nome in etapas}
+        self._total_pesos = sum(self._pesos.values()) or 1.0
+        self._fracoes = {nome: 0.0 for nome in self._pesos}
+        self._ao_atualizar = ao_atualizar
+        self._intervalo_minimo_s = intervalo_minimo_s
+        self._ultima_notificacao = 0.0
+        self._inicio = time.monotonic()
+        self._fim = None
+        self._lock = threading.Lock()
+        self.etapa_atual = None
+        self.erro = None
+
+    def etapa(self, nome):
+        """
+        Inicia a etapa `nome` e retorna seu callback progresso(concluidos, total).
+        """
+        self._atualizar(nome, 0.0, forcar=True)
+        return lambda concluidos, total: self._atualizar(nome, concluidos / total if total else 1.0)
+
+    def concluir_etapa(self, nome):
+        self._atualizar(nome, 1.0, forcar=True)
+
+    def finalizar(self, erro=None):
+        """Encerra a execução; com erro, o estado passa a informá-lo."""
+        with self._lock:
+            self._fim = time.monotonic()
+            self.erro = None if erro is None else str(erro)
+            if erro is None:
+                self._fracoes = dict.fromkeys(self._fracoes, 1.0)
+        self._notificar(forcar=True)
+
+    @property
+    def fracao(self):
+        """Fração concluída da execução (0 a 1), ponderada pelos pesos das etapas."""
+        return sum(self._pesos[nome] * fracao for nome, fracao in self._fracoes.items()) / self._total_pesos
+
+    def estado(self):
+        """
+        Retorna:
+          dict: 'etapa', 'fracao', 'decorrido_s', 'eta_s' (None enquanto não há base para estimar),
+          'concluido' e 'erro'.
+        """
+        with self._lock:
+            fracao = self.fracao
+            decorrido = (self._fim or time.monotonic()) - self._inicio
+            concluido = self._fim is not None
+            eta = None
+            if concluido:
+                eta = 0.0
+            elif fracao > 0:
+                eta = decorrido * (1 - fracao) / fracao
+            return {
+                "etapa": self.etapa_atual,
+                "fracao": round(fracao, 4),
+                "decorrido_s": round(decorrido, 1),
+                "eta_s": None if eta is None else round(eta, 1),
+                "concluido": concluido,
+                "erro": self.erro,
+            }
+
+    def _atualizar(self, nome, fracao, forcar=False):
+        with self._lock:
+            if nome not in self._fracoes:
+                # Etapa não prevista: entra com peso 1
+                self._pesos[nome] = 1.0
+                self._total_pesos += 1.0
+                self._fracoes[nome] = 0.0
+            self.etapa_atual = nome
+            # Uma etapa que recomeça (ex.: nova tentativa do agrupamento) não faz a barra voltar
+            self._fracoes[nome] = max(self._fracoes[nome], min(max(fracao, 0.0), 1.0))
+        self._notificar(forcar)
+
+    def _notificar(self, forcar=False):
+        if self._ao_atualizar is None:
+            return
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_notificacao < self._intervalo_minimo_s:
+            return
+        self._ultima_notificacao = agora
+        self._ao_atualizar(self.estado())
+
+
+def texto_estado(estado):
+    """Descrição curta de um estado, para barras de progresso."""
+    texto = f"{estado['etapa'] or 'Iniciando'}: {estado['fracao']:.0%}"
+    if estado["eta_s"] is not None and not estado["concluido"]:
+        texto += f" (restam ~{estado['eta_s']:.0f} s)"
+    return texto
+
+
+class RegistroProgresso:
+    """
+    Progresso das últimas execuções por id, para consulta por polling (ex.: GET /progresso/<id>).
+    """
+
+    def __init__(self, maximo=EXECUCOES_MANTIDAS):
+        self._maximo = maximo
+        self._execucoes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def registrar(self, execucao_id, progresso):
+        with self._lock:
+            self._execucoes[execucao_id] = progresso
+            self._execucoes.move_to_end(execucao_id)
+            while len(self._execucoes) > self._maximo:
+                self._execucoes.popitem(last=False)
+        return progresso
+
+    def obter(self, execucao_id):
+        with self._lock:
+            return self._execucoes.get(execucao_id)
@@ -0,0 +1,107 @@
+"""
+Servidor de produção da API REST
+
+Ponto de entrada WSGI de api.py para um servidor de produção, no lugar de app.run()
+(servidor de desenvolvimento do Flask, um único processo):
+
+    gunicorn -c gunicorn.conf.py "servidor:criar_app()"
+
+ou, com uvicorn (interface WSGI; cada processo executa criar_app e se aquece sozinho):
+
+    uvicorn --factory --interface wsgi --workers 1 --host 0.0.0.0 --port 5000 servidor:criar_app
+
+- criar_app importa api.py (Flask, pandas, folium, geopy, openpyxl...) e aquece o processo:
+  carrega os templates do folium, cria/migra o cache de geocodificação, prepara os pedidos e
+  caminhões já enviados (cache_conjuntos) e gera o HTML do mapa (mapas.html_mapa). Com
+  preload_app (gunicorn.conf.py) isso é feito uma vez no processo principal, e os workers
+  herdam tudo pronto pelo fork.
+- aquecer_trabalhador roda em cada worker depois do fork e abre a conexão SQLite do próprio
+  processo (uma conexão não deve ser compartilhada entre processos).
+- Processos e threads: config.API_PROCESSOS (1 por padrão) e config.API_THREADS.
+
+A fila de tarefas (POST /jobs) e o progresso (GET /progresso/<id>) ficam na memória do
+processo: com mais de um worker, o cliente só encontra a tarefa no worker que a criou. Por
+isso a API roda num único processo e escala com threads (API_THREADS); só aumente
+API_PROCESSOS se esses endpoints não forem usados.
+"""
+
+import time
+import logging
+
+
+def aquecer():
+    """
+    Paga no início, e não na primeira requisição, os custos de importação e de preparação.
+
+    Retorna:
+      dict: Tempo (segundos) de cada etapa do aquecimento.
+    """
+    tempos = {}
+
+    inicio = time.perf_counter()
+    import openpyxl  # noqa: F401 (importado sob demanda por leitura_excel)
+    import pandas as pd
+    import mapas
+    import api
+    tempos["importacoes"] = time.perf_counter() - inicio
+
+    # O primeiro render carrega os templates Jinja do folium
+    inicio = time.perf_counter()
+    mapas.gerar_mapa(pd.DataFrame({"Latitude": [-23.5], "Longitude": [-46.6], "Placa": ["-"]})).get_root().render()
+    tempos["folium"] = time.perf_counter() - inicio
+
+    # Cria o banco de cache (e importa as planilhas antigas) uma única vez; a conexão é fechada
+    # para não ser herdada pelos workers
+    import cache_geocodificacao
+    inicio = time.perf_counter()
+    cache_geocodificacao.conectar()
+    cache_geocodificacao.fechar()
+    tempos["cache_geocodificacao"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for preparar in (api.caminhoes_preparados, api.pedidos_preparados):
+        try:
+            preparar()
+        except FileNotFoundError:
+            pass  # Ainda não enviado; será preparado no POST /upload
+        except Exception as e:
+            logging.error(f"Aquecimento: não foi possível preparar os dados ({preparar.__name__}): {e}")
+    cache_geocodificacao.fechar()
+    tempos["conjuntos"] = time.perf_counter() - inicio
+
+    # HTML do /mapa dos pedidos já preparados
+    inicio = time.perf_counter()
+    try:
+        mapas.html_mapa(api.pedidos_preparados())
+    except Exception:
+        pass  # Sem pedidos preparados; o mapa é gerado na primeira requisição
+    tempos["mapa"] = time.perf_counter() - inicio
+
+    logging.info("Aquecimento da API: " + ", ".join(f"{etapa} {t:.2f} s" for etapa, t in tempos.items()))
+    return tempos
+
+
+def aquecer_trabalhador():
+    """
+    Aquecimento de cada worker depois do fork: abre a conexão do cache de geocodificação
+    e carrega suas páginas no cache do SQLite.
+    """
+    import cache_geocodificacao
+    conn = cache_geocodificacao.conectar()
+    conn.execute("SELECT COUNT(*) FROM coordenadas").fetchone()
+
+
+def criar_app(aquecer_agora=True):
+    """
+    Fábrica do app WSGI (Flask) da API.
+
+    Parâmetros:
+      aquecer_agora (bool): Executa aquecer() antes de retornar o app.
+
+    Retorna:
+      Flask: O app de api.py.
+    """
+    import api
+    if aquecer_agora:
+        aquecer()
+    return api.app
@@ -1,52 +1,54 @@
 import streamlit as st
-import pandas as pd
 from io import BytesIO
 
+import armazenamento
+import cache_geocodificacao
+from geocoding import montar_endereco_completo
+from leitura_excel import TIPOS_PEDIDOS
+
 REQUIRED_COLUMNS = ["Endereço de Entrega", "Bairro de Entrega", "Cidade de Entrega"]
 
+@st.cache_data(show_spinner=False, max_entries=4)
+def _preparar_pedidos(chave, _uploaded_pedidos):
+    # Só executa quando muda o conteúdo da planilha (chave); os reruns do Streamlit recebem uma cópia do cache.
+    # O Excel é convertido em Parquet uma única vez por conteúdo e as colunas necessárias são
+    # conferidas no cabeçalho, antes de ler as linhas da planilha.
+    pedidos_df = armazenamento.importar_excel(_uploaded_pedidos, "pedidos_upload", REQUIRED_COLUMNS,
+                                              tipos=TIPOS_PEDIDOS)
+
+    # Cria a coluna 'Endereço Completo'
+    pedidos_df = montar_endereco_completo(pedidos_df)
+
+    # Carrega do cache SQLite somente as coordenadas dos endereços deste envio
+    try:
+        coordenadas_salvas = cache_geocodificacao.buscar_coordenadas(pedidos_df['Endereço Completo'].unique())
+    except Exception as e:
+        st.warning("Não foi possível ler o cache de coordenadas: " + str(e))
+        coordenadas_salvas = {}
+    return pedidos_df, coordenadas_salvas
+
 def processar_pedidos():
+    """
+    Recebe a planilha de pedidos e retorna (pedidos_df, coordenadas_salvas), ou None sem planilha.
+
+    O hash do conteúdo enviado fica em st.session_state["pedidos_chave"], para servir de chave
+    aos caches das etapas seguintes (geocodificação, agrupamento, matriz de distâncias).
+    """
     uploaded_pedidos = st.file_uploader("Escolha o arquivo Excel de Pedidos", type=["xlsx", "xlsm"])
     if uploaded_pedidos is None:
         st.info("Envie a planilha de pedidos para continuação.")
         return None
 
+    chave = armazenamento.hash_conteudo(uploaded_pedidos.getvalue())
     try:
-        pedidos_df = pd.read_excel(uploaded_pedidos, engine='openpyxl')
+        pedidos_df, coordenadas_salvas = _preparar_pedidos(chave, uploaded_pedidos)
     except Exception as e:
         st.error("Erro ao ler a planilha: " + str(e))
         return None
 
-    # Verifica se as colunas necessárias estão presentes
-    missing_cols = [col for col in REQUIRED_COLUMNS if col not in pedidos_df.columns]
-    if missing_cols:
-        st.error(f"As seguintes colunas necessárias não foram encontradas: {', '.join(missing_cols)}")
-        return None
-
-    # Cria a coluna 'Endereço Completo'
-    pedidos_df['Endereço Completo'] = (
-        pedidos_df['Endereço de Entrega'].astype(str) + ', ' +
-        pedidos_df['Bairro de Entrega'].astype(str) + ', ' +
-        pedidos_df['Cidade de Entrega'].astype(str)
-    )
-    
-    # Carrega coordenadas salvas (se houver)
-    try:
-        coordenadas_salvas_df = pd.read_excel("database/coordenadas_salvas.xlsx", engine='openpyxl')
-        coordenadas_salvas = dict(zip(
-            coordenadas_salvas_df['Endereço'],
-            zip(coordenadas_salvas_df['Latitude'], coordenadas_salvas_df['Longitude'])
-        ))
-    except FileNotFoundError:
-        coordenadas_salvas = {}
-    
+    st.session_state["pedidos_chave"] = chave
     return pedidos_df, coordenadas_salvas
 
 def salvar_coordenadas(coordenadas_salvas):
-    # Salva as coordenadas atualizadas num arquivo Excel
-    coordenadas_salvas_df = pd.DataFrame(coordenadas_salvas.items(), columns=['Endereço', 'Coordenadas'])
-    coordenadas_salvas_df[['Latitude','Longitude']] = pd.DataFrame(
-        coordenadas_salvas_df['Coordenadas'].tolist(),
-        index=coordenadas_salvas_df.index
-    )
-    coordenadas_salvas_df.drop(columns=['Coordenadas'], inplace=True)
-    coordenadas_salvas_df.to_excel("database/coordenadas_salvas.xlsx", index=False)
\ No newline at end of file
+    # Grava no cache SQLite apenas as coordenadas que ainda não estavam salvas
+    return cache_geocodificacao.salvar_coordenadas(coordenadas_salvas)
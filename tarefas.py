@@ -0,0 +1,178 @@
+"""
+Módulo de tarefas assíncronas
+
+Fila de tarefas longas (ex.: o pipeline de /resultado) executadas num pool de processos,
+fora da thread da requisição HTTP:
+
+- Cada tarefa tem um id; o estado (pendente, executando, concluida, falhou), o progresso
+  (módulo progresso) e o resultado são consultados por esse id.
+- Cada tarefa tem uma chave: o hash das entradas e dos parâmetros (chave_tarefa). Uma submissão
+  com a mesma chave de uma tarefa pendente ou em execução recebe essa mesma tarefa, e uma com a
+  chave de uma tarefa concluída recebe o resultado memorizado, sem executar de novo.
+- Os processos de trabalho enviam o progresso por uma fila; uma thread do processo principal
+  o repassa às tarefas.
+"""
+
+import json
+import uuid
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing as mp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from progresso import Progresso
+
+TAREFAS_MANTIDAS = 200
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+
+# No processo de trabalho: fila por onde o progresso volta ao processo principal
+_fila_progresso = None
+
+
+def chave_tarefa(*partes):
+    """Hash (hex, 16 caracteres) de partes serializáveis em JSON (entradas e parâmetros)."""
+    texto = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+def _iniciar_trabalhador(fila):
+    global _fila_progresso
+    _fila_progresso = fila
+
+
+def _executar(tarefa_id, funcao, args, kwargs, etapas):
+    _fila_progresso.put((tarefa_id, EXECUTANDO, None))
+    progresso = Progresso(etapas, lambda estado: _fila_progresso.put((tarefa_id, EXECUTANDO, estado)))
+    try:
+        resultado = funcao(*args, progresso=progresso, **kwargs)
+    except Exception as e:
+        progresso.finalizar(e)
+        raise
+    progresso.finalizar()
+    return resultado, progresso.estado()
+
+
+class FilaTarefas:
+    """
+    Pool de processos com memorização e agrupamento de tarefas idênticas.
+
+    Parâmetros:
+      processos (int): Número de processos de trabalho (criados na primeira submissão).
+      maximo (int): Quantas tarefas encerradas manter (as mais antigas são descartadas).
+    """
+
+    def __init__(self, processos=2, maximo=TAREFAS_MANTIDAS):
+        self._processos = max(1, processos)
+        self._maximo = maximo
+        self._tarefas = OrderedDict()
+        self._por_chave = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._fila = None
+
+    def _iniciar(self):
+        if self._executor is None:
+            contexto = mp.get_context()
+            self._fila = contexto.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._processos, mp_context=contexto,
+                initializer=_iniciar_trabalhador, initargs=(self._fila,),
+            )
+            threading.Thread(target=self._receber_progresso, args=(self._fila,), daemon=True).start()
+
+    def _receber_progresso(self, fila):
+        while True:
+            mensagem = fila.get()
+            if mensagem is None:
+                return
+            tarefa_id, status, estado = mensagem
+            with self._lock:
+                tarefa = self._tarefas.get(tarefa_id)
+                if tarefa is not None and tarefa["status"] in (PENDENTE, EXECUTANDO):
+                    tarefa["status"] = status
+                    if estado is not None:
+                        tarefa["progresso"] = estado
+
+    def submeter(self, chave, funcao, args=(), kwargs=None, etapas=None):
+        """
+        Submete funcao(*args, progresso=..., **kwargs) ao pool, ou reaproveita uma tarefa com a mesma chave.
+
+        A função precisa ser picklável (definida no nível de um módulo) e aceitar o argumento
+        progresso (um progresso.Progresso com as `etapas` informadas).
+
+        Retorna:
+          dict: Estado da tarefa (ver consultar).
+          bool: True se uma tarefa existente (em andamento ou concluída) foi reaproveitada.
+        """
+        with self._lock:
+            existente = self._tarefas.get(self._por_chave.get(chave))
+            if existente is not None and existente["status"] != FALHOU:
+                return self._resumo(existente), True
+
+            self._iniciar()
+            tarefa_id = uuid.uuid4().hex
+            tarefa = {
+                "id": tarefa_id, "chave": chave, "status": PENDENTE, "progresso": None,
+                "resultado": None, "erro": None, "criada_em": time.time(), "encerrada_em": None,
+            }
+            self._tarefas[tarefa_id] = tarefa
+            self._por_chave[chave] = tarefa_id
+            self._descartar_antigas()
+            futuro = self._executor.submit(_executar, tarefa_id, funcao, tuple(args), dict(kwargs or {}),
+                                           etapas or {})
+        futuro.add_done_callback(lambda f: self._encerrar(tarefa_id, f))
+        return self._resumo(tarefa), False
+
+    def _encerrar(self, tarefa_id, futuro):
+        erro = futuro.exception()
+        with self._lock:
+            tarefa = self._tarefas.get(tarefa_id)
+            if tarefa is None:
+                return
+            tarefa["encerrada_em"] = time.time()
+            if erro is None:
+                tarefa["status"] = CONCLUIDA
+                tarefa["resultado"], tarefa["progresso"] = futuro.result()
+            else:
+                logging.error(f"Tarefa {tarefa_id} falhou: {erro!r}")
+                tarefa["status"] = FALHOU
+                tarefa["erro"] = str(erro)
+
+    def _descartar_antigas(self):
+        encerradas = [tid for tid, t in self._tarefas.items() if t["status"] in (CONCLUIDA, FALHOU)]
+        excesso = len(self._tarefas) - self._maximo
+        for tarefa_id in encerradas[:max(0, excesso)]:
+            tarefa = self._tarefas.pop(tarefa_id)
+            if self._por_chave.get(tarefa["chave"]) == tarefa_id:
+                del self._por_chave[tarefa["chave"]]
+
+    @staticmethod
+    def _resumo(tarefa):
+        resumo = {campo: tarefa[campo] for campo in ("id", "status", "progresso", "erro")}
+        if tarefa["status"] == CONCLUIDA:
+            resumo["resultado"] = tarefa["resultado"]
+        return resumo
+
+    def consultar(self, tarefa_id):
+        """
+        Retorna:
+          dict: 'id', 'status', 'progresso' (Progresso.estado() mais recente), 'erro' e,
+          se concluída, 'resultado'; ou None se a tarefa não existir.
+        """
+        with self._lock:
+            tarefa = self._tarefas.get(tarefa_id)
+            return None if tarefa is None else self._resumo(tarefa)
+
+    def encerrar(self):
+        """Encerra o pool, aguardando as tarefas em andamento."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._fila.put(None)
+            self._executor = None
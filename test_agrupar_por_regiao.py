@@ -0,0 +1,59 @@
+"""
+Testes do módulo agrupar_por_regiao: cache pelo conjunto de coordenadas e warm start pela área.
+
+    pytest test_agrupar_por_regiao.py
+"""
+
+import numpy as np
+import pytest
+
+import agrupar_por_regiao
+
+
+@pytest.fixture
+def inicios(monkeypatch):
+    # Registra a inicialização (init, n_init) de cada K-Means ajustado
+    from sklearn import cluster
+
+    registrados = []
+    original = cluster.KMeans
+
+    def kmeans(*args, **kwargs):
+        registrados.append((kwargs["init"], kwargs["n_init"]))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cluster, "KMeans", kmeans)
+    monkeypatch.setattr(agrupar_por_regiao, "_cache", type(agrupar_por_regiao._cache)())
+    monkeypatch.setattr(agrupar_por_regiao, "_centroides_anteriores", type(agrupar_por_regiao._cache)())
+    return registrados
+
+
+def _pontos(centro, n, semente):
+    return np.random.default_rng(semente).normal(centro, 0.03, (n, 2))
+
+
+def test_mesmo_conjunto_vem_do_cache(inicios):
+    pontos = _pontos((-23.55, -46.63), 300, 0)
+    primeiro, _ = agrupar_por_regiao.rotular_regioes(pontos, 4)
+    segundo, _ = agrupar_por_regiao.rotular_regioes(pontos, 4)
+
+    assert len(inicios) == 1
+    assert np.array_equal(primeiro, segundo)
+
+
+def test_warm_start_com_pedidos_novos_na_mesma_area(inicios):
+    pontos = _pontos((-23.55, -46.63), 300, 0)
+    _, centroides = agrupar_por_regiao.rotular_regioes(pontos, 4)
+    agrupar_por_regiao.rotular_regioes(np.vstack([pontos, _pontos((-23.55, -46.63), 20, 1)]), 4)
+
+    init, n_init = inicios[-1]
+    assert n_init == 1
+    assert isinstance(init, np.ndarray) and init.shape == centroides.shape
+
+
+def test_sem_warm_start_em_outra_area_ou_outro_numero_de_regioes(inicios):
+    agrupar_por_regiao.rotular_regioes(_pontos((-23.55, -46.63), 300, 0), 4)
+    agrupar_por_regiao.rotular_regioes(_pontos((-22.90, -43.17), 300, 0), 4)
+    agrupar_por_regiao.rotular_regioes(_pontos((-23.55, -46.63), 310, 2), 5)
+
+    assert [init for init, _ in inicios] == ["k-means++"] * 3
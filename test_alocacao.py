@@ -0,0 +1,119 @@
+"""
+Testes da alocação de pedidos aos caminhões (bin packing first-fit/best-fit e refinamento MILP):
+capacidades e max_pedidos nunca excedidos, distância máxima respeitada, sobras marcadas com -1
+e o MILP nunca usando mais caminhões que a heurística.
+
+    pytest test_alocacao.py
+"""
+
+import numpy as np
+import pytest
+
+import alocacao
+from distancias import haversine_km
+
+
+def _instancia(n, k, semente):
+    rng = np.random.default_rng(semente)
+    pesos = rng.uniform(50, 400, n)
+    caixas = rng.integers(1, 30, n).astype(np.float64)
+    capacidades_kg = rng.choice([1000.0, 2000.0, 3500.0], k)
+    capacidades_cx = rng.choice([80.0, 150.0, 250.0], k)
+    latlon = np.column_stack((rng.uniform(-23.8, -23.3, n), rng.uniform(-46.9, -46.4, n)))
+    return pesos, caixas, capacidades_kg, capacidades_cx, latlon
+
+
+def _verificar_capacidades(caminhoes, pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=None):
+    alocados = caminhoes >= 0
+    k = len(capacidades_kg)
+    assert np.all(np.bincount(caminhoes[alocados], pesos[alocados], k) <= capacidades_kg + 1e-9)
+    assert np.all(np.bincount(caminhoes[alocados], caixas[alocados], k) <= capacidades_cx + 1e-9)
+    if max_pedidos:
+        assert np.all(np.bincount(caminhoes[alocados], minlength=k) <= max_pedidos)
+
+
+@pytest.mark.parametrize("estrategia", alocacao.ESTRATEGIAS)
+@pytest.mark.parametrize("semente", range(3))
+def test_empacotar_respeita_capacidades(estrategia, semente):
+    pesos, caixas, capacidades_kg, capacidades_cx, _ = _instancia(120, 20, semente)
+
+    caminhoes = alocacao.empacotar(pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=12,
+                                   estrategia=estrategia)
+
+    _verificar_capacidades(caminhoes, pesos, caixas, capacidades_kg, capacidades_cx, 12)
+    assert np.all(caminhoes >= 0)  # A frota comporta todos os pedidos
+
+
+@pytest.mark.parametrize("semente", range(3))
+def test_empacotar_respeita_distancia_maxima(semente):
+    pesos, caixas, capacidades_kg, capacidades_cx, latlon = _instancia(120, 30, semente)
+    limite = 15.0
+
+    caminhoes = alocacao.empacotar(pesos, caixas, capacidades_kg, capacidades_cx, latlon=latlon,
+                                   distancia_maxima_km=limite)
+
+    _verificar_capacidades(caminhoes, pesos, caixas, capacidades_kg, capacidades_cx)
+    for caminhao in np.unique(caminhoes[caminhoes >= 0]):
+        grupo = latlon[caminhoes == caminhao]
+        distancias = haversine_km(grupo[:, None, 0], grupo[:, None, 1], grupo[None, :, 0], grupo[None, :, 1])
+        assert distancias.max() <= limite + 1e-9
+
+
+def test_sobras_ficam_com_menos_um_e_carga_zero():
+    pesos = np.array([900.0, 900.0, 900.0, 2000.0])
+    caixas = np.ones(4)
+
+    caminhoes, cargas = alocacao.alocar_pedidos(pesos, caixas, [1000.0, 1000.0], [10.0, 10.0],
+                                                regioes=[0, 0, 1, 0])
+
+    _verificar_capacidades(caminhoes, pesos, caixas, np.array([1000.0, 1000.0]), np.array([10.0, 10.0]))
+    # Pedido maior que qualquer caminhão e região sem caminhão livre: sem carga
+    assert caminhoes[3] == -1 and cargas[3] == 0
+    assert np.count_nonzero(caminhoes >= 0) == 2
+    assert sorted(cargas[caminhoes >= 0].tolist()) == [1, 2]
+
+
+def test_um_caminhao_atende_uma_unica_regiao():
+    pesos, caixas, capacidades_kg, capacidades_cx, _ = _instancia(90, 30, 4)
+    regioes = np.repeat([0, 1, 2], 30)
+
+    caminhoes, cargas = alocacao.alocar_pedidos(pesos, caixas, capacidades_kg, capacidades_cx, regioes=regioes)
+
+    _verificar_capacidades(caminhoes, pesos, caixas, capacidades_kg, capacidades_cx)
+    for caminhao in np.unique(caminhoes[caminhoes >= 0]):
+        assert len(np.unique(regioes[caminhoes == caminhao])) == 1
+    assert np.array_equal(cargas > 0, caminhoes >= 0)
+
+
+@pytest.mark.parametrize("semente", range(3))
+def test_milp_nunca_usa_mais_caminhoes_que_a_heuristica(semente):
+    pytest.importorskip("pulp")
+    pesos, caixas, capacidades_kg, capacidades_cx, _ = _instancia(25, 10, semente)
+    regioes = np.repeat([0, 1], [12, 13])
+
+    heuristica, _ = alocacao.alocar_pedidos(pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=8,
+                                            regioes=regioes)
+    refinado, _ = alocacao.alocar_pedidos(pesos, caixas, capacidades_kg, capacidades_cx, max_pedidos=8,
+                                          regioes=regioes, refinar=True, tempo_limite_milp_s=5)
+
+    _verificar_capacidades(refinado, pesos, caixas, capacidades_kg, capacidades_cx, 8)
+    assert np.count_nonzero(refinado < 0) <= np.count_nonzero(heuristica < 0)
+    assert len(np.unique(refinado[refinado >= 0])) <= len(np.unique(heuristica[heuristica >= 0]))
+
+
+def test_milp_com_warm_start_so_retorna_solucao_melhor():
+    pytest.importorskip("pulp")
+    # Solução inicial com 3 caminhões; o ótimo são 2 ({600, 400} e {500, 500})
+    pesos = np.array([600.0, 500.0, 500.0, 400.0])
+    caixas = np.ones(4)
+    capacidades_kg = np.full(3, 1000.0)
+    capacidades_cx = np.full(3, 10.0)
+    inicial = np.array([0, 0, 1, 2])
+
+    refinado = alocacao.refinar_milp(pesos, caixas, capacidades_kg, capacidades_cx, inicial=inicial)
+
+    assert refinado is not None
+    _verificar_capacidades(refinado, pesos, caixas, capacidades_kg, capacidades_cx)
+    assert len(np.unique(refinado)) == 2 and np.all(refinado >= 0)
+    # A solução ótima como ponto de partida não pode ser melhorada
+    assert alocacao.refinar_milp(pesos, caixas, capacidades_kg, capacidades_cx, inicial=refinado) is None
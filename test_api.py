@@ -0,0 +1,42 @@
+"""
+Testes dos endpoints da API (cliente de testes do Flask) com planilhas numa pasta temporária.
+
+    pytest test_api.py
+"""
+
+import pandas as pd
+import pytest
+
+import api
+
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "DATABASE_FOLDER", str(tmp_path))
+    api.conjuntos.descartar(("pedidos", "caminhoes"))
+
+    def sem_geocodificacao(lotes):
+        raise AssertionError("a planilha inválida não deve chegar à geocodificação")
+
+    monkeypatch.setattr(api, "geocodificar_em_lotes", sem_geocodificacao)
+    pd.DataFrame({"Placa": ["ABC1D23"], "Capac. Kg": [1000], "Capac. Cx": [100], "Disponível": ["Ativo"]}).to_excel(
+        tmp_path / "Caminhoes.xlsx", index=False)
+    # Sem 'Peso dos Itens': serve ao /mapa, mas não ao /resultado
+    pd.DataFrame({"Endereço de Entrega": ["Rua A, 1"], "Bairro de Entrega": ["Centro"],
+                  "Cidade de Entrega": ["São Paulo"], "Qtde. dos Itens": [3]}).to_excel(
+        tmp_path / "Pedidos.xlsx", index=False)
+    return api.app.test_client()
+
+
+def test_resultado_sem_peso_responde_400_antes_de_geocodificar(cliente):
+    resposta = cliente.get("/resultado")
+
+    assert resposta.status_code == 400
+    assert "Peso dos Itens" in resposta.get_json()["error"]
+
+
+def test_jobs_sem_peso_responde_400(cliente):
+    resposta = cliente.post("/jobs", json={})
+
+    assert resposta.status_code == 400
+    assert "Peso dos Itens" in resposta.get_json()["error"]
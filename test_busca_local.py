@@ -0,0 +1,49 @@
+"""
+Testes da busca local (2-opt/Or-opt): a rota continua sendo uma permutação dos mesmos pontos,
+nunca piora e a matriz assimétrica é recusada.
+
+    pytest test_busca_local.py
+"""
+
+import numpy as np
+import pytest
+
+import busca_local
+from distancias import distancia_rota, matriz_distancias
+
+
+def _matriz(n, semente):
+    rng = np.random.default_rng(semente)
+    coords = np.column_stack((rng.uniform(-23.7, -23.4, n), rng.uniform(-46.8, -46.5, n)))
+    return matriz_distancias(coords)
+
+
+@pytest.mark.parametrize("fechada", [False, True])
+@pytest.mark.parametrize("or_opt", [False, True])
+def test_rota_melhorada_e_permutacao_e_nunca_pior(fechada, or_opt):
+    matriz = _matriz(150, 0)
+    inicial = np.random.default_rng(1).permutation(150).tolist()
+
+    rota = busca_local.otimizar_rota(inicial, matriz, fechada=fechada, or_opt=or_opt)
+
+    assert sorted(rota) == sorted(inicial)
+    if not fechada:
+        assert rota[0] == inicial[0]  # O depósito fica fixo em rotas abertas
+    assert distancia_rota(rota, matriz, fechada) <= distancia_rota(inicial, matriz, fechada) + 1e-9
+
+
+def test_subconjunto_da_matriz():
+    matriz = _matriz(60, 2)
+    inicial = list(range(0, 60, 3))
+
+    rota = busca_local.dois_opt(inicial, matriz)
+
+    assert sorted(rota) == inicial
+    assert distancia_rota(rota, matriz) <= distancia_rota(inicial, matriz) + 1e-9
+
+
+def test_matriz_assimetrica_e_recusada():
+    matriz = np.random.default_rng(3).uniform(1, 10, (30, 30))
+
+    with pytest.raises(ValueError):
+        busca_local.otimizar_rota(list(range(30)), matriz)
@@ -0,0 +1,57 @@
+"""
+Testes do módulo diametro contra a força bruta (haversine entre todos os pares).
+
+    pytest test_diametro.py
+"""
+
+import numpy as np
+import pytest
+
+from diametro import VerificadorDiametro, diametro_km, dentro_do_diametro, pedidos_distantes
+from distancias import haversine_km
+
+
+def _pares(a, b):
+    a, b = np.asarray(a).reshape(-1, 2), np.asarray(b).reshape(-1, 2)
+    return haversine_km(a[:, None, 0], a[:, None, 1], b[None, :, 0], b[None, :, 1])
+
+
+def _pontos(n, semente, espalhamento=0.2):
+    rng = np.random.default_rng(semente)
+    return np.column_stack((rng.normal(-23.55, espalhamento, n), rng.normal(-46.63, espalhamento, n)))
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_diametro_igual_a_forca_bruta(semente):
+    pontos = _pontos(300, semente)
+    bruto = _pares(pontos, pontos).max()
+
+    assert diametro_km(pontos) == pytest.approx(bruto, rel=1e-9)
+    assert dentro_do_diametro(pontos, bruto + 1e-6)
+    assert not dentro_do_diametro(pontos, bruto - 1e-3)
+
+
+def test_pedidos_distantes_igual_a_forca_bruta():
+    pontos = _pontos(200, 1)
+    limite = 40.0
+
+    assert np.array_equal(pedidos_distantes(pontos, limite), _pares(pontos, pontos).max(axis=1) > limite)
+
+
+@pytest.mark.parametrize("semente", range(5))
+def test_verificador_incremental_nunca_aceita_ponto_alem_do_limite(semente):
+    pontos = _pontos(400, semente)
+    limite = 25.0
+    verificador = VerificadorDiametro(limite)
+    grupo = []
+
+    for ponto in pontos:
+        cabe = verificador.cabe(ponto)
+        # Com a envoltória atualizada a cada ponto, a resposta é a mesma da força bruta
+        assert cabe == (not grupo or _pares(ponto, grupo).max() <= limite)
+        if cabe:
+            verificador.adicionar(ponto)
+            grupo.append(ponto)
+
+    assert len(grupo) > 1
+    assert _pares(grupo, grupo).max() <= limite
@@ -0,0 +1,228 @@
+"""
+Testes do módulo geocodificacao_lote contra um servidor HTTP local (http.server) que imita
+o OpenCage e o Nominatim: lote com duplicatas e cache, repetição de 429/5xx com backoff,
+limite de taxa (token bucket, com relógio simulado) e a cadeia OpenCage -> Nominatim -> manual.
+
+    pytest test_geocodificacao_lote.py
+"""
+
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import cache_geocodificacao
+import geocodificacao_lote
+
+# endereço: respostas do OpenCage (status em ordem; a última se repete) e do Nominatim
+RESPOSTAS = {
+    "Rua A, 1": {"opencage": [200], "nominatim": [200]},
+    "Rua B, 2": {"opencage": [429, 503, 200], "nominatim": [200]},
+    "Rua C, 3": {"opencage": [503], "nominatim": [200]},
+    "Rua D, 4": {"opencage": [200], "nominatim": [200]},
+    "Rua E, 5": {"opencage": [500], "nominatim": [502]},
+}
+COORDENADAS = {
+    "opencage": (-23.55, -46.63),
+    "nominatim": (-22.90, -43.17),
+    "manual": (-19.92, -43.94),
+}
+# Encontrados só na tabela manual: os dois provedores HTTP respondem sem resultados
+SEM_RESULTADO = {"Rua D, 4", "Rua E, 5"}
+
+
+class _Stub(BaseHTTPRequestHandler):
+    requisicoes = Counter()
+    trava = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        provedor = url.path.strip("/")
+        endereco = parse_qs(url.query)["q"][0]
+        with self.trava:
+            self.requisicoes[(provedor, endereco)] += 1
+            tentativa = self.requisicoes[(provedor, endereco)]
+        respostas = RESPOSTAS[endereco][provedor]
+        status = respostas[min(tentativa, len(respostas)) - 1]
+
+        lat, lon = COORDENADAS[provedor]
+        if endereco in SEM_RESULTADO:
+            corpo = {"status": {"code": 200}, "results": []} if provedor == "opencage" else []
+        elif provedor == "opencage":
+            corpo = {"status": {"code": 200}, "results": [{"geometry": {"lat": lat, "lng": lon}}]}
+        else:
+            corpo = [{"lat": str(lat), "lon": str(lon)}]
+        dados = json.dumps(corpo if status == 200 else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    _Stub.requisicoes.clear()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    # Registra as esperas do backoff em vez de dormir (a taxa 0 dispensa o limitador)
+    registradas = []
+    monkeypatch.setattr(geocodificacao_lote.time, "sleep", registradas.append)
+    return registradas
+
+
+class _Relogio:
+    """Relógio simulado: time.monotonic lê o instante e time.sleep o avança, sem dormir."""
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.trava = threading.Lock()
+
+    def monotonic(self):
+        with self.trava:
+            return self.agora
+
+    def sleep(self, segundos):
+        with self.trava:
+            self.agora += max(segundos, 0.0)
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(geocodificacao_lote.time, "monotonic", relogio.monotonic)
+    monkeypatch.setattr(geocodificacao_lote.time, "sleep", relogio.sleep)
+    return relogio
+
+
+def _provedores(url, tentativas=3):
+    return [
+        geocodificacao_lote.ProvedorOpenCage(api_key="teste", url=f"{url}/opencage", taxa=0,
+                                             tentativas=tentativas, backoff=0.5, timeout=5),
+        geocodificacao_lote.ProvedorNominatim(url=f"{url}/nominatim", taxa=0,
+                                              tentativas=tentativas, backoff=0.5, timeout=5),
+        geocodificacao_lote.ProvedorManual({"Rua D, 4": COORDENADAS["manual"]}),
+    ]
+
+
+def test_repete_429_e_5xx_com_backoff_exponencial(servidor, esperas):
+    coords, fonte = geocodificacao_lote.geocodificar_endereco("Rua B, 2", _provedores(servidor))
+
+    assert (coords, fonte) == (COORDENADAS["opencage"], "opencage")
+    assert _Stub.requisicoes[("opencage", "Rua B, 2")] == 3
+    assert ("nominatim", "Rua B, 2") not in _Stub.requisicoes
+    # backoff * 2**tentativa * (1 + aleatório em [0, 1))
+    assert len(esperas) == 2
+    assert 0.5 <= esperas[0] < 1.0
+    assert 1.0 <= esperas[1] < 2.0
+
+
+def test_cadeia_opencage_nominatim_manual(servidor, esperas):
+    provedores = _provedores(servidor)
+
+    # OpenCage falha em todas as tentativas: Nominatim responde
+    assert geocodificacao_lote.geocodificar_endereco("Rua C, 3", provedores) == (COORDENADAS["nominatim"], "nominatim")
+    assert _Stub.requisicoes[("opencage", "Rua C, 3")] == 3
+    assert _Stub.requisicoes[("nominatim", "Rua C, 3")] == 1
+
+    # Nenhum provedor HTTP encontra o endereço: tabela manual
+    assert geocodificacao_lote.geocodificar_endereco("Rua D, 4", provedores) == (COORDENADAS["manual"], "manual")
+    assert _Stub.requisicoes[("opencage", "Rua D, 4")] == 1
+    assert _Stub.requisicoes[("nominatim", "Rua D, 4")] == 1
+
+    # Todos falham
+    assert geocodificacao_lote.geocodificar_endereco("Rua E, 5", provedores) == (None, None)
+    assert _Stub.requisicoes[("nominatim", "Rua E, 5")] == 3
+
+
+def test_lote_resolve_cada_endereco_uma_vez(servidor, esperas):
+    enderecos = ["Rua A, 1", "Rua C, 3", "Rua A, 1", "Rua D, 4", "Rua E, 5", "Rua C, 3"]
+    chamadas = []
+
+    resultados, fontes = geocodificacao_lote.geocodificar_lote(
+        enderecos, _provedores(servidor), max_workers=4, progresso=lambda feitos, total: chamadas.append((feitos, total))
+    )
+
+    assert resultados == {
+        "Rua A, 1": COORDENADAS["opencage"],
+        "Rua C, 3": COORDENADAS["nominatim"],
+        "Rua D, 4": COORDENADAS["manual"],
+        "Rua E, 5": None,
+    }
+    assert fontes == {"Rua A, 1": "opencage", "Rua C, 3": "nominatim", "Rua D, 4": "manual"}
+    assert _Stub.requisicoes[("opencage", "Rua A, 1")] == 1
+    assert chamadas == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+
+def test_resolver_enderecos_so_geocodifica_os_misses(servidor, esperas, tmp_path):
+    caminho = str(tmp_path / "cache.db")
+    provedores = _provedores(servidor)
+    try:
+        estatisticas = {}
+        primeira = geocodificacao_lote.resolver_enderecos(
+            ["Rua A, 1", "Rua C, 3", "Rua E, 5"], provedores, max_workers=2,
+            caminho_cache=caminho, estatisticas=estatisticas,
+        )
+        assert primeira["Rua A, 1"] == COORDENADAS["opencage"]
+        assert primeira["Rua E, 5"] is None
+        assert estatisticas == {"cache": 0, "geocodificados": 2, "falhas": 1}
+
+        antes = sum(_Stub.requisicoes.values())
+        estatisticas = {}
+        segunda = geocodificacao_lote.resolver_enderecos(
+            ["Rua A, 1", "Rua C, 3", "Rua D, 4"], provedores, max_workers=2,
+            caminho_cache=caminho, estatisticas=estatisticas,
+        )
+        assert segunda == {
+            "Rua A, 1": COORDENADAS["opencage"],
+            "Rua C, 3": COORDENADAS["nominatim"],
+            "Rua D, 4": COORDENADAS["manual"],
+        }
+        assert estatisticas == {"cache": 2, "geocodificados": 1, "falhas": 0}
+        # Só o miss (Rua D, 4) foi aos provedores HTTP
+        assert sum(_Stub.requisicoes.values()) - antes == 2
+    finally:
+        cache_geocodificacao.fechar()
+
+
+@pytest.mark.parametrize("taxa", [1, 4])
+def test_limite_de_taxa_espaca_as_requisicoes(servidor, relogio, taxa):
+    n = 6
+    provedor = geocodificacao_lote.ProvedorNominatim(url=f"{servidor}/nominatim", taxa=taxa,
+                                                     tentativas=1, timeout=5)
+    inicio = relogio.monotonic()
+
+    for _ in range(n):
+        assert provedor.geocodificar("Rua A, 1") == COORDENADAS["nominatim"]
+
+    assert _Stub.requisicoes[("nominatim", "Rua A, 1")] == n
+    # A primeira sai na hora; cada uma das outras espera 1/taxa
+    assert relogio.monotonic() - inicio >= (n - 1) / taxa - 1e-9
+
+
+def test_limite_de_taxa_entre_threads(relogio):
+    n, taxa = 20, 5
+    limitador = geocodificacao_lote.LimitadorTaxa(taxa)
+    inicio = relogio.monotonic()
+
+    threads = [threading.Thread(target=limitador.adquirir) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert relogio.monotonic() - inicio >= (n - 1) / taxa - 1e-9
@@ -0,0 +1,74 @@
+"""
+Testes do modelo de ilhas: uma ilha que morre ou trava não pode prender o processo principal.
+
+    pytest test_ilhas.py
+"""
+
+import os
+import time
+
+import numpy as np
+
+import ilhas
+
+
+class ProblemaSoma:
+    """Minimiza a soma de genes binários; uma das ilhas (a primeira a criar `marcador`) falha."""
+
+    n_genes = 20
+
+    def __init__(self, marcador=None, falha=None):
+        self.marcador = marcador
+        self.falha = falha
+
+    def _custos(self, populacao):
+        return populacao.sum(axis=1).astype(np.float64)
+
+    def iniciar(self, rng):
+        populacao = rng.integers(0, 2, size=(10, self.n_genes))
+        return populacao, self._custos(populacao)
+
+    def geracao(self, populacao, custos, rng, numero):
+        if self.falha and numero == 3 and self._escolhida():
+            if self.falha == "morrer":
+                os._exit(9)  # Como um OOM kill: sai sem publicar resultado
+            time.sleep(3600)
+        filhos = populacao.copy()
+        filhos[rng.random(filhos.shape) < 0.1] = 0
+        populacao = np.vstack([populacao, filhos])
+        custos = self._custos(populacao)
+        melhores = np.argsort(custos)[:10]
+        return populacao[melhores], custos[melhores]
+
+    def _escolhida(self):
+        try:
+            os.close(os.open(self.marcador, os.O_CREAT | os.O_EXCL))
+            return True
+        except FileExistsError:
+            return False
+
+
+def test_ilhas_retornam_o_melhor_individuo():
+    individuo, custo = ilhas.executar_ilhas(ProblemaSoma(), 30, n_ilhas=2, geracoes_por_epoca=5, semente=1)
+
+    assert individuo.shape == (ProblemaSoma.n_genes,)
+    assert custo == individuo.sum()
+
+
+def test_ilha_morta_nao_trava_o_processo_principal(tmp_path):
+    inicio = time.time()
+    individuo, custo = ilhas.executar_ilhas(ProblemaSoma(str(tmp_path / "marcador"), "morrer"), 50, n_ilhas=3,
+                                            geracoes_por_epoca=5, semente=1)
+
+    assert time.time() - inicio < 30
+    assert custo == individuo.sum()
+
+
+def test_ilha_travada_e_encerrada_depois_do_prazo(tmp_path, monkeypatch):
+    monkeypatch.setattr(ilhas, "FOLGA_ENCERRAMENTO_S", 0.5)
+    inicio = time.time()
+    individuo, custo = ilhas.executar_ilhas(ProblemaSoma(str(tmp_path / "marcador"), "travar"), 10**6, n_ilhas=2,
+                                            geracoes_por_epoca=5, semente=1, tempo_limite_s=1)
+
+    assert time.time() - inicio < 10
+    assert custo == individuo.sum()
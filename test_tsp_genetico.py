@@ -0,0 +1,31 @@
+"""
+Testes do algoritmo genético de TSP: rota válida a partir do depósito e custo nunca pior
+que o da população inicial.
+
+    pytest test_tsp_genetico.py
+"""
+
+import numpy as np
+import pytest
+
+from distancias import distancia_rota, matriz_distancias
+from tsp_genetico import resolver_tsp_ga
+
+
+@pytest.fixture
+def matriz():
+    rng = np.random.default_rng(0)
+    return matriz_distancias(np.column_stack((rng.uniform(-23.7, -23.4, 40), rng.uniform(-46.8, -46.5, 40))))
+
+
+@pytest.mark.parametrize("memetico", [False, True])
+def test_rota_valida_e_nunca_pior_que_o_inicio(matriz, memetico):
+    # Sem gerações, o resultado é o melhor indivíduo da população inicial
+    _, custo_inicial = resolver_tsp_ga(matriz, geracoes=0, semente=7)
+
+    rota, custo = resolver_tsp_ga(matriz, geracoes=200, semente=7, memetico=memetico)
+
+    assert rota[0] == 0
+    assert sorted(rota.tolist()) == list(range(len(matriz)))
+    assert custo == pytest.approx(distancia_rota(rota.tolist(), matriz, fechada=True))
+    assert custo <= custo_inicial + 1e-9
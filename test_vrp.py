@@ -0,0 +1,57 @@
+"""
+Testes do CVRP (OR-Tools): cada pedido atendido uma vez, capacidades e max_pedidos respeitados
+e o warm start nunca piorado.
+
+    pytest test_vrp.py
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("ortools")
+
+from distancias import distancia_rota, matriz_distancias  # noqa: E402
+from vrp import resolver_cvrp  # noqa: E402
+
+N = 25
+CAPACIDADES_KG = [400, 300, 300]
+CAPACIDADES_CX = [40, 30, 30]
+
+
+@pytest.fixture
+def instancia():
+    rng = np.random.default_rng(0)
+    matriz = matriz_distancias(np.column_stack((rng.uniform(-23.7, -23.4, N), rng.uniform(-46.8, -46.5, N))))
+    kg = np.concatenate(([0], rng.integers(10, 40, N - 1)))
+    cx = np.concatenate(([0], rng.integers(1, 4, N - 1)))
+    return matriz, kg, cx
+
+
+def _custo(rotas, matriz):
+    return sum(distancia_rota([0] + rota, matriz, fechada=True) for rota in rotas if rota)
+
+
+def test_rotas_respeitam_capacidades(instancia):
+    matriz, kg, cx = instancia
+
+    rotas, descartados = resolver_cvrp(matriz, kg, cx, CAPACIDADES_KG, CAPACIDADES_CX, max_pedidos=10,
+                                       tempo_limite_s=1)
+
+    atendidos = [no for rota in rotas for no in rota]
+    assert sorted(atendidos + descartados) == list(range(1, N))
+    for rota, cap_kg, cap_cx in zip(rotas, CAPACIDADES_KG, CAPACIDADES_CX):
+        assert kg[rota].sum() <= cap_kg
+        assert cx[rota].sum() <= cap_cx
+        assert len(rota) <= 10
+
+
+def test_warm_start_nunca_piora(instancia):
+    matriz, kg, cx = instancia
+    # Rotas iniciais viáveis (e ruins): os pedidos em ordem, repartidos em três veículos
+    iniciais = [list(range(1, 9)), list(range(9, 17)), list(range(17, N))]
+
+    rotas, descartados = resolver_cvrp(matriz, kg, cx, CAPACIDADES_KG, CAPACIDADES_CX, tempo_limite_s=1,
+                                       rotas_iniciais=iniciais, penalidade_descarte=None)
+
+    assert descartados == []
+    assert _custo(rotas, matriz) <= _custo(iniciais, matriz) + 1e-3
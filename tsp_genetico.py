@@ -0,0 +1,160 @@
+"""
+Módulo do algoritmo genético para TSP
+
+Representa a população como uma matriz NumPy (indivíduos x pontos) de índices inteiros
+da matriz de distâncias. O ponto 0 (depósito) fica fixo no início de todas as rotas,
+que são fechadas (voltam ao depósito).
+
+- Fitness em lote: um único gather + soma sobre a matriz de distâncias para toda a população.
+- Crossover OX em O(n) com máscara booleana, mutação por inversão de trecho.
+- Parada antecipada quando a melhor rota não melhora por `paciencia` gerações.
+- Passo memético opcional com 2-opt (módulo busca_local) nos melhores indivíduos.
+- Modo de ilhas opcional (módulo ilhas): várias populações em processos paralelos com migração de elite.
+"""
+
+import numpy as np
+
+import busca_local
+from construcao_rota import vizinho_mais_proximo
+from ilhas import executar_serial, executar_ilhas
+
+
+def custos_populacao(populacao, matriz):
+    """
+    Custo de cada rota fechada da população, partindo e voltando ao ponto 0.
+
+    Parâmetros:
+      populacao (ndarray): Matriz (indivíduos, n-1) com a ordem dos pontos 1..n-1.
+      matriz (ndarray): Matriz de distâncias (n, n).
+
+    Retorna:
+      ndarray: Custo float64 de cada indivíduo.
+    """
+    if populacao.shape[1] == 0:
+        return np.zeros(len(populacao))
+    internos = matriz[populacao[:, :-1], populacao[:, 1:]].sum(axis=1, dtype=np.float64)
+    return internos + matriz[0, populacao[:, 0]] + matriz[populacao[:, -1], 0]
+
+
+def crossover_ox(pai1, pai2, inicio, fim, rotulo):
+    """
+    Order crossover (OX) em O(n): copia pai1[inicio:fim] e completa com os demais pontos
+    na ordem em que aparecem em pai2.
+
+    `rotulo` é um buffer booleano reutilizável, indexado pelo número do ponto.
+    """
+    segmento = pai1[inicio:fim]
+    rotulo[segmento] = True
+    restantes = pai2[~rotulo[pai2]]
+    rotulo[segmento] = False
+    return np.concatenate((restantes[:inicio], segmento, restantes[inicio:]))
+
+
+def _torneio(custos, quantidade, tamanho, rng):
+    candidatos = rng.integers(0, len(custos), size=(quantidade, tamanho))
+    return candidatos[np.arange(quantidade), custos[candidatos].argmin(axis=1)]
+
+
+def _memetico(populacao, custos, matriz, quantidade, k):
+    for idx in np.argsort(custos)[:quantidade]:
+        rota = busca_local.otimizar_rota([0] + populacao[idx].tolist(), matriz, k=k, fechada=True, or_opt=False)
+        rota = np.roll(rota, -rota.index(0))
+        populacao[idx] = rota[1:]
+    return custos_populacao(populacao, matriz)
+
+
+class ProblemaTSP:
+    """
+    Operadores do GA de TSP na interface usada por ilhas.executar_serial / executar_ilhas.
+    """
+
+    def __init__(self, matriz, tamanho_pop=100, taxa_mutacao=0.2, elite=2, tamanho_torneio=3,
+                 memetico=False, intervalo_memetico=10, n_memetico=2, k_vizinhos=10):
+        self.matriz = np.asarray(matriz)
+        self.n_genes = len(self.matriz) - 1
+        self.tamanho_pop = max(tamanho_pop, elite + 2)
+        self.taxa_mutacao = taxa_mutacao
+        self.elite = elite
+        self.tamanho_torneio = tamanho_torneio
+        self.memetico = memetico
+        self.intervalo_memetico = intervalo_memetico
+        self.n_memetico = n_memetico
+        self.k_vizinhos = k_vizinhos
+        self._rotulo = np.zeros(len(self.matriz), dtype=bool)
+
+    def iniciar(self, rng):
+        pontos = np.arange(1, len(self.matriz))
+        populacao = np.empty((self.tamanho_pop, self.n_genes), dtype=np.int64)
+        # Um indivíduo parte do vizinho mais próximo; os demais são permutações aleatórias
+        populacao[0] = vizinho_mais_proximo(self.matriz, 0)[1:]
+        for i in range(1, self.tamanho_pop):
+            populacao[i] = rng.permutation(pontos)
+        return populacao, custos_populacao(populacao, self.matriz)
+
+    def geracao(self, populacao, custos, rng, numero):
+        m = self.n_genes
+        n_filhos = self.tamanho_pop - self.elite
+        ordem = np.argsort(custos)
+        nova = np.empty_like(populacao)
+        nova[:self.elite] = populacao[ordem[:self.elite]]
+
+        pais1 = _torneio(custos, n_filhos, self.tamanho_torneio, rng)
+        pais2 = _torneio(custos, n_filhos, self.tamanho_torneio, rng)
+        cortes = np.sort(rng.integers(0, m + 1, size=(n_filhos, 2)), axis=1)
+        for f in range(n_filhos):
+            nova[self.elite + f] = crossover_ox(populacao[pais1[f]], populacao[pais2[f]],
+                                                cortes[f, 0], cortes[f, 1], self._rotulo)
+
+        mutantes = self.elite + np.flatnonzero(rng.random(n_filhos) < self.taxa_mutacao)
+        trechos = np.sort(rng.integers(0, m, size=(len(mutantes), 2)), axis=1)
+        for idx, (i, j) in zip(mutantes, trechos):
+            nova[idx, i:j + 1] = nova[idx, i:j + 1][::-1]
+
+        custos = custos_populacao(nova, self.matriz)
+        if self.memetico and (numero + 1) % self.intervalo_memetico == 0:
+            custos = _memetico(nova, custos, self.matriz, self.n_memetico, self.k_vizinhos)
+        return nova, custos
+
+
+def resolver_tsp_ga(matriz, tamanho_pop=100, geracoes=1000, taxa_mutacao=0.2, elite=2,
+                    tamanho_torneio=3, paciencia=100, memetico=False, intervalo_memetico=10,
+                    n_memetico=2, k_vizinhos=10, semente=None, ilhas=1, tempo_limite_s=None,
+                    geracoes_por_epoca=20, n_migrantes=2, progresso=None):
+    """
+    Resolve o TSP (rota fechada a partir do ponto 0) com um algoritmo genético vetorizado.
+
+    Parâmetros:
+      matriz (ndarray): Matriz de distâncias (n, n); o ponto 0 é o depósito.
+      tamanho_pop (int): Número de indivíduos (por ilha).
+      geracoes (int): Número máximo de gerações.
+      taxa_mutacao (float): Probabilidade de mutação por inversão de cada filho.
+      elite (int): Quantos melhores indivíduos passam intactos para a próxima geração.
+      tamanho_torneio (int): Tamanho do torneio de seleção dos pais.
+      paciencia (int): Gerações sem melhoria antes da parada antecipada (None desativa).
+      memetico (bool): Se True, aplica 2-opt nos `n_memetico` melhores a cada `intervalo_memetico` gerações.
+      k_vizinhos (int): Tamanho das listas de vizinhos do 2-opt memético.
+      semente (int): Semente do gerador aleatório.
+      ilhas (int): Número de populações em processos paralelos (modelo de ilhas); 1 executa em série.
+      tempo_limite_s (float): Orçamento global de relógio (opcional).
+      geracoes_por_epoca (int): Gerações entre migrações de elite entre as ilhas.
+      n_migrantes (int): Indivíduos que migram a cada época.
+      progresso (callable): Função opcional progresso(concluidos, total) das gerações.
+
+    Retorna:
+      ndarray: Melhor rota (começando em 0).
+      float: Custo da melhor rota.
+    """
+    matriz = np.asarray(matriz)
+    n = len(matriz)
+    if n <= 3:
+        rota = np.arange(n)
+        return rota, float(custos_populacao(rota[None, 1:], matriz)[0]) if n > 1 else 0.0
+
+    problema = ProblemaTSP(matriz, tamanho_pop, taxa_mutacao, elite, tamanho_torneio,
+                           memetico, intervalo_memetico, n_memetico, k_vizinhos)
+    if ilhas == 1:
+        melhor, custo = executar_serial(problema, geracoes, semente, tempo_limite_s, paciencia, progresso)
+    else:
+        melhor, custo = executar_ilhas(problema, geracoes, ilhas, geracoes_por_epoca, n_migrantes,
+                                       semente, tempo_limite_s, paciencia, progresso)
+    return np.concatenate(([0], melhor)), custo
@@ -0,0 +1,104 @@
+"""
+Orçamento de tempo de importação
+
+Importa cada módulo num processo novo com `python -X importtime` e verifica:
+
+- o tempo cumulativo de importação do módulo (o menor de algumas repetições) contra o orçamento;
+- que dependências pesadas (scikit-learn, OR-Tools, networkx, folium, geopy, numba...) não são
+  carregadas na importação, só no primeiro uso;
+- que a importação não cria arquivos nem pastas (o processo roda numa pasta temporária vazia).
+
+    python verificar_importacao.py
+
+Retorna código de saída 1 se algum módulo estourar o orçamento. ORCAMENTO_IMPORTACAO_FATOR
+multiplica os limites de tempo (ex.: 2 em máquinas lentas de CI).
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+
+PESADOS = ("sklearn", "ortools", "networkx", "folium", "geopy", "numba", "scipy")
+
+# módulo: (limite em ms ou None, módulos que não podem ser carregados, arquivos permitidos)
+ORCAMENTOS = {
+    "api": (1500, PESADOS + ("streamlit", "requests"), ("api.log",)),
+    "main": (3000, PESADOS, ()),
+    "ia_analise_pedidos": (None, PESADOS + ("streamlit",), ()),
+    "melhorias_roterizacao": (None, PESADOS + ("streamlit",), ()),
+    "optimization": (None, PESADOS + ("streamlit",), ()),
+    "tsp_genetico": (None, PESADOS + ("streamlit",), ()),
+    "vrp": (None, PESADOS + ("streamlit",), ()),
+    "agrupar_por_regiao": (None, PESADOS + ("streamlit",), ()),
+    "geocoding": (None, PESADOS + ("streamlit", "requests"), ()),
+    "config": (None, PESADOS + ("streamlit", "pandas"), ()),
+}
+REPETICOES = 3
+
+_SCRIPT = (
+    "import sys, json; import {modulo}; "
+    "print(json.dumps([m for m in {proibidos!r} if m in sys.modules]))"
+)
+
+
+def medir(modulo, proibidos, pasta_projeto):
+    """
+    Importa `modulo` num processo novo, numa pasta temporária.
+
+    Retorna:
+      float: Tempo cumulativo de importação (ms).
+      list: Módulos proibidos que foram carregados.
+      list: Arquivos e pastas criados pela importação.
+    """
+    import json
+
+    ambiente = dict(os.environ, PYTHONPATH=pasta_projeto + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    with tempfile.TemporaryDirectory() as pasta:
+        processo = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _SCRIPT.format(modulo=modulo, proibidos=proibidos)],
+            cwd=pasta, env=ambiente, capture_output=True, text=True,
+        )
+        criados = sorted(os.listdir(pasta))
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+
+    tempo_us = None
+    for linha in processo.stderr.splitlines():
+        partes = linha.split("|")
+        if linha.startswith("import time:") and len(partes) == 3 and partes[2].strip() == modulo:
+            tempo_us = int(partes[1])
+    carregados = json.loads(processo.stdout.strip().splitlines()[-1])
+    return (tempo_us or 0) / 1000, carregados, criados
+
+
+def main():
+    pasta_projeto = os.path.dirname(os.path.abspath(__file__))
+    fator = float(os.environ.get("ORCAMENTO_IMPORTACAO_FATOR", "1"))
+    falhas = []
+    for modulo, (limite_ms, proibidos, permitidos) in ORCAMENTOS.items():
+        medidas = [medir(modulo, proibidos, pasta_projeto) for _ in range(REPETICOES)]
+        tempo_ms = min(tempo for tempo, _, _ in medidas)
+        _, carregados, criados = medidas[-1]
+        criados = [nome for nome in criados if nome not in permitidos and nome != "__pycache__"]
+
+        problemas = []
+        if limite_ms is not None and tempo_ms > limite_ms * fator:
+            problemas.append(f"{tempo_ms:.0f} ms > {limite_ms * fator:.0f} ms")
+        if carregados:
+            problemas.append(f"carrega {', '.join(carregados)}")
+        if criados:
+            problemas.append(f"cria {', '.join(criados)}")
+        limite = "-" if limite_ms is None else f"{limite_ms * fator:.0f}"
+        print(f"{modulo:<24} {tempo_ms:>8.0f} ms  (limite {limite:>5})  {'; '.join(problemas) or 'ok'}")
+        if problemas:
+            falhas.append(modulo)
+
+    if falhas:
+        print(f"Orçamento de importação estourado: {', '.join(falhas)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
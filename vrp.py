@@ -0,0 +1,164 @@
+"""
+Módulo de roteirização com capacidade (CVRP) via OR-Tools
+
+- Usa a matriz de distâncias métrica compartilhada (km -> metros inteiros) e o depósito de config.
+- Dimensões de capacidade: peso (Capac. Kg), caixas (Capac. Cx) e número de pedidos (max_pedidos).
+- Busca com primeira solução PATH_CHEAPEST_ARC + metaheurística (guided local search por padrão)
+  limitada por tempo, para que execuções grandes terminem num orçamento fixo.
+- Warm start: rotas anteriores (ex.: do dia anterior) viram a solução inicial via ReadAssignmentFromRoutes.
+- Pedidos que não cabem em nenhum veículo podem ser descartados com penalidade,
+  em vez de tornar o problema inviável.
+"""
+
+import os
+import json
+import time
+import logging
+
+import numpy as np
+
+from config import DATABASE_FOLDER, VRP_TEMPO_LIMITE_S
+
+ROTAS_ANTERIORES_ARQUIVO = os.path.join(DATABASE_FOLDER, "vrp_rotas_anteriores.json")
+
+# Penalidade (em metros) por nó não atendido: 10.000 km, bem acima de qualquer desvio real
+PENALIDADE_DESCARTE = 10_000_000
+
+
+def _inteiros(valores, arredondar_para_cima=True):
+    valores = np.nan_to_num(np.asarray(valores, dtype=np.float64), nan=0.0)
+    valores = np.ceil(valores) if arredondar_para_cima else np.floor(valores)
+    return np.maximum(valores, 0).astype(np.int64).tolist()
+
+
+def resolver_cvrp(matriz_km, demandas_kg, demandas_cx, capacidades_kg, capacidades_cx,
+                  pedidos_por_no=None, max_pedidos=None, deposito=0, tempo_limite_s=None,
+                  metaheuristica="GUIDED_LOCAL_SEARCH", rotas_iniciais=None,
+                  penalidade_descarte=PENALIDADE_DESCARTE, progresso=None):
+    """
+    Resolve o CVRP com OR-Tools.
+
+    Parâmetros:
+      matriz_km (ndarray): Matriz de distâncias (n, n) em km; o nó `deposito` é a base.
+      demandas_kg, demandas_cx (array-like): Demanda de cada nó (0 no depósito).
+      capacidades_kg, capacidades_cx (array-like): Capacidade de cada veículo.
+      pedidos_por_no (array-like): Número de pedidos em cada nó (dimensão de contagem).
+      max_pedidos (int): Máximo de pedidos por veículo (None desativa a dimensão).
+      deposito (int): Índice do depósito na matriz.
+      tempo_limite_s (float): Orçamento de tempo da busca; padrão config.VRP_TEMPO_LIMITE_S.
+      metaheuristica (str): Nome em LocalSearchMetaheuristic (ex.: "GUIDED_LOCAL_SEARCH").
+      rotas_iniciais (list): Uma lista de nós por veículo (sem o depósito) para warm start.
+      penalidade_descarte (int): Custo de deixar um nó sem atendimento; None torna todos obrigatórios.
+      progresso (callable): Função opcional progresso(concluidos, total), chamada a cada solução
+        encontrada com o tempo consumido do orçamento (a busca sempre usa o orçamento inteiro).
+
+    Retorna:
+      list: Rotas (listas de nós, sem o depósito) por veículo, ou None se não houver solução.
+      list: Nós descartados.
+    """
+    from ortools.constraint_solver import routing_enums_pb2, pywrapcp
+
+    n = len(matriz_km)
+    num_veiculos = len(capacidades_kg)
+    distancias = np.rint(np.asarray(matriz_km, dtype=np.float64) * 1000.0).astype(np.int64).tolist()
+
+    manager = pywrapcp.RoutingIndexManager(n, num_veiculos, deposito)
+    routing = pywrapcp.RoutingModel(manager)
+
+    if hasattr(routing, "RegisterTransitMatrix"):
+        transito = routing.RegisterTransitMatrix(distancias)
+    else:
+        transito = routing.RegisterTransitCallback(
+            lambda i, j: distancias[manager.IndexToNode(i)][manager.IndexToNode(j)]
+        )
+    routing.SetArcCostEvaluatorOfAllVehicles(transito)
+
+    def adicionar_capacidade(demandas, capacidades, nome):
+        if hasattr(routing, "RegisterUnaryTransitVector"):
+            indice = routing.RegisterUnaryTransitVector(demandas)
+        else:
+            indice = routing.RegisterUnaryTransitCallback(lambda i: demandas[manager.IndexToNode(i)])
+        routing.AddDimensionWithVehicleCapacity(indice, 0, capacidades, True, nome)
+
+    adicionar_capacidade(_inteiros(demandas_kg), _inteiros(capacidades_kg, False), "Peso")
+    adicionar_capacidade(_inteiros(demandas_cx), _inteiros(capacidades_cx, False), "Caixas")
+    if max_pedidos:
+        contagem = _inteiros(pedidos_por_no if pedidos_por_no is not None else np.ones(n))
+        contagem[deposito] = 0
+        adicionar_capacidade(contagem, [int(max_pedidos)] * num_veiculos, "Pedidos")
+
+    if penalidade_descarte is not None:
+        for no in range(n):
+            if no != deposito:
+                routing.AddDisjunction([manager.NodeToIndex(no)], int(penalidade_descarte))
+
+    parametros = pywrapcp.DefaultRoutingSearchParameters()
+    parametros.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    parametros.local_search_metaheuristic = getattr(routing_enums_pb2.LocalSearchMetaheuristic, metaheuristica)
+    orcamento_s = tempo_limite_s or VRP_TEMPO_LIMITE_S
+    parametros.time_limit.FromMilliseconds(int(orcamento_s * 1000))
+    if progresso is not None:
+        inicio = time.monotonic()
+        routing.AddAtSolutionCallback(lambda: progresso(min(time.monotonic() - inicio, orcamento_s), orcamento_s))
+
+    solucao = None
+    if rotas_iniciais:
+        routing.CloseModelWithParameters(parametros)
+        inicial = routing.ReadAssignmentFromRoutes(rotas_iniciais, True)
+        if inicial is not None:
+            solucao = routing.SolveFromAssignmentWithParameters(inicial, parametros)
+        else:
+            logging.info("Rotas anteriores inviáveis para o warm start; resolvendo do zero.")
+    if solucao is None:
+        solucao = routing.SolveWithParameters(parametros)
+    if not solucao:
+        return None, []
+
+    rotas = []
+    atendidos = set()
+    for veiculo in range(num_veiculos):
+        indice = routing.Start(veiculo)
+        rota = []
+        while not routing.IsEnd(indice):
+            no = manager.IndexToNode(indice)
+            if no != deposito:
+                rota.append(no)
+                atendidos.add(no)
+            indice = solucao.Value(routing.NextVar(indice))
+        rotas.append(rota)
+    descartados = [no for no in range(n) if no != deposito and no not in atendidos]
+    return rotas, descartados
+
+
+def rotas_iniciais_por_endereco(rotas_anteriores, veiculos, indice):
+    """
+    Converte rotas anteriores {veiculo: [enderecos]} em listas de nós para o warm start,
+    ignorando endereços que não existem na instância atual e nós repetidos.
+    """
+    usados = set()
+    rotas = []
+    for veiculo in veiculos:
+        rota = []
+        for endereco in rotas_anteriores.get(veiculo, []):
+            no = indice.get(endereco)
+            if no is not None and no != 0 and no not in usados:
+                rota.append(no)
+                usados.add(no)
+        rotas.append(rota)
+    return rotas if any(rotas) else None
+
+
+def carregar_rotas_anteriores(caminho=ROTAS_ANTERIORES_ARQUIVO):
+    """Lê as rotas salvas na última roteirização ({veiculo: [enderecos]})."""
+    try:
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def salvar_rotas(rotas, caminho=ROTAS_ANTERIORES_ARQUIVO):
+    """Guarda as rotas ({veiculo: [enderecos]}) para servir de warm start na próxima execução."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(rotas, arquivo, ensure_ascii=False)